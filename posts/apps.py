@@ -1,5 +1,97 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_migrate, post_save, pre_save
+)
 
 
 class PostsConfig(AppConfig):
     name = "posts"
+
+    def ready(self):
+        from django.contrib.flatpages.models import FlatPage
+
+        from . import (
+            changes, db, events, feeds, flatpages, publisher, rings,
+            sharding, slowlog, surrogate, unread,
+        )
+        from .models import Comment, Follow, Group, Post
+
+        connection_created.connect(
+            db.apply_sqlite_pragmas,
+            dispatch_uid="posts.db.pragmas",
+        )
+        connection_created.connect(
+            slowlog.on_connection_created,
+            dispatch_uid="posts.slowlog",
+        )
+        post_migrate.connect(
+            sharding.init_sequences,
+            sender=self,
+            dispatch_uid="posts.sharding.sequences",
+        )
+        pre_save.connect(
+            feeds.remember_group, sender=Post, dispatch_uid="posts.feeds.pre"
+        )
+        post_save.connect(
+            feeds.post_saved, sender=Post, dispatch_uid="posts.feeds.save"
+        )
+        post_delete.connect(
+            feeds.post_deleted, sender=Post, dispatch_uid="posts.feeds.delete"
+        )
+        # модели → posts.changes → кэши и производные данные
+        post_save.connect(
+            changes.post_saved, sender=Post,
+            dispatch_uid="posts.changes.save",
+        )
+        post_delete.connect(
+            changes.post_deleted, sender=Post,
+            dispatch_uid="posts.changes.delete",
+        )
+        post_save.connect(
+            changes.comment_saved, sender=Comment,
+            dispatch_uid="posts.changes.comment",
+        )
+        pre_save.connect(
+            changes.remember_slug, sender=Group,
+            dispatch_uid="posts.changes.group.pre",
+        )
+        for signal, name in ((post_save, "save"), (post_delete, "delete")):
+            signal.connect(
+                changes.group_saved, sender=Group,
+                dispatch_uid=f"posts.changes.group.{name}",
+            )
+            signal.connect(
+                changes.follow_saved, sender=Follow,
+                dispatch_uid=f"posts.changes.follow.{name}",
+            )
+        # приёмник в модуле называется так же, как сигнал
+        subscribers = (
+            ("post_changed", (rings, publisher, surrogate, unread)),
+            ("comment_added", (rings, publisher, surrogate)),
+            ("group_changed", (rings, publisher, surrogate)),
+            ("follow_changed", (publisher, surrogate, unread)),
+            ("everything_changed", (rings, publisher, surrogate, unread)),
+        )
+        for name, modules in subscribers:
+            for module in modules:
+                getattr(changes, name).connect(
+                    getattr(module, name),
+                    dispatch_uid=f"{module.__name__}.{name}",
+                )
+        post_save.connect(
+            events.post_saved, sender=Post, dispatch_uid="posts.events.save"
+        )
+        # готовые статические страницы posts.flatpages
+        post_save.connect(
+            flatpages.pages.clear, sender=FlatPage,
+            dispatch_uid="posts.flatpages.save",
+        )
+        post_delete.connect(
+            flatpages.pages.clear, sender=FlatPage,
+            dispatch_uid="posts.flatpages.delete",
+        )
+        m2m_changed.connect(
+            flatpages.pages.clear, sender=FlatPage.sites.through,
+            dispatch_uid="posts.flatpages.sites",
+        )
@@ -0,0 +1,100 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import changes, feeds, sharding
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Post, TagIndex
+)
+
+
+def horizon(days=None):
+    """Граница архива: посты старше неё уходят в холодные таблицы."""
+    if days is None:
+        days = getattr(settings, "ARCHIVE_AFTER_DAYS", 365)
+    return timezone.now() - timedelta(days=days)
+
+
+def copy(model, obj):
+    """Копия строки в архивную модель с тем же id и значениями полей."""
+    return model(**{
+        field.attname: getattr(obj, field.attname)
+        for field in model._meta.concrete_fields
+    })
+
+
+def shift_counters(counts):
+    by_delta = defaultdict(list)
+    for key, n in counts.items():
+        by_delta[n].append(key)
+    for delta, keys in by_delta.items():
+        feeds.shift(keys, delta)
+
+
+def archive_batch(alias, cutoff, batch_size=500):
+    """Переносит одну пачку старых постов шарда alias вместе с
+    комментариями. Возвращает число перенесённых постов.
+
+    Копия пишется в default, затем пост на шарде получает надгробие и
+    удаляется в одной транзакции. Упади перенос между шагами, повтор
+    найдёт те же посты и пропустит уже скопированные строки.
+    """
+    posts = list(
+        Post.objects.using(alias)
+        .filter(pub_date__lt=cutoff)
+        .order_by("pk")[:batch_size]
+    )
+    if not posts:
+        return 0
+    ids = [post.pk for post in posts]
+    comments = Comment.objects.using(alias).filter(post_id__in=ids)
+
+    with transaction.atomic(using="default"):
+        existing = set(
+            ArchivedPost.objects.filter(pk__in=ids)
+            .values_list("pk", flat=True)
+        )
+        fresh = [post for post in posts if post.pk not in existing]
+        ArchivedPost.objects.bulk_create(
+            [copy(ArchivedPost, post) for post in fresh]
+        )
+        ArchivedComment.objects.bulk_create(
+            [copy(ArchivedComment, comment) for comment in comments],
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+        shift_counters(Counter(
+            feeds.archive_key(post.author_id) for post in fresh
+        ))
+        TagIndex.objects.filter(post_id__in=ids).delete()
+
+    with transaction.atomic(using=alias):
+        marked = Post.all_objects.using(alias).filter(pk__in=ids)
+        marked.update(deleted=True)
+        # одним DELETE: иначе каскад постов загрузил бы все комментарии
+        Comment.objects.using(alias).filter(post_id__in=ids).delete()
+        # надгробие: сигнал post_deleted не трогает счётчики по одному
+        marked.delete()
+    hot = Counter(key for post in posts for key in feeds.keys_for(post))
+    shift_counters({key: -n for key, n in hot.items()})
+    changes.invalidate_all()
+    return len(posts)
+
+
+def archive(days=None, batch_size=None, max_batches=None):
+    """Переносит в архив всё старше горизонта, пачка за пачкой.
+    max_batches ограничивает один запуск: остальное — в следующий."""
+    cutoff = horizon(days)
+    batch_size = batch_size or getattr(settings, "ARCHIVE_BATCH_SIZE", 500)
+    moved = 0
+    batches = 0
+    for alias in sharding.shards() or ("default",):
+        while max_batches is None or batches < max_batches:
+            done = archive_batch(alias, cutoff, batch_size)
+            if not done:
+                break
+            moved += done
+            batches += 1
+    return moved
@@ -0,0 +1,355 @@
+import io
+import json
+import multiprocessing
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import Count
+from django.template.loader import get_template
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import urls as posts_urls
+from users import urls as users_urls
+from . import cards, tags
+from .models import Follow, Group, Post, Tag, User
+
+# Допуски по умолчанию: доля от базового значения для времени и памяти,
+# абсолютное число для запросов к базе.
+DEFAULT_TOLERANCE = {
+    "p50_ms": 0.25,
+    "p95_ms": 0.35,
+    "queries": 0,
+    "memory_kb": 0.20,
+}
+
+FOLLOW_TARGET = "bench_follow_target"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def url_patterns():
+    return [
+        pattern
+        for module in (posts_urls, users_urls)
+        for pattern in module.urlpatterns
+        if pattern.name
+    ]
+
+
+def url_names():
+    return [pattern.name for pattern in url_patterns()]
+
+
+def pick_fixtures():
+    """Выбирает самые «горячие» объекты, на которых и меряем страницы."""
+    author = (
+        User.objects.annotate(n=Count("posts")).order_by("-n", "pk").first()
+    )
+    post = (
+        author.posts.annotate(n=Count("comments"))
+        .order_by("-n", "-pk")
+        .first()
+    )
+    group = (
+        Group.objects.annotate(n=Count("posts")).order_by("-n", "pk").first()
+    )
+    viewer = (
+        User.objects.exclude(pk=author.pk)
+        .annotate(n=Count("follower"))
+        .order_by("-n", "pk")
+        .first()
+    )
+    target, _ = User.objects.get_or_create(username=FOLLOW_TARGET)
+    tag = (
+        Tag.objects.filter(kind=tags.HASHTAG)
+        .annotate(n=Count("entries"))
+        .order_by("-n", "pk")
+        .first()
+    )
+    return {
+        "tag": tag.name if tag else "bench",
+        "author": author,
+        "post": post,
+        "group": group,
+        "viewer": viewer,
+        "follow_target": target,
+    }
+
+
+def build_paths(fixtures):
+    """Подставляет в каждый url объекты по именам параметров."""
+    values = {
+        "username": fixtures["author"].username,
+        "post_id": fixtures["post"].pk,
+        "slug": fixtures["group"].slug,
+        "tag": fixtures["tag"],
+    }
+    # подписка меняет ленту зрителя, поэтому для неё отдельный автор
+    overrides = {
+        "profile_follow": {"username": fixtures["follow_target"].username},
+        "profile_unfollow": {"username": fixtures["follow_target"].username},
+    }
+    paths = {}
+    for pattern in url_patterns():
+        params = pattern.pattern.regex.groupindex
+        kwargs = {name: values[name] for name in params}
+        kwargs.update(overrides.get(pattern.name, {}))
+        paths[pattern.name] = reverse(pattern.name, kwargs=kwargs or None)
+    return paths
+
+
+def fetch(client, path):
+    # ответ закрывается, как его закрыл бы сервер: поток /follow/events/
+    # иначе держит место в posts.events.streams
+    response = client.get(path)
+    response.close()
+    return response
+
+
+def measure(client, path, repeat):
+    # Прогрев: шаблоны, кэш и идемпотентные побочные эффекты
+    # (подписка/отписка) не должны попадать в замер.
+    fetch(client, path)
+
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = fetch(client, path)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+
+    tracemalloc.start()
+    try:
+        fetch(client, path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "status": response.status_code,
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "queries": int(statistics.median(queries)),
+        "memory_kb": round(peak / 1024, 1),
+    }
+
+
+def feed_loaders(per_page):
+    """Страница общей ленты двумя путями: модели Post с автором и
+    группой, как раньше, и карточки posts.cards."""
+    return {
+        "models": lambda: list(
+            Post.objects.select_related("author", "group")
+            .order_by("-pub_date", "-id")[:per_page]
+        ),
+        "cards": lambda: cards.rows(Post.objects.all(), 0, per_page),
+    }
+
+
+def measure_rows(load, repeat=20):
+    """Выборка и отрисовка post_item.html для одной страницы ленты:
+    время каждой части, пик памяти и число живых объектов на строку."""
+    template = get_template("posts/includes/post_item.html")
+    load_ms = []
+    render_ms = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = load()
+        loaded = time.perf_counter()
+        for row in rows:
+            template.render({"post": row})
+        load_ms.append((loaded - started) * 1000)
+        render_ms.append((time.perf_counter() - loaded) * 1000)
+
+    tracemalloc.start()
+    try:
+        rows = load()
+        retained, peak = tracemalloc.get_traced_memory()
+        blocks = len(tracemalloc.take_snapshot().traces)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "rows": len(rows),
+        "load_ms": round(statistics.median(load_ms), 3),
+        "render_ms": round(statistics.median(render_ms), 3),
+        "peak_kb": round(peak / 1024, 1),
+        "retained_kb": round(retained / 1024, 1),
+        "blocks_per_row": round(blocks / max(len(rows), 1), 1),
+    }
+
+
+def run(repeat=20, names=None):
+    fixtures = pick_fixtures()
+    paths = build_paths(fixtures)
+    Follow.objects.filter(
+        user=fixtures["viewer"], author=fixtures["follow_target"]
+    ).delete()
+
+    anonymous = Client()
+    logged_in = Client()
+    logged_in.force_login(fixtures["viewer"])
+
+    results = {}
+    for mode, client in (("anonymous", anonymous), ("user", logged_in)):
+        for cache in caches.all():
+            cache.clear()
+        for name, path in paths.items():
+            if names and name not in names:
+                continue
+            results[f"{mode}:{name}"] = measure(client, path, repeat)
+    return results
+
+
+def compare(baseline, results, tolerance=None):
+    """Возвращает список регрессий относительно сохранённого замера."""
+    tolerance = {**DEFAULT_TOLERANCE, **(tolerance or {})}
+    regressions = []
+    for key, metrics in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric, allowed in tolerance.items():
+            if metric not in base or metric not in metrics:
+                continue
+            if metric == "queries":
+                limit = base[metric] + allowed
+            else:
+                limit = base[metric] * (1 + allowed)
+            if metrics[metric] > limit:
+                regressions.append(
+                    f"{key}: {metric} {metrics[metric]} > {base[metric]} "
+                    f"(допуск {allowed})"
+                )
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, ensure_ascii=False, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+def seed(users, posts, comments):
+    """Наполняет текущую базу через seed_data, без вывода в консоль."""
+    call_command(
+        "seed_data", users=users, posts=posts, comments=comments,
+        stdout=io.StringIO(),
+    )
+
+
+def run_threads(roles, duration):
+    """Гоняет роли в потоках заданное время.
+
+    roles: список (имя, число потоков, фабрика), фабрика вызывается в
+    потоке и возвращает функцию одной операции. Ошибкой считается
+    исключение или ответ 5xx.
+    """
+    stats = {
+        name: {"ops": 0, "errors": 0, "timings": [], "kinds": Counter()}
+        for name, _, _ in roles
+    }
+    barrier = threading.Barrier(sum(count for _, count, _ in roles) + 1)
+    deadline = []
+
+    def worker(name, factory):
+        operation = factory()
+        local = stats[name]
+        barrier.wait()
+        try:
+            while time.perf_counter() < deadline[0]:
+                started = time.perf_counter()
+                try:
+                    status = operation()
+                except Exception as exc:
+                    local["errors"] += 1
+                    kind = f"{type(exc).__name__}: {exc}".splitlines()[0]
+                    local["kinds"][kind[:80]] += 1
+                    continue
+                local["timings"].append(
+                    (time.perf_counter() - started) * 1000
+                )
+                if status is not None and status >= 500:
+                    local["errors"] += 1
+                    local["kinds"][f"HTTP {status}"] += 1
+                else:
+                    local["ops"] += 1
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=worker, args=(name, factory))
+        for name, count, factory in roles
+        for _ in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline.append(time.perf_counter() + duration)
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+
+    report = {}
+    for name, local in stats.items():
+        timings = local["timings"]
+        report[name] = {
+            "ops": local["ops"],
+            "ops_per_sec": round(local["ops"] / duration, 1),
+            "errors": local["errors"],
+            "p95_ms": round(percentile(timings, 0.95), 2) if timings else None,
+            "error_kinds": dict(local["kinds"]),
+        }
+    return report
+
+
+def run_processes(name, count, factory, duration):
+    """То же, что run_threads, но каждый исполнитель — отдельный процесс:
+    запись в SQLite упирается в блокировку файла, а не в GIL."""
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    connections.close_all()
+
+    def target():
+        queue.put(run_threads([(name, 1, factory)], duration)[name])
+
+    processes = [context.Process(target=target) for _ in range(count)]
+    for process in processes:
+        process.start()
+    parts = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    kinds = Counter()
+    for part in parts:
+        kinds.update(part["error_kinds"])
+    timings = [part["p95_ms"] for part in parts if part["p95_ms"] is not None]
+    ops = sum(part["ops"] for part in parts)
+    return {name: {
+        "ops": ops,
+        "ops_per_sec": round(ops / duration, 1),
+        "errors": sum(part["errors"] for part in parts),
+        "p95_ms": max(timings) if timings else None,
+        "error_kinds": dict(kinds),
+    }}
@@ -0,0 +1,205 @@
+from django.utils.safestring import mark_safe
+
+from . import rendering, sharding
+from .models import Group, User
+
+FIELDS = (
+    "id", "text", "text_html", "render_version", "pub_date", "image",
+    "author_id", "group_id", "comment_count", "version",
+)
+JOINED = ("author__username", "group__slug", "group__title")
+
+
+class Author:
+    """Автор на карточке: только то, что выводит post_item.html.
+    Равен пользователю с тем же id, как и сам User."""
+
+    __slots__ = ("id", "username")
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __eq__(self, other):
+        if isinstance(other, (Author, User)):
+            return self.id == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return self.username
+
+
+class GroupRef:
+    __slots__ = ("id", "slug", "title")
+
+    def __init__(self, id, slug, title):
+        self.id = id
+        self.slug = slug
+        self.title = title
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __eq__(self, other):
+        if isinstance(other, (GroupRef, Group)):
+            return self.id == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return self.title
+
+
+class Card:
+    """Строка ленты вместо экземпляра Post: id, текст с готовым HTML,
+    дата, автор, группа, имя картинки и число комментариев — всё, что
+    выводит post_item.html, — версия поста для кэша карточек и признак
+    архивного поста (ArchivedPost только читается)."""
+
+    __slots__ = (
+        "id", "text", "html", "pub_date", "image", "author", "group",
+        "comment_count", "version", "archived",
+    )
+
+    def __init__(self, id, text, html, pub_date, image, author, group,
+                 comment_count=0, version=0, archived=False):
+        self.id = id
+        self.text = text
+        self.html = html
+        self.pub_date = pub_date
+        self.image = image
+        self.author = author
+        self.group = group
+        self.comment_count = comment_count
+        self.version = version
+        self.archived = archived
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def author_id(self):
+        return self.author.id
+
+    @property
+    def group_id(self):
+        return self.group and self.group.id
+
+    @property
+    def sort_key(self):
+        return (self.pub_date, self.id)
+
+    def __repr__(self):
+        return f"<Card {self.id}>"
+
+
+def html(text, text_html, render_version):
+    if render_version != rendering.RENDERER_VERSION:
+        return rendering.render(text)
+    return mark_safe(text_html)
+
+
+def from_post(post):
+    group = post.group
+    return Card(
+        post.pk, post.text, post.html, post.pub_date, post.image.name or "",
+        Author(post.author_id, post.author.username),
+        group and GroupRef(group.pk, group.slug, group.title),
+        post.comment_count, post.version, getattr(post, "archived", False),
+    )
+
+
+def rows(queryset, start=0, stop=None):
+    """Карточки из queryset постов: один SELECT только по нужным
+    столбцам. На шардах авторы и группы живут в default, поэтому они
+    подтягиваются отдельными запросами."""
+    joined = not sharding.enabled()
+    archived = getattr(queryset.model, "archived", False)
+    values = list(
+        queryset.order_by("-pub_date", "-id")
+        .values_list(*FIELDS, *(JOINED if joined else ()))[start:stop]
+    )
+    if joined:
+        authors = groups = None
+    else:
+        authors = dict(
+            User.objects.filter(pk__in={row[6] for row in values})
+            .values_list("id", "username")
+        )
+        groups = {
+            pk: (slug, title) for pk, slug, title in
+            Group.objects.filter(pk__in={row[7] for row in values})
+            .values_list("id", "slug", "title")
+        }
+
+    cards = []
+    for row in values:
+        (pk, text, text_html, render_version, pub_date, image, author_id,
+         group_id, comment_count, version) = row[:10]
+        if joined:
+            username, slug, title = row[10:]
+        else:
+            username = authors.get(author_id, "")
+            slug, title = groups.get(group_id, (None, None))
+        cards.append(Card(
+            pk, text, html(text, text_html, render_version), pub_date,
+            image or "", Author(author_id, username),
+            GroupRef(group_id, slug, title) if group_id else None,
+            comment_count, version, archived,
+        ))
+    return cards
+
+
+class CardFeed:
+    """Лента карточек поверх ленты постов — queryset или сбора с шардов.
+    Подходит Paginator'у и feeds.Chain: есть count() и срезы."""
+
+    ordered = True
+
+    def __init__(self, feed):
+        self.feed = feed
+
+    def count(self):
+        return self.feed.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if key.step is not None:
+            raise ValueError("Шаг среза не поддерживается")
+        start = key.start or 0
+        if not isinstance(self.feed, sharding.ScatterGather):
+            return rows(self.feed, start, key.stop)
+        merged = [
+            card for queryset in self.feed.querysets.values()
+            for card in rows(queryset, 0, key.stop)
+        ]
+        merged.sort(key=lambda card: card.sort_key, reverse=True)
+        return merged[start:key.stop]
+
+
+def by_ids(queryset, ids):
+    """Карточки постов по списку id в том же порядке (лента тегов)."""
+    if sharding.enabled():
+        found = {
+            card.id: card
+            for alias in sharding.shards()
+            for card in rows(queryset.using(alias).filter(pk__in=ids))
+        }
+    else:
+        found = {card.id: card for card in rows(queryset.filter(pk__in=ids))}
+    return [found[pk] for pk in ids if pk in found]
@@ -0,0 +1,81 @@
+"""Одна рассылка «содержимое изменилось».
+
+Сигналы моделей разбираются здесь один раз и расходятся сигналами
+модуля. На них подписаны кэши и производные данные: кольца лент
+(posts.rings), статические страницы (posts.publisher), прокси
+(posts.surrogate) и счётчики непрочитанного (posts.unread). Массовые
+правки мимо сигналов моделей зовут invalidate_all().
+"""
+from django.dispatch import Signal
+
+from .models import Group, Post
+
+# пост появился, изменился или пропал из лент (removed); old_group_id —
+# группа до правки, у нового и удалённого поста равна текущей
+post_changed = Signal(
+    providing_args=["post", "created", "removed", "old_group_id", "using"]
+)
+comment_added = Signal(providing_args=["comment", "using"])
+# slugs — текущий и прежний адрес группы
+group_changed = Signal(providing_args=["group", "slugs"])
+follow_changed = Signal(providing_args=["follow"])
+everything_changed = Signal(providing_args=["using"])
+
+
+def post_removed(post, using=None):
+    """Пост пропал из лент: удалён или получил надгробие."""
+    post_changed.send(
+        Post, post=post, created=False, removed=True,
+        old_group_id=post.group_id, using=using or post._state.db,
+    )
+
+
+def invalidate_all(using=None):
+    """После массовых правок мимо сигналов: всё производное строится
+    заново."""
+    everything_changed.send(None, using=using)
+
+
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.deleted:
+        return
+    post_changed.send(
+        sender, post=instance, created=created, removed=False,
+        old_group_id=getattr(instance, "_saved_group_id", instance.group_id),
+        using=instance._state.db,
+    )
+
+
+def post_deleted(sender, instance, **kwargs):
+    # о надгробии уже разослал posts.deletion
+    if not instance.deleted:
+        post_removed(instance)
+
+
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw and created:
+        comment_added.send(
+            sender, comment=instance, using=instance._state.db
+        )
+
+
+def remember_slug(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._saved_slug = (
+        Group.objects.filter(pk=instance.pk)
+        .values_list("slug", flat=True)
+        .first()
+    )
+
+
+def group_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    slugs = {instance.slug, getattr(instance, "_saved_slug", None)} - {None}
+    group_changed.send(sender, group=instance, slugs=slugs)
+
+
+def follow_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        follow_changed.send(sender, follow=instance)
@@ -0,0 +1,109 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+logger = logging.getLogger("posts.counters")
+
+
+class ViewCounterBuffer:
+    """Копит просмотры постов в памяти процесса и пишет их пачкой.
+
+    Сброс — один UPDATE ... CASE на базу в одной транзакции: по размеру
+    буфера (flush_size разных постов), по таймеру (flush_interval секунд)
+    и при выходе процесса. Если процесс убит жёстко, теряются просмотры
+    не более чем за flush_interval секунд (или flush_size постов).
+    При ошибке записи пачка возвращается в буфер и уйдёт со следующей.
+    """
+
+    def __init__(self, flush_interval=None, flush_size=None):
+        self.flush_interval = flush_interval or getattr(
+            settings, "VIEW_COUNTER_FLUSH_INTERVAL", 5.0
+        )
+        self.flush_size = flush_size or getattr(
+            settings, "VIEW_COUNTER_FLUSH_SIZE", 500
+        )
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, post, amount=1):
+        key = (post._state.db or "default", post.pk)
+        with self._lock:
+            self._pending[key] += amount
+            full = len(self._pending) >= self.flush_size
+            if self._timer is None:
+                self._start_timer()
+        if full:
+            self.flush()
+
+    def pending(self, post):
+        return self._pending.get((post._state.db or "default", post.pk), 0)
+
+    def clear(self):
+        """Выбрасывает буфер без записи (тесты: база уже удалена)."""
+        with self._lock:
+            self._pending.clear()
+
+    def flush(self):
+        from .models import Post
+
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+        if not batch:
+            return 0
+
+        by_alias = defaultdict(lambda: defaultdict(list))
+        for (alias, pk), amount in batch.items():
+            if alias not in connections.databases:
+                # база исчезла из настроек (временный шард) — писать некуда
+                continue
+            by_alias[alias][amount].append(pk)
+
+        written = Counter()
+        try:
+            for alias, groups in by_alias.items():
+                ids = [pk for pks in groups.values() for pk in pks]
+                increment = Case(
+                    *[When(pk__in=pks, then=Value(amount))
+                      for amount, pks in groups.items()],
+                    default=Value(0),
+                    output_field=PositiveIntegerField(),
+                )
+                with transaction.atomic(using=alias):
+                    Post.objects.using(alias).filter(pk__in=ids).update(
+                        views=F("views") + increment
+                    )
+                written.update({
+                    (alias, pk): amount
+                    for amount, pks in groups.items() for pk in pks
+                })
+        except Exception:
+            logger.exception("Не удалось записать просмотры, вернём в буфер")
+            with self._lock:
+                self._pending.update(batch - written)
+            return sum(written.values())
+        return sum(batch.values())
+
+    def _start_timer(self):
+        def tick():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Ошибка сброса просмотров по таймеру")
+
+        self._timer = threading.Thread(
+            target=tick, name="view-counter-flush", daemon=True
+        )
+        self._timer.start()
+
+
+post_views = ViewCounterBuffer()
+atexit.register(post_views.flush)
@@ -0,0 +1,39 @@
+import base64
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode(moment, pk):
+    raw = f"{moment.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        moment, pk = raw.decode().split("|")
+        moment = parse_datetime(moment)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    if moment is None:
+        raise InvalidCursor(cursor)
+    return moment, pk
+
+
+def after(queryset, cursor, field, descending=False, key="pk"):
+    """Строки строго после курсора (field, key) — условие для
+    keyset-пагинации, которое закрывается составным индексом."""
+    if not cursor:
+        return queryset
+    moment, pk = decode(cursor)
+    op = "lt" if descending else "gt"
+    return queryset.filter(
+        Q(**{f"{field}__{op}": moment})
+        | Q(**{field: moment, f"{key}__{op}": pk})
+    )
@@ -0,0 +1,8 @@
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Применяет PRAGMAS из DATABASES[alias] к каждому новому соединению."""
+    if connection.vendor != "sqlite":
+        return
+    pragmas = connection.settings_dict.get("PRAGMAS") or {}
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from sorl.thumbnail import delete as delete_thumbnails
+
+from . import changes, feeds, sharding, tasks
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, FeedCounter, Follow, Post,
+    TagIndex, User
+)
+
+
+def batch_size():
+    return getattr(settings, "DELETION_BATCH_SIZE", 500)
+
+
+def delete_post(post):
+    """Надгробие на пост: он сразу исчезает из лент и счётчиков, а
+    комментарии, файлы и саму строку удаляет задача purge_posts."""
+    alias = post._state.db or "default"
+    marked = Post.all_objects.using(alias).filter(
+        pk=post.pk, deleted=False
+    ).update(deleted=True)
+    if not marked:
+        return
+    feeds.shift(feeds.keys_for(post), -1)
+    changes.post_removed(post, using=alias)
+    TagIndex.objects.using("default").filter(post_id=post.pk).delete()
+    tasks.enqueue("purge_posts", alias=alias, post_ids=[post.pk])
+
+
+def delete_user(user):
+    """Блокирует пользователя и одним UPDATE на шард хоронит его посты;
+    всё остальное удаляет задача purge_user пачками."""
+    user.is_active = False
+    user.save(update_fields=["is_active"])
+    total = 0
+    for alias in sharding.shards() or ("default",):
+        posts = Post.objects.using(alias).filter(author_id=user.pk)
+        with transaction.atomic(using=alias):
+            by_group = list(
+                posts.exclude(group=None).order_by()
+                .values_list("group_id").annotate(n=Count("pk"))
+            )
+            total += posts.update(deleted=True)
+        for group_id, n in by_group:
+            feeds.shift([feeds.group_key(group_id)], -n)
+    feeds.shift([feeds.ALL], -total)
+    changes.invalidate_all()
+    FeedCounter.objects.filter(key__in=[
+        feeds.author_key(user.pk), feeds.archive_key(user.pk)
+    ]).delete()
+    tasks.enqueue("purge_user", user_id=user.pk)
+
+
+def delete_batches(queryset, limit=None):
+    """Удаляет строки queryset пачками по pk, каждая пачка — отдельная
+    короткая транзакция. Возвращает (удалено ли всё, сколько ушло
+    пачек); всё не удалено, если упёрлись в limit пачек."""
+    alias = queryset.db
+    manager = queryset.model._base_manager.using(alias)
+    last_id = 0
+    batches = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size()]
+        )
+        if not ids:
+            return True, batches
+        if limit is not None and batches >= limit:
+            return False, batches
+        last_id = ids[-1]
+        with transaction.atomic(using=alias):
+            manager.filter(pk__in=ids).delete()
+        batches += 1
+
+
+def purge_posts(alias, post_ids):
+    """Комментарии, индекс тегов, картинки с миниатюрами, затем посты.
+    Возвращает число удалённых пачек."""
+    batches = 0
+    for start in range(0, len(post_ids), batch_size()):
+        ids = post_ids[start:start + batch_size()]
+        batches += delete_batches(
+            Comment.objects.using(alias).filter(post_id__in=ids)
+        )[1]
+        TagIndex.objects.using("default").filter(post_id__in=ids).delete()
+        posts = Post.all_objects.using(alias).filter(pk__in=ids)
+        for post in posts.only("pk", "image"):
+            if post.image:
+                delete_thumbnails(post.image)
+        with transaction.atomic(using=alias):
+            posts.delete()
+        batches += 1
+    return batches
+
+
+def delete_comments(posts, comments, user_id, limit):
+    """Комментарии пользователя под чужими постами; у этих постов
+    пересчитывается comment_count, даже если пачки кончились на полпути.
+    Возвращает то же, что delete_batches."""
+    comments = comments.filter(author_id=user_id)
+    touched = list(comments.values_list("post_id", flat=True).distinct())
+    result = delete_batches(comments, limit=limit)
+    feeds.recount_comments(
+        posts.filter(pk__in=touched), comments.model.objects.all()
+    )
+    return result
+
+
+def purge_user(user_id):
+    """Один шаг удаления пользователя: не больше DELETION_BATCHES_PER_TASK
+    пачек, дальше задача ставит сама себя заново. Возвращает True, когда
+    пользователь удалён целиком."""
+    budget = getattr(settings, "DELETION_BATCHES_PER_TASK", 20)
+
+    def spend(result):
+        nonlocal budget
+        done, used = result
+        budget -= used
+        return done
+
+    for alias in sharding.shards() or ("default",):
+        # комментарии под постами пользователя — заранее и в счёт пачек,
+        # чтобы purge_posts не удалял их без ограничения
+        comments = Comment.objects.using(alias)
+        if not spend(delete_batches(
+            comments.filter(post__author_id=user_id), limit=budget
+        )):
+            return False
+        posts = Post.all_objects.using(alias).filter(author_id=user_id)
+        while True:
+            ids = list(
+                posts.order_by("pk").values_list("pk", flat=True)
+                [:batch_size()]
+            )
+            if not ids:
+                break
+            if budget <= 0:
+                return False
+            budget -= purge_posts(alias, ids)
+        if not spend(delete_comments(
+            Post.all_objects.using(alias), comments, user_id, budget
+        )):
+            return False
+    comments = ArchivedComment.objects.using("default")
+    posts = ArchivedPost.objects.using("default")
+    if not spend(delete_comments(posts, comments, user_id, budget)):
+        return False
+    posts = posts.filter(author_id=user_id)
+    for post in posts.exclude(image="").exclude(image=None).only("image"):
+        delete_thumbnails(post.image)
+    archived = (comments.filter(post__author_id=user_id), posts)
+    for queryset in archived:
+        if not spend(delete_batches(queryset, limit=budget)):
+            return False
+    for field in ("user_id", "author_id"):
+        follows = Follow.objects.using("default").filter(**{field: user_id})
+        if not spend(delete_batches(follows, limit=budget)):
+            return False
+    User.objects.filter(pk=user_id).delete()
+    # числа комментариев под чужими постами
+    changes.invalidate_all()
+    return True
@@ -0,0 +1,269 @@
+"""Поток новых постов для ленты подписок (Server-Sent Events).
+
+Сохранение нового поста пишет строку в журнал PostEvent. В каждом
+процессе один Broker читает журнал не чаще раза в EVENTS_POLL_INTERVAL
+секунд и будит все соединения процесса: ждущие соединения в базу не
+ходят. Свой процесс узнаёт о посте сразу, остальные — на следующем
+чтении журнала. Клиент переподключается с Last-Event-ID и получает
+пропущенное из журнала.
+
+Каждое соединение держит поток воркера все EVENTS_MAX_AGE секунд, поэтому
+соединений в процессе не больше EVENTS_MAX_STREAMS: сверх них клиент
+получает 503 и приходит позже. Держать много соединений можно только
+под потоковым (gunicorn --threads) или gevent-воркером.
+"""
+import json
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import PostEvent
+
+TEXT_LENGTH = 200
+# сколько последних событий держит Broker и отдаёт догоняющий клиент
+BUFFER = 1000
+# как часто процесс чистит журнал от старых событий, секунды
+TRIM_INTERVAL = 3600
+# через сколько миллисекунд браузер переподключается после разрыва
+RETRY_MS = 3000
+
+
+def enabled():
+    return getattr(settings, "FOLLOW_EVENTS", True)
+
+
+def journal():
+    # журнал читается из основной базы: на реплике он отстаёт
+    return PostEvent.objects.using("default")
+
+
+def payload(post):
+    """Сжатая карточка поста для клиента."""
+    username = post.author.username
+    return json.dumps({
+        "id": post.pk,
+        "author": username,
+        "text": post.text[:TEXT_LENGTH],
+        "pub_date": post.pub_date.isoformat(),
+        "url": reverse(
+            "post", kwargs={"username": username, "post_id": post.pk}
+        ),
+    }, ensure_ascii=False)
+
+
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or not created or not enabled():
+        return
+    data = payload(instance)
+
+    def publish():
+        journal().create(
+            post_id=instance.pk, author_id=instance.author_id, payload=data
+        )
+        broker.wake()
+
+    transaction.on_commit(publish, using=instance._state.db)
+
+
+def trim():
+    """Удаляет события старше EVENTS_KEEP_HOURS: дальше клиент не
+    догоняет поток, а просто перезагружает ленту."""
+    hours = getattr(settings, "EVENTS_KEEP_HOURS", 24)
+    return journal().filter(
+        created__lt=timezone.now() - timedelta(hours=hours)
+    ).delete()[0]
+
+
+class Broker:
+    """Последние события журнала в памяти процесса.
+
+    Отдельного потока нет: журнал читает то соединение, которое первым
+    заметило, что чтение пора повторить, остальные ждут на общем
+    Condition. Так запросов к базе не больше одного на интервал, сколько
+    бы соединений ни висело.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=BUFFER)
+        self._last = None
+        self._polled = 0.0
+        self._polling = False
+        self._trimmed = time.monotonic()
+
+    @property
+    def interval(self):
+        return getattr(settings, "EVENTS_POLL_INTERVAL", 1.0)
+
+    def last_id(self):
+        """id последнего события журнала: с него начинает новое
+        соединение."""
+        with self._condition:
+            if self._last is not None:
+                return self._last
+        last = journal().order_by("-pk").values_list("pk", flat=True).first()
+        with self._condition:
+            if self._last is None:
+                self._last = last or 0
+                self._polled = time.monotonic()
+            return self._last
+
+    def wake(self):
+        """В этом процессе записано событие: прочитать журнал сразу."""
+        with self._condition:
+            self._polled = 0.0
+            self._condition.notify_all()
+
+    def poll(self):
+        after = self.last_id()
+        rows = list(
+            journal().filter(pk__gt=after).order_by("pk")
+            .values_list("pk", "author_id", "payload")[:BUFFER]
+        )
+        with self._condition:
+            for row in rows:
+                if row[0] > self._last:
+                    self._events.append(row)
+                    self._last = row[0]
+        if time.monotonic() - self._trimmed > TRIM_INTERVAL:
+            self._trimmed = time.monotonic()
+            trim()
+
+    def wait(self, after, timeout):
+        """События (id, автор, payload) новее after. Пустой список —
+        за timeout секунд ничего не пришло."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._condition:
+                events = [row for row in self._events if row[0] > after]
+                now = time.monotonic()
+                if events or now >= deadline:
+                    return events
+                due = self._polled + self.interval - now
+                if self._polling or due > 0:
+                    pause = due if due > 0 else self.interval
+                    self._condition.wait(min(pause, deadline - now))
+                    continue
+                self._polling = True
+            try:
+                self.poll()
+            finally:
+                with self._condition:
+                    self._polling = False
+                    self._polled = time.monotonic()
+                    self._condition.notify_all()
+
+    def clear(self):
+        with self._condition:
+            self._events.clear()
+            self._last = None
+            self._polled = 0.0
+
+
+broker = Broker()
+
+
+class Streams:
+    """Счётчик открытых соединений процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = 0
+
+    @property
+    def limit(self):
+        return getattr(settings, "EVENTS_MAX_STREAMS", 10)
+
+    def acquire(self):
+        with self._lock:
+            if self._open >= self.limit:
+                return False
+            self._open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._open -= 1
+
+
+streams = Streams()
+
+
+class Stream:
+    """Тело ответа, которое держит место в streams до закрытия ответа.
+
+    Закрывает его сервер (или StreamingHttpResponse.close()), даже если
+    тело так и не начали читать."""
+
+    def __init__(self, body):
+        self._body = body
+        self._closed = False
+
+    def __iter__(self):
+        return self._body
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._body.close()
+            streams.release()
+
+
+def open_stream(authors, last_event_id=None):
+    """Stream для подписчика или None, если соединений в процессе уже
+    EVENTS_MAX_STREAMS."""
+    if not streams.acquire():
+        return None
+    return Stream(stream(authors, last_event_id))
+
+
+def message(rows):
+    posts = ",".join(row[2] for row in rows)
+    data = f'{{"count": {len(rows)}, "posts": [{posts}]}}'
+    return f"id: {rows[-1][0]}\nevent: posts\ndata: {data}\n\n"
+
+
+def stream(authors, last_event_id=None):
+    """Тело ответа text/event-stream для подписчика авторов authors.
+
+    Соединение живёт EVENTS_MAX_AGE секунд, пустые паузы заполняются
+    комментарием раз в EVENTS_HEARTBEAT секунд. После разрыва браузер
+    сам приходит снова с Last-Event-ID."""
+    authors = set(authors)
+    heartbeat = getattr(settings, "EVENTS_HEARTBEAT", 15)
+    deadline = time.monotonic() + getattr(settings, "EVENTS_MAX_AGE", 300)
+    cursor = broker.last_id()
+    yield f"retry: {RETRY_MS}\n\n"
+    if last_event_id is not None and authors:
+        missed = list(
+            journal().filter(pk__gt=last_event_id, author_id__in=authors)
+            .order_by("pk")
+            .values_list("pk", "author_id", "payload")[:BUFFER]
+        )
+        if missed:
+            cursor = max(cursor, missed[-1][0])
+            yield message(missed)
+    sent = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            return
+        rows = broker.wait(
+            cursor, min(max(sent + heartbeat - now, 0), deadline - now)
+        )
+        if rows:
+            cursor = rows[-1][0]
+        mine = [row for row in rows if row[1] in authors]
+        if mine:
+            yield message(mine)
+            sent = time.monotonic()
+        elif time.monotonic() - sent >= heartbeat:
+            # комментарий не даёт прокси закрыть молчащее соединение
+            yield ": ping\n\n"
+            sent = time.monotonic()
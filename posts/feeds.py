@@ -0,0 +1,226 @@
+from collections import Counter
+
+from django.core.paginator import Page, Paginator
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import changes, sharding
+from .models import ArchivedPost, FeedCounter, Post
+
+ALL = "all"
+
+
+def group_key(group_id):
+    return f"group:{group_id}"
+
+
+def author_key(author_id):
+    return f"author:{author_id}"
+
+
+def archive_key(author_id):
+    return f"archive:author:{author_id}"
+
+
+def keys_for(post, group_id=None):
+    group_id = post.group_id if group_id is None else group_id
+    keys = [ALL, author_key(post.author_id)]
+    if group_id is not None:
+        keys.append(group_key(group_id))
+    return keys
+
+
+def count(key, queryset):
+    """Число постов ленты из счётчика. Счётчика ещё нет — считаем
+    COUNT(*) один раз и запоминаем; расхождения чинит recount_feeds."""
+    value = (
+        FeedCounter.objects.filter(key=key)
+        .values_list("count", flat=True)
+        .first()
+    )
+    if value is None:
+        value = queryset.count()
+        FeedCounter.objects.get_or_create(key=key, defaults={"count": value})
+    return value
+
+
+def shift(keys, delta):
+    FeedCounter.objects.filter(key__in=keys).update(count=F("count") + delta)
+
+
+def page_number(number):
+    try:
+        return max(int(number), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def page(rows, number, per_page, count):
+    """Страница из уже прочитанных строк (кольца posts.rings). count
+    равен None — строки читаются, как в paginate без подсчёта."""
+    paginator = Paginator(rows, per_page)
+    if count is None:
+        return uncounted(rows, number, paginator)
+    paginator.count = count
+    return Page(rows, number, paginator), paginator
+
+
+def paginate(object_list, number, per_page, count=None):
+    """Paginator и Page для ленты.
+
+    count задан — он подставляется в пагинатор вместо COUNT(*). count
+    равен None — режим без подсчёта: читается per_page + 1 строка, и
+    пагинатор знает только, есть ли соседние страницы. Номер за концом
+    ленты, как и get_page, даёт последнюю страницу: только тогда посты
+    считаются.
+    """
+    paginator = Paginator(object_list, per_page)
+    if count is not None:
+        paginator.count = count
+        return paginator.get_page(number), paginator
+
+    number = page_number(number)
+    bottom = (number - 1) * per_page
+    rows = list(object_list[bottom:bottom + per_page + 1])
+    if not rows and number > 1:
+        return paginator.get_page(number), paginator
+    return uncounted(rows, number, paginator)
+
+
+def uncounted(rows, number, paginator):
+    """Страница без подсчёта: rows — до per_page + 1 строк с её начала.
+    num_pages выходит number + 1, если строка сверх страницы нашлась,
+    поэтому counted = False: номеров страниц шаблон не показывает."""
+    per_page = paginator.per_page
+    paginator.count = (number - 1) * per_page + len(rows)
+    paginator.counted = False
+    return Page(rows[:per_page], number, paginator), paginator
+
+
+class Chain:
+    """Лента из нескольких частей подряд: горячие посты автора, затем
+    его архив. Часть — пара (queryset, ключ счётчика или None).
+
+    Срез читает части по очереди; размер части нужен, только если
+    страница начинается целиком за её концом.
+    """
+
+    ordered = True
+
+    def __init__(self, *parts):
+        self.parts = parts
+        self.sizes = [None] * len(parts)
+
+    def size(self, index):
+        if self.sizes[index] is None:
+            queryset, key = self.parts[index]
+            self.sizes[index] = (
+                count(key, queryset) if key else queryset.count()
+            )
+        return self.sizes[index]
+
+    def count(self):
+        return sum(self.size(index) for index in range(len(self.parts)))
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if key.step is not None:
+            raise ValueError("Шаг среза не поддерживается")
+        start, stop = key.start or 0, key.stop
+        rows = []
+        offset = 0
+        for index, (queryset, _) in enumerate(self.parts):
+            low = max(start - offset, 0)
+            high = None if stop is None else stop - offset
+            if high is not None and high <= low:
+                break
+            part = list(queryset[low:high])
+            rows.extend(part)
+            if high is not None and len(part) == high - low:
+                break
+            # часть кончилась: её размер виден по самой выборке
+            if part or not low:
+                offset += low + len(part)
+            else:
+                offset += self.size(index)
+        return rows
+
+
+def remember_group(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._saved_group_id = (
+        Post.objects.using(instance._state.db or "default")
+        .filter(pk=instance.pk)
+        .values_list("group_id", flat=True)
+        .first()
+    )
+
+
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        shift(keys_for(instance), 1)
+        return
+    old = getattr(instance, "_saved_group_id", instance.group_id)
+    if old != instance.group_id:
+        if old is not None:
+            shift([group_key(old)], -1)
+        if instance.group_id is not None:
+            shift([group_key(instance.group_id)], 1)
+
+
+def post_deleted(sender, instance, **kwargs):
+    # пост с надгробием уже вычтен из счётчиков в posts.deletion
+    if not instance.deleted:
+        shift(keys_for(instance), -1)
+
+
+def recount():
+    """Пересчитывает все счётчики заново: после массовых вставок и
+    переносов, которые минуют сигналы."""
+    totals = Counter()
+    for alias in sharding.shards() or ("default",):
+        posts = Post.objects.using(alias).order_by()
+        totals[ALL] += posts.count()
+        for field, key in (("author_id", author_key), ("group_id", group_key)):
+            rows = (
+                posts.exclude(**{field: None})
+                .values_list(field)
+                .annotate(n=Count("pk"))
+            )
+            for value, n in rows:
+                totals[key(value)] += n
+    archived = (
+        ArchivedPost.objects.order_by()
+        .values_list("author_id")
+        .annotate(n=Count("pk"))
+    )
+    for author_id, n in archived:
+        totals[archive_key(author_id)] += n
+    with transaction.atomic():
+        FeedCounter.objects.all().delete()
+        FeedCounter.objects.bulk_create(
+            [FeedCounter(key=key, count=n) for key, n in totals.items()]
+        )
+    changes.invalidate_all()
+    return totals
+
+
+def recount_comments(posts, comments):
+    """Пересчитывает comment_count у постов одним UPDATE: после массовых
+    вставок и удалений комментариев мимо Comment.save."""
+    counts = (
+        comments.filter(post=OuterRef("pk")).order_by()
+        .values("post").annotate(n=Count("pk")).values("n")
+    )
+    return posts.update(
+        comment_count=Coalesce(Subquery(counts), 0),
+        version=F("version") + 1,
+    )
@@ -0,0 +1,69 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.flatpages import views
+from django.contrib.flatpages.models import FlatPage
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+
+class RenderedPages:
+    """Готовые байты статических страниц для анонимов в памяти процесса.
+
+    Сбрасывается сигналами FlatPage в том процессе, где страницу
+    изменили; остальные воркеры перечитают её не позже чем через
+    FLATPAGES_CACHE_TTL секунд.
+    """
+
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        entry = self._pages.get(url)
+        if entry is None:
+            return None
+        ttl = getattr(settings, "FLATPAGES_CACHE_TTL", 300)
+        if ttl is not None and time.monotonic() - entry[0] > ttl:
+            return None
+        return entry
+
+    def put(self, url, response):
+        body = response.content
+        etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+        entry = (time.monotonic(), body, response["Content-Type"], etag)
+        with self._lock:
+            self._pages[url] = entry
+        return entry
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._pages.clear()
+
+
+pages = RenderedPages()
+
+
+def flatpage(request, url):
+    """flatpages.views.flatpage с кэшем: повторный показ анониму не
+    трогает базу и шаблоны. Закрытые страницы и ответы вошедшим
+    пользователям собираются как обычно."""
+    if not url.startswith("/"):
+        url = "/" + url
+    if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+        return views.flatpage(request, url)
+
+    entry = pages.get(url)
+    if entry is None:
+        response = views.flatpage(request, url)
+        if response.status_code != 200:
+            return response
+        entry = pages.put(url, response)
+
+    _, body, content_type, etag = entry
+    response = HttpResponse(body, content_type=content_type)
+    response["ETag"] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
@@ -0,0 +1,50 @@
+"""Аренда строк очередей в базе: задач posts.tasks и писем users.outbox.
+
+Воркер помечает пачку готовых строк своей меткой и отодвигает их время
+готовности на срок аренды. Если воркер упадёт, строки вернутся в очередь,
+когда аренда истечёт. Неудачная попытка снимает аренду и откладывает
+строку с удвоением паузы, после limit попыток строка помечается failed.
+"""
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+
+MAX_DELAY = 3600
+
+
+def backoff(attempts, base):
+    """Пауза перед следующей попыткой: удваивается, но не больше часа."""
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), MAX_DELAY))
+
+
+def claim(ready, due_field, batch_size, lease, **fields):
+    """Берёт в аренду до batch_size строк ready в порядке due_field.
+    fields дописываются в тот же UPDATE (например, статус)."""
+    ids = list(
+        ready.order_by(due_field, "pk")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    ready.filter(pk__in=ids).update(
+        lease=token, **{due_field: timezone.now() + lease}, **fields
+    )
+    queue = ready.model._default_manager.using(ready.db)
+    return list(queue.filter(lease=token).order_by("pk"))
+
+
+def retry(queue, row, exc, due_field, base, limit, pending, failed):
+    """Снимает аренду после ошибки. Возвращает True, если попытки
+    кончились и строка получила статус failed."""
+    attempts = row.attempts + 1
+    gave_up = attempts >= limit
+    queue.filter(pk=row.pk).update(
+        attempts=attempts,
+        lease="",
+        status=failed if gave_up else pending,
+        last_error=f"{type(exc).__name__}: {exc}"[:1000],
+        **{due_field: timezone.now() + backoff(attempts, base)},
+    )
+    return gave_up
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит посты старше ARCHIVE_AFTER_DAYS вместе с комментариями "
+        "в архивные таблицы. Можно запускать по крону понемногу: "
+        "--max-batches ограничивает один проход"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=float, default=None,
+            help="Горизонт в днях, по умолчанию ARCHIVE_AFTER_DAYS",
+        )
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--max-batches", type=int, default=None)
+
+    def handle(self, *args, **options):
+        moved = archive.archive(
+            days=options["days"],
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+        )
+        self.stdout.write(f"В архив перенесено постов: {moved}")
@@ -0,0 +1,63 @@
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from posts import archive, benchmark, counters
+from posts.models import ArchivedPost, Post
+
+PAGES = ["index", "group", "profile", "post"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет ленты на временной базе до и после переноса старых "
+        "постов в архив (archive_posts)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument(
+            "--days", type=float, default=None,
+            help="Горизонт архива; по умолчанию в архив уходит "
+                 "старшая половина постов (seed_data — пост в минуту)",
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days is None:
+            days = options["posts"] / 2 / (24 * 60)
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            benchmark.seed(
+                options["users"], options["posts"], options["comments"]
+            )
+            before = benchmark.run(repeat=options["repeat"], names=PAGES)
+            moved = archive.archive(days=days)
+            self.stdout.write(
+                f"В архиве {ArchivedPost.objects.count()} постов "
+                f"(перенесено {moved}), в горячей таблице "
+                f"{Post.objects.count()}"
+            )
+            after = benchmark.run(repeat=options["repeat"], names=PAGES)
+        finally:
+            # просмотры из буфера должны уйти до удаления базы
+            counters.post_views.flush()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for key in sorted(before):
+            was, now = before[key], after.get(key, {})
+            self.stdout.write(
+                f"{key:20} p50 {was['p50_ms']:.2f} → {now.get('p50_ms', 0):.2f}ms "
+                f"p95 {was['p95_ms']:.2f} → {now.get('p95_ms', 0):.2f}ms "
+                f"queries {was['queries']} → {now.get('queries')}"
+            )
@@ -0,0 +1,53 @@
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает страницу ленты из моделей Post и из карточек "
+        "posts.cards: время выборки и отрисовки, память на страницу"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=2000)
+        parser.add_argument("--comments", type=int, default=2000)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument(
+            "--per-page", type=int, nargs="*", default=[10, 100],
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            benchmark.seed(
+                options["users"], options["posts"], options["comments"]
+            )
+            results = {}
+            for per_page in options["per_page"]:
+                loaders = benchmark.feed_loaders(per_page)
+                for name, load in loaders.items():
+                    results[f"{name}:{per_page}"] = benchmark.measure_rows(
+                        load, options["repeat"]
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for key, metrics in results.items():
+            self.stdout.write(
+                f"{key:12} load={metrics['load_ms']:.2f}ms "
+                f"render={metrics['render_ms']:.2f}ms "
+                f"peak={metrics['peak_kb']}KB "
+                f"retained={metrics['retained_kb']}KB "
+                f"blocks/row={metrics['blocks_per_row']}"
+            )
@@ -0,0 +1,115 @@
+import os
+import random
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+
+from posts import benchmark, routers
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Поднимает временную основную базу и её локальные копии-реплики, "
+        "гоняет смешанную нагрузку и показывает, какая доля чтений ушла "
+        "на реплики"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--replicas", type=int, default=2)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--duration", type=float, default=5.0)
+        parser.add_argument("--posts", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        databases = connections.databases
+        saved_name = databases["default"]["NAME"]
+        aliases = []
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                connections.close_all()
+                databases["default"]["NAME"] = os.path.join(tmp, "primary.sqlite3")
+                call_command("migrate", verbosity=0)
+                benchmark.seed(50, options["posts"], options["posts"])
+                users = list(User.objects.filter(username__startswith="bench_"))
+                post_ids = list(
+                    Post.objects.values_list("id", "author__username")[:200]
+                )
+                connections.close_all()
+
+                for i in range(options["replicas"]):
+                    alias = f"bench_replica_{i}"
+                    path = os.path.join(tmp, f"{alias}.sqlite3")
+                    shutil.copyfile(databases["default"]["NAME"], path)
+                    databases[alias] = {
+                        "ENGINE": "django.db.backends.sqlite3",
+                        "NAME": path,
+                    }
+                    connections.ensure_defaults(alias)
+                    connections.prepare_test_settings(alias)
+                    aliases.append(alias)
+
+                routers.read_stats.clear()
+                with override_settings(DATABASE_REPLICAS=aliases):
+                    report = benchmark.run_threads(
+                        [
+                            ("read", options["readers"],
+                             self.reader(post_ids)),
+                            ("write", options["writers"],
+                             self.writer(users, post_ids)),
+                        ],
+                        options["duration"],
+                    )
+                connections.close_all()
+        finally:
+            databases["default"]["NAME"] = saved_name
+            for alias in aliases:
+                databases.pop(alias, None)
+
+        for role, stats in report.items():
+            self.stdout.write(
+                f"{role:6} {stats['ops_per_sec']:>8} оп/с "
+                f"ошибок={stats['errors']} p95={stats['p95_ms']}ms"
+            )
+        total = sum(routers.read_stats.values()) or 1
+        for alias, count in sorted(routers.read_stats.items()):
+            self.stdout.write(
+                f"чтений {alias:18} {count:>8} ({count / total:.1%})"
+            )
+
+    @staticmethod
+    def reader(post_ids):
+        def factory():
+            client = Client()
+            rnd = random.Random()
+
+            def operation():
+                post_id, username = rnd.choice(post_ids)
+                path = rnd.choice((
+                    f"/{username}/",
+                    f"/{username}/{post_id}/",
+                    f"/?page={rnd.randint(1, 20)}",
+                ))
+                return client.get(path).status_code
+            return operation
+        return factory
+
+    @staticmethod
+    def writer(users, post_ids):
+        def factory():
+            client = Client()
+            rnd = random.Random()
+            client.force_login(rnd.choice(users))
+
+            def operation():
+                post_id, username = rnd.choice(post_ids)
+                client.post(f"/{username}/{post_id}/comment/", {"text": "bench"})
+                # после своей записи пользователь читает с основной базы
+                return client.get(f"/{username}/{post_id}/").status_code
+            return operation
+        return factory
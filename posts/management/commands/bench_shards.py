@@ -0,0 +1,95 @@
+import os
+import random
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+
+from posts import benchmark
+from posts.models import Comment, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Меряет пропускную способность записи постов и комментариев "
+        "при разном числе шардов на временных базах"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-shards", type=int, default=4)
+        parser.add_argument(
+            "--writers", type=int, default=8, help="Число процессов-писателей"
+        )
+        parser.add_argument("--authors", type=int, default=200)
+        parser.add_argument("--duration", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        databases = connections.databases
+        saved_name = databases["default"]["NAME"]
+        try:
+            for count in range(1, options["max_shards"] + 1):
+                with tempfile.TemporaryDirectory() as tmp:
+                    report = self.run_shards(count, tmp, options)
+                stats = report["write"]
+                self.stdout.write(
+                    f"шардов={count} {stats['ops_per_sec']:>8} записей/с "
+                    f"ошибок={stats['errors']} p95={stats['p95_ms']}ms"
+                )
+        finally:
+            connections.close_all()
+            databases["default"]["NAME"] = saved_name
+            self.drop_aliases()
+
+    @staticmethod
+    def drop_aliases():
+        for alias in [a for a in connections.databases
+                      if a.startswith("bench_shard_")]:
+            del connections.databases[alias]
+            if hasattr(connections._connections, alias):
+                delattr(connections._connections, alias)
+
+    def run_shards(self, count, tmp, options):
+        databases = connections.databases
+        connections.close_all()
+        self.drop_aliases()
+        databases["default"]["NAME"] = os.path.join(tmp, "default.sqlite3")
+        aliases = []
+        for i in range(count):
+            alias = f"bench_shard_{i}"
+            databases[alias] = {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": os.path.join(tmp, f"{alias}.sqlite3"),
+                "PRAGMAS": {"foreign_keys": "OFF"},
+            }
+            connections.ensure_defaults(alias)
+            connections.prepare_test_settings(alias)
+            aliases.append(alias)
+
+        with override_settings(POST_SHARDS=aliases):
+            for alias in ["default", *aliases]:
+                call_command("migrate", database=alias, verbosity=0)
+            User.objects.bulk_create([
+                User(username=f"bench_{i}", password="!")
+                for i in range(options["authors"])
+            ])
+            author_ids = list(User.objects.values_list("id", flat=True))
+            connections.close_all()
+
+            def writer():
+                rnd = random.Random()
+
+                def operation():
+                    post = Post.objects.create(
+                        author_id=rnd.choice(author_ids), text="bench"
+                    )
+                    Comment.objects.create(
+                        post=post, author_id=rnd.choice(author_ids),
+                        text="bench",
+                    )
+                return operation
+
+            return benchmark.run_processes(
+                "write", options["writers"], writer, options["duration"]
+            )
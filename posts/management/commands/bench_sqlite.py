@@ -0,0 +1,113 @@
+import os
+import random
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+
+from posts import benchmark
+from posts.models import Post, User
+
+PROFILES = {
+    "default": {},
+    "production": settings.SQLITE_PRODUCTION_PRAGMAS,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагружает приложение N читателями и M писателями на временной "
+        "SQLite и сравнивает пропускную способность и ошибки профилей базы"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--duration", type=float, default=5.0)
+        parser.add_argument(
+            "--profile", choices=["default", "production", "both"],
+            default="both",
+        )
+        parser.add_argument("--posts", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        names = (
+            ["default", "production"] if options["profile"] == "both"
+            else [options["profile"]]
+        )
+        database = connections.databases["default"]
+        saved = {key: database.get(key) for key in ("NAME", "PRAGMAS")}
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                for name in names:
+                    report = self.run_profile(
+                        name, os.path.join(tmp, f"{name}.sqlite3"), options
+                    )
+                    self.print_report(name, report)
+        finally:
+            connections.close_all()
+            database.update(saved)
+
+    def run_profile(self, name, path, options):
+        database = connections.databases["default"]
+        connections.close_all()
+        database["NAME"] = path
+        database["PRAGMAS"] = PROFILES[name]
+        call_command("migrate", verbosity=0)
+        benchmark.seed(50, options["posts"], options["posts"])
+        users = list(User.objects.filter(username__startswith="bench_"))
+        post_ids = list(
+            Post.objects.values_list("id", "author__username")[:200]
+        )
+        connections.close_all()
+
+        def reader():
+            client = Client()
+            rnd = random.Random()
+
+            def operation():
+                post_id, username = rnd.choice(post_ids)
+                path = rnd.choice((
+                    f"/{username}/",
+                    f"/{username}/{post_id}/",
+                    f"/?page={rnd.randint(1, 20)}",
+                ))
+                return client.get(path).status_code
+            return operation
+
+        def writer():
+            client = Client()
+            rnd = random.Random()
+            client.force_login(rnd.choice(users))
+
+            def operation():
+                post_id, username = rnd.choice(post_ids)
+                if rnd.random() < 0.5:
+                    response = client.post("/new/", {"text": "bench"})
+                else:
+                    response = client.post(
+                        f"/{username}/{post_id}/comment/", {"text": "bench"}
+                    )
+                return response.status_code
+            return operation
+
+        return benchmark.run_threads(
+            [
+                ("read", options["readers"], reader),
+                ("write", options["writers"], writer),
+            ],
+            options["duration"],
+        )
+
+    def print_report(self, name, report):
+        self.stdout.write(f"Профиль {name}:")
+        for role, stats in report.items():
+            self.stdout.write(
+                f"  {role:6} {stats['ops_per_sec']:>8} оп/с "
+                f"ошибок={stats['errors']} p95={stats['p95_ms']}ms"
+            )
+            for kind, count in stats["error_kinds"].items():
+                self.stdout.write(f"         {count} × {kind}")
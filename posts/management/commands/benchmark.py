@@ -0,0 +1,103 @@
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from posts import benchmark
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, "benchmarks", "baseline.json")
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет p50/p95, число запросов и память для всех страниц "
+        "posts и users на большом наборе данных и сравнивает с базовым замером"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+        parser.add_argument(
+            "--update", action="store_true",
+            help="Сохранить текущий замер как базовый",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument(
+            "--only", nargs="*", default=None,
+            help="Имена url, которые нужно замерить",
+        )
+        parser.add_argument(
+            "--tolerance", type=float, default=None,
+            help="Общий допуск для времени и памяти (доля)",
+        )
+        parser.add_argument("--query-tolerance", type=int, default=None)
+        parser.add_argument(
+            "--keepdb", action="store_true",
+            help="Не пересоздавать тестовую базу между запусками",
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        test_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+        )
+        try:
+            if not options["keepdb"] or not benchmark.User.objects.exists():
+                call_command(
+                    "seed_data",
+                    users=options["users"],
+                    posts=options["posts"],
+                    comments=options["comments"],
+                    stdout=self.stdout,
+                )
+            results = benchmark.run(
+                repeat=options["repeat"], names=options["only"]
+            )
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+            teardown_test_environment()
+
+        for key, metrics in sorted(results.items()):
+            self.stdout.write(
+                f"{key:32} {metrics['status']} "
+                f"p50={metrics['p50_ms']:.2f}ms p95={metrics['p95_ms']:.2f}ms "
+                f"queries={metrics['queries']} mem={metrics['memory_kb']}KB"
+            )
+
+        path = options["baseline"]
+        if options["update"]:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            benchmark.save_baseline(path, results)
+            self.stdout.write(f"Базовый замер сохранён в {path}")
+            return
+
+        baseline = benchmark.load_baseline(path)
+        if baseline is None:
+            self.stdout.write(
+                f"Базового замера {path} нет, запустите с --update"
+            )
+            return
+
+        tolerance = {}
+        if options["tolerance"] is not None:
+            for metric in ("p50_ms", "p95_ms", "memory_kb"):
+                tolerance[metric] = options["tolerance"]
+        if options["query_tolerance"] is not None:
+            tolerance["queries"] = options["query_tolerance"]
+        regressions = benchmark.compare(baseline, results, tolerance)
+        if regressions:
+            raise CommandError(
+                "Регрессия производительности:\n" + "\n".join(regressions)
+            )
+        self.stdout.write("Регрессий нет")
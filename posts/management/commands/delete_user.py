@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import deletion
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет пользователя: сразу скрывает его и его посты, остальное "
+        "дочищает задача purge_user (manage.py run_workers)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"Пользователь {options['username']} не найден")
+        deletion.delete_user(user)
+        self.stdout.write(f"{user.username} скрыт, удаление поставлено в очередь")
@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import feeds, sharding
+from posts.models import Comment, Post
+from posts.utils import manual_dates
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит посты с комментариями на шард автора: после смены числа "
+        "шардов или при первом включении шардирования (из default)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Только посчитать, сколько постов нужно перенести",
+        )
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError("Шардирование выключено (POST_SHARDS пуст)")
+
+        moved = 0
+        for source in ("default", *sharding.shards()):
+            moved += self.rebalance(source, options)
+        if not options["dry_run"]:
+            # удаление перенесённых постов уменьшило счётчики лент
+            feeds.recount()
+        verb = "Нужно перенести" if options["dry_run"] else "Перенесено"
+        self.stdout.write(f"{verb} постов: {moved}")
+
+    def rebalance(self, source, options):
+        moved = 0
+        last_id = 0
+        while True:
+            batch = list(
+                Post.objects.using(source)
+                .filter(pk__gt=last_id)
+                .order_by("pk")[:options["batch_size"]]
+            )
+            if not batch:
+                return moved
+            last_id = batch[-1].pk
+
+            by_target = {}
+            for post in batch:
+                target = sharding.shard_for(post.author_id)
+                if target != source:
+                    by_target.setdefault(target, []).append(post)
+
+            for target, posts in by_target.items():
+                moved += len(posts)
+                if not options["dry_run"]:
+                    self.move(source, target, posts)
+
+    @staticmethod
+    def move(source, target, posts):
+        ids = [post.pk for post in posts]
+        comments = list(
+            Comment.objects.using(source).filter(post_id__in=ids)
+        )
+        # Сначала копия на целевом шарде, потом удаление с исходного:
+        # при сбое между шагами повторный запуск найдёт уже
+        # перенесённые строки и не будет вставлять их второй раз.
+        dates = (
+            Post._meta.get_field("pub_date"),
+            Comment._meta.get_field("created"),
+        )
+        with transaction.atomic(using=target), manual_dates(*dates):
+            present = set(
+                Post.objects.using(target)
+                .filter(pk__in=ids).values_list("pk", flat=True)
+            )
+            Post.objects.using(target).bulk_create(
+                [post for post in posts if post.pk not in present]
+            )
+            present = set(
+                Comment.objects.using(target)
+                .filter(pk__in=[c.pk for c in comments])
+                .values_list("pk", flat=True)
+            )
+            Comment.objects.using(target).bulk_create(
+                [c for c in comments if c.pk not in present]
+            )
+        with transaction.atomic(using=source):
+            Comment.objects.using(source).filter(post_id__in=ids).delete()
+            Post.objects.using(source).filter(pk__in=ids).delete()
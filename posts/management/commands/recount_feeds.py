@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import feeds
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики постов лент для пагинатора"
+
+    def handle(self, *args, **options):
+        totals = feeds.recount()
+        self.stdout.write(
+            f"Счётчиков: {len(totals)}, всего постов: {totals[feeds.ALL]}"
+        )
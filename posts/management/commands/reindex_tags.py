@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import sharding, tags
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Перестраивает индекс хэштегов и упоминаний по текстам постов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = 0
+        for alias in sharding.shards() or ("default",):
+            total += tags.reindex(
+                Post.objects.using(alias).all(),
+                batch_size=options["batch_size"],
+            )
+        self.stdout.write(f"Проиндексировано постов: {total}")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts import rendering, sharding
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Перерисовывает сохранённый HTML постов и комментариев, собранный "
+        "старой версией рендерера"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Перерисовать все строки, а не только устаревшие",
+        )
+
+    def handle(self, *args, **options):
+        aliases = sharding.shards() or ("default",)
+        for model in (Post, Comment):
+            done = 0
+            for alias in aliases:
+                queryset = model.objects.using(alias).all()
+                if not options["all"]:
+                    queryset = queryset.exclude(
+                        render_version=rendering.RENDERER_VERSION
+                    )
+                done += rendering.rerender(queryset, options["batch_size"])
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: {done} "
+                f"(версия {rendering.RENDERER_VERSION})"
+            )
@@ -0,0 +1,70 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import metrics, tasks
+
+
+class Command(BaseCommand):
+    help = "Запускает пул процессов, выполняющих задачи из очереди posts.Task"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2)
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--interval", type=float, default=1.0,
+            help="Пауза при пустой очереди, секунды",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Выполнить готовые задачи в текущем процессе и выйти",
+        )
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            done = 0
+            while True:
+                batch = tasks.run_batch(options["batch_size"])
+                if not batch:
+                    break
+                done += batch
+            self.stdout.write(f"Выполнено задач: {done}")
+            return
+
+        context = multiprocessing.get_context("fork")
+        # дочерние процессы открывают свои соединения с базой
+        connections.close_all()
+        workers = [
+            context.Process(target=self.work, args=(options,), daemon=True)
+            for _ in range(options["processes"])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Запущено воркеров: {len(workers)}")
+
+        def stop(*args):
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for worker in workers:
+            worker.join()
+        self.stdout.write("Воркеры остановлены")
+
+    @staticmethod
+    def work(options):
+        stopping = []
+        # SIGTERM: доделать текущую пачку и выйти
+        signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        while not stopping:
+            batch = tasks.run_batch(options["batch_size"])
+            metrics.registry.start_flushing()
+            if not batch:
+                time.sleep(options["interval"])
+        connections.close_all()
@@ -0,0 +1,134 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts import feeds, tags
+from posts.fake_data import FakeData
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import manual_dates
+
+
+class Command(BaseCommand):
+    help = "Заполняет базу большим набором пользователей, постов и комментариев"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument("--follows", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--batch-size", type=int, default=None,
+            help="По умолчанию размер пачки выбирает бэкенд базы",
+        )
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options["seed"])
+        fake = FakeData()
+        fake.fake.seed_instance(options["seed"])
+        batch_size = options["batch_size"]
+        texts = [fake.fake_text() for _ in range(200)]
+        topics = [f"тема{i}" for i in range(30)]
+        now = timezone.now()
+
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                [
+                    User(
+                        username=f"bench_{i}",
+                        email=f"bench_{i}@example.com",
+                        password="!",
+                    )
+                    for i in range(options["users"])
+                ],
+                batch_size=batch_size,
+            )
+            users = list(User.objects.filter(username__startswith="bench_"))
+            Group.objects.bulk_create(
+                [
+                    Group(
+                        title=f"Группа {i}",
+                        slug=f"bench-group-{i}",
+                        description=rnd.choice(texts),
+                    )
+                    for i in range(options["groups"])
+                ],
+                batch_size=batch_size,
+            )
+            groups = list(Group.objects.filter(slug__startswith="bench-group-"))
+
+            # Распределение авторов скошено: у первых пользователей
+            # постов заметно больше, как и в живой ленте.
+            weights = [1 / (i + 1) for i in range(len(users))]
+            pub_date = Post._meta.get_field("pub_date")
+            with manual_dates(pub_date):
+                posts = [
+                    Post(
+                        text=self.text(rnd, texts, topics, users, i),
+                        author=rnd.choices(users, weights)[0],
+                        group=rnd.choice(groups + [None]) if groups else None,
+                        pub_date=now - timedelta(minutes=i),
+                    )
+                    for i in range(options["posts"])
+                ]
+                # bulk_create минует save(): HTML готовим сами
+                for post in posts:
+                    post.render_text()
+                Post.objects.bulk_create(posts, batch_size=batch_size)
+            tags.reindex(Post.objects.all(), batch_size=batch_size or 500)
+            feeds.recount()
+
+            post_ids = list(Post.objects.values_list("id", flat=True))
+            created = Comment._meta.get_field("created")
+            if post_ids:
+                hot = post_ids[: max(1, len(post_ids) // 100)]
+                comments = [
+                    Comment(
+                        post_id=rnd.choice(hot if i % 2 else post_ids),
+                        author=rnd.choice(users),
+                        text=rnd.choice(texts)[:200],
+                        created=now - timedelta(seconds=i),
+                    )
+                    for i in range(options["comments"])
+                ]
+                for comment in comments:
+                    comment.render_text()
+                with manual_dates(created):
+                    Comment.objects.bulk_create(
+                        comments, batch_size=batch_size
+                    )
+                feeds.recount_comments(
+                    Post.objects.all(), Comment.objects.all()
+                )
+
+            follows = set()
+            for user in users:
+                for author in rnd.sample(
+                    users, min(options["follows"], len(users))
+                ):
+                    if author != user:
+                        follows.add((user.id, author.id))
+            Follow.objects.bulk_create(
+                [Follow(user_id=u, author_id=a) for u, a in follows],
+                batch_size=batch_size,
+            )
+
+        self.stdout.write(
+            f"Создано: {len(users)} пользователей, {len(groups)} групп, "
+            f"{len(post_ids)} постов, {options['comments']} комментариев, "
+            f"{len(follows)} подписок"
+        )
+
+    @staticmethod
+    def text(rnd, texts, topics, users, i):
+        # часть постов с хэштегами и упоминаниями — для лент тегов
+        text = rnd.choice(texts)
+        if i % 5 == 0:
+            text += f" #{rnd.choice(topics)}"
+        if i % 7 == 0:
+            text += f" @{rnd.choice(users).username}"
+        return text
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import slowlog
+
+
+class Command(BaseCommand):
+    help = "Показывает самые тяжёлые медленные запросы из SLOW_QUERY_LOG"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--log", default=getattr(settings, "SLOW_QUERY_LOG", None)
+        )
+        parser.add_argument("--top", type=int, default=10)
+        parser.add_argument(
+            "--order", choices=("total_ms", "count", "p95_ms", "max_ms"),
+            default="total_ms",
+        )
+
+    def handle(self, *args, **options):
+        if not options["log"]:
+            raise CommandError("Не задан путь к журналу (SLOW_QUERY_LOG)")
+        try:
+            stats = slowlog.read(options["log"])
+        except FileNotFoundError:
+            raise CommandError(f"Журнал {options['log']} не найден")
+
+        ordered = sorted(
+            stats.values(), key=lambda item: item[options["order"]],
+            reverse=True,
+        )
+        for item in ordered[:options["top"]]:
+            self.stdout.write(
+                f"[{item['fingerprint']}] count={item['count']} "
+                f"total={item['total_ms']}ms p50={item['p50_ms']}ms "
+                f"p95={item['p95_ms']}ms max={item['max_ms']}ms"
+            )
+            self.stdout.write(f"  {item.get('normalized', '?')}")
+            if item.get("params") is not None:
+                self.stdout.write(f"  params: {item['params']}")
+            if item["views"]:
+                self.stdout.write(f"  views: {', '.join(sorted(item['views']))}")
+            if item["templates"]:
+                self.stdout.write(
+                    f"  templates: {', '.join(sorted(item['templates']))}"
+                )
+            for row in item.get("plan") or ():
+                self.stdout.write(f"  plan: {row}")
+            self.stdout.write("")
@@ -0,0 +1,325 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+logger = logging.getLogger("posts.metrics")
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (
+    10 * 1024, 100 * 1024, 512 * 1024, 1024 ** 2, 5 * 1024 ** 2,
+    10 * 1024 ** 2, 50 * 1024 ** 2,
+)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 1000)
+QUEUE_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+# сколько пропущенных сбросов делают файл воркера в METRICS_DIR мёртвым
+STALE_FLUSHES = 3
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labels=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def _key(self, labels):
+        return self.name, tuple(str(labels[label]) for label in self.labels)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        shard = self.registry.shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labels=(),
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        shard = self.registry.shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            # счётчики по корзинам (+Inf последней), сумма, количество
+            state = shard[key] = [0] * (len(self.buckets) + 1) + [0, 0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+
+class Gauge(Metric):
+    """Значение не копится, а снимается вызовом функции при выгрузке."""
+
+    kind = "gauge"
+
+    def __init__(self, registry, name, documentation, function):
+        super().__init__(registry, name, documentation)
+        self.function = function
+
+
+class Registry:
+    """Метрики процесса без блокировок на пути запроса: каждый поток
+    пишет в собственный словарь, сложение происходит при выгрузке.
+    Блокировка берётся только при первом обращении нового потока."""
+
+    def __init__(self):
+        self.metrics = {}
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(self, name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), **kwargs):
+        return self._register(
+            Histogram(self, name, documentation, labels, **kwargs)
+        )
+
+    def gauge(self, name, documentation, function):
+        return self._register(Gauge(self, name, documentation, function))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def snapshot(self):
+        """Сумма по всем потокам процесса. Данные завершившихся потоков
+        переносятся в общий словарь, чтобы список не рос бесконечно."""
+        with self._lock:
+            alive = []
+            parts = [self._retired]
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                    parts.append(shard.copy())
+                else:
+                    _merge(self._retired, shard.copy())
+            self._shards = alive
+            total = {}
+            for part in parts:
+                _merge(total, part)
+            return total
+
+    def reset(self):
+        with self._lock:
+            self._shards = []
+            self._retired = {}
+        self._local = threading.local()
+
+    # Межпроцессная агрегация: каждый воркер раз в METRICS_FLUSH_INTERVAL
+    # секунд сбрасывает из фонового потока свой снимок в
+    # METRICS_DIR/<pid>.json, эндпоинт складывает все свежие файлы.
+
+    @property
+    def interval(self):
+        return getattr(settings, "METRICS_FLUSH_INTERVAL", 5)
+
+    def start_flushing(self):
+        """Запускает фоновый сброс в этом процессе. На пути запроса —
+        одно сравнение pid: после fork поток нужно запустить заново."""
+        if self._flusher_pid == os.getpid():
+            return
+        if not getattr(settings, "METRICS_DIR", None):
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(
+            target=self._flush_forever, name="metrics-flush", daemon=True
+        ).start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.interval)
+            directory = getattr(settings, "METRICS_DIR", None)
+            if not directory:
+                continue
+            try:
+                self.flush(directory)
+            except OSError:
+                logger.exception("Не удалось сбросить метрики в %s", directory)
+
+    def flush(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(
+                [[name, list(labels), value]
+                 for (name, labels), value in self.snapshot().items()],
+                fh,
+            )
+        os.replace(tmp, path)
+
+    def collect(self):
+        directory = getattr(settings, "METRICS_DIR", None)
+        if not directory:
+            return self.snapshot()
+        self.flush(directory)
+        total = {}
+        # файл живого воркера обновляется раз в interval секунд
+        stale = time.time() - STALE_FLUSHES * self.interval
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            try:
+                if os.path.getmtime(path) < stale:
+                    os.remove(path)
+                    continue
+                with open(path) as fh:
+                    rows = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            _merge(total, {
+                (name, tuple(labels)): value for name, labels, value in rows
+            })
+        return total
+
+    def expose(self):
+        values = self.collect()
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if metric.kind == "gauge":
+                try:
+                    value = metric.function()
+                except Exception:
+                    continue
+                lines.append(f"{metric.name} {_number(value)}")
+                continue
+            for (name, labels), value in sorted(values.items()):
+                if name != metric.name:
+                    continue
+                pairs = list(zip(metric.labels, labels))
+                if metric.kind == "counter":
+                    lines.append(f"{name}{_labels(pairs)} {_number(value)}")
+                    continue
+                cumulative = 0
+                bounds = [_number(b) for b in metric.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, value):
+                    cumulative += count
+                    lines.append(
+                        f"{name}_bucket{_labels(pairs + [('le', bound)])} "
+                        f"{cumulative}"
+                    )
+                lines.append(f"{name}_sum{_labels(pairs)} {_number(value[-2])}")
+                lines.append(f"{name}_count{_labels(pairs)} {value[-1]}")
+
+        hits = sum(v for (n, l), v in values.items()
+                   if n == "yatube_cache_requests_total" and l == ("hit",))
+        total = sum(v for (n, l), v in values.items()
+                    if n == "yatube_cache_requests_total")
+        lines.append("# HELP yatube_cache_hit_ratio Доля попаданий в кэш")
+        lines.append("# TYPE yatube_cache_hit_ratio gauge")
+        lines.append(
+            f"yatube_cache_hit_ratio {_number(hits / total if total else 0)}"
+        )
+        return "\n".join(lines) + "\n"
+
+
+def _merge(target, source):
+    for key, value in source.items():
+        current = target.get(key)
+        if current is None:
+            target[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                current[i] += item
+        else:
+            target[key] = current + value
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(
+            key, value.replace("\\", "\\\\").replace('"', '\\"')
+        )
+        for key, value in pairs
+    )
+    return "{" + body + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+request_latency = registry.histogram(
+    "yatube_request_duration_seconds",
+    "Время ответа по имени url",
+    labels=("view",),
+)
+db_queries = registry.counter(
+    "yatube_db_queries_total",
+    "Запросы к базе по имени url",
+    labels=("view",),
+)
+db_queries_per_request = registry.histogram(
+    "yatube_db_queries_per_request",
+    "Число запросов к базе на один ответ",
+    labels=("view",),
+    buckets=COUNT_BUCKETS,
+)
+cache_requests = registry.counter(
+    "yatube_cache_requests_total",
+    "Обращения к кэшу",
+    labels=("result",),
+)
+upload_bytes = registry.histogram(
+    "yatube_upload_bytes",
+    "Размер загруженных файлов",
+    labels=("view",),
+    buckets=SIZE_BUCKETS,
+)
+feed_page_depth = registry.histogram(
+    "yatube_feed_page_depth",
+    "Номер запрошенной страницы ленты",
+    labels=("view",),
+    buckets=PAGE_BUCKETS,
+)
+
+email_delivery_latency = registry.histogram(
+    "yatube_email_delivery_seconds",
+    "Время от постановки письма в очередь до отправки",
+    buckets=QUEUE_BUCKETS,
+)
+email_deliveries = registry.counter(
+    "yatube_email_deliveries_total",
+    "Попытки доставки писем из очереди",
+    labels=("result",),
+)
+
+FEED_VIEWS = {"index", "group", "profile", "follow_index"}
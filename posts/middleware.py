@@ -0,0 +1,157 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from . import metrics, profiling, routers, surrogate
+
+logger = logging.getLogger("posts.profiling")
+
+
+class ProfilingMiddleware:
+    """Профилирование выборки запросов: заголовок Server-Timing и строка
+    в лог. Выключенная (PROFILING_ENABLED = False) исключается из цепочки
+    middleware целиком."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+        profiling.install()
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        with profiling.collect() as collector:
+            started = time.perf_counter()
+            response = self.get_response(request)
+            total_ms = (time.perf_counter() - started) * 1000
+
+        response["Server-Timing"] = collector.server_timing(total_ms)
+        match = request.resolver_match
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "view": match.url_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 2),
+            **collector.as_dict(),
+        }, ensure_ascii=False))
+        return response
+
+
+class MetricsMiddleware:
+    """Собирает метрики для /metrics. Включается METRICS_ENABLED."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        profiling.install()
+
+    def __call__(self, request):
+        with profiling.collect() as collector:
+            started = time.perf_counter()
+            response = self.get_response(request)
+            elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else "unknown"
+        metrics.request_latency.observe(elapsed, view=view)
+        metrics.db_queries.inc(collector.queries, view=view)
+        metrics.db_queries_per_request.observe(collector.queries, view=view)
+        if collector.cache_hits:
+            metrics.cache_requests.inc(collector.cache_hits, result="hit")
+        if collector.cache_misses:
+            metrics.cache_requests.inc(collector.cache_misses, result="miss")
+        if request.method == "POST" and request.FILES:
+            for upload in request.FILES.values():
+                metrics.upload_bytes.observe(upload.size, view=view)
+        if view in metrics.FEED_VIEWS:
+            page = request.GET.get("page", "1")
+            metrics.feed_page_depth.observe(
+                int(page) if page.isdigit() else 1, view=view
+            )
+        metrics.registry.start_flushing()
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """После собственной записи пользователь какое-то время читает из
+    основной базы: так после new_post редирект на index уже видит пост."""
+
+    cookie_name = "pin_primary"
+
+    def __init__(self, get_response):
+        if not routers.replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.window = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+
+    def __call__(self, request):
+        pinned = request.method not in ("GET", "HEAD", "OPTIONS")
+        try:
+            pinned = pinned or (
+                float(request.COOKIES.get(self.cookie_name, 0)) > time.time()
+            )
+        except ValueError:
+            pass
+
+        routers.reset_write_flag()
+        if pinned:
+            with routers.use_primary():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+
+        if routers.wrote():
+            response.set_cookie(
+                self.cookie_name,
+                str(time.time() + self.window),
+                max_age=self.window,
+                httponly=True,
+                samesite="Lax",
+            )
+        routers.reset_write_flag()
+        return response
+
+
+class SurrogateKeyMiddleware:
+    """Заголовок Surrogate-Key из ключей, которыми представление пометило
+    запрос (posts.surrogate), и Cache-Control для прокси: анониму ответ
+    хранится SURROGATE_MAX_AGE секунд, остальным — только в браузере."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.max_age = getattr(settings, "SURROGATE_MAX_AGE", 600)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        keys = getattr(request, "surrogate_keys", None)
+        if keys is None:
+            return response
+        response[surrogate.HEADER] = " ".join(sorted({*keys, surrogate.SITE}))
+        if response.has_header("Cache-Control"):
+            return response
+        shared = (
+            self.max_age
+            and request.surrogate_public
+            and request.method in ("GET", "HEAD")
+            and response.status_code == 200
+            and not request.user.is_authenticated
+        )
+        if shared:
+            patch_cache_control(
+                response, public=True, max_age=0, s_maxage=self.max_age
+            )
+            # вошедший пользователь не должен получить ответ анониму
+            patch_vary_headers(response, ("Cookie",))
+        else:
+            patch_cache_control(response, private=True)
+        return response
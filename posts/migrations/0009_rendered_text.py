@@ -0,0 +1,64 @@
+# Generated by Django 2.2.9 on 2026-10-19 08:16
+
+from django.db import migrations, models
+from django.utils.html import escape
+
+# Правила версии 1 из posts.rendering, замороженные для миграции: строки
+# более новых версий перерисовывает команда rerender.
+RENDERER_VERSION = 1
+BATCH_SIZE = 500
+
+
+def render(text):
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return escape(text).replace("\n", "<br>")
+
+
+def render_existing(apps, schema_editor):
+    using = schema_editor.connection.alias
+    for name in ("Post", "Comment"):
+        objects = apps.get_model("posts", name).objects.using(using)
+        last_id = 0
+        while True:
+            batch = list(
+                objects.filter(pk__gt=last_id).order_by("pk")
+                .only("pk", "text")[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].pk
+            for obj in batch:
+                obj.text_html = render(obj.text)
+                obj.render_version = RENDERER_VERSION
+            objects.bulk_update(batch, ["text_html", "render_version"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_views'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='render_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='render_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(render_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 2.2.9 on 2026-10-19 08:18
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Разбор тегов из posts.tags на момент миграции
+TOKEN = re.compile(
+    r"(?<![\w#@])(?:#(?P<tag>\w+)|@(?P<user>\w(?:[\w.@+-]*\w)?))"
+)
+MAX_LENGTH = 150
+BATCH_SIZE = 500
+
+
+def extract(text):
+    found = set()
+    for match in TOKEN.finditer(text):
+        if match.group("tag"):
+            key = ("#", match.group("tag").lower())
+        else:
+            key = ("@", match.group("user"))
+        if len(key[1]) <= MAX_LENGTH:
+            found.add(key)
+    return found
+
+
+def index_existing(apps, schema_editor):
+    # посты на шардах индексирует команда reindex_tags
+    if schema_editor.connection.alias != "default":
+        return
+    posts = apps.get_model("posts", "Post").objects.using("default")
+    tags = apps.get_model("posts", "Tag").objects.using("default")
+    TagIndex = apps.get_model("posts", "TagIndex")
+    tag_ids = {}
+    last_id = 0
+    while True:
+        batch = list(
+            posts.filter(pk__gt=last_id).order_by("pk")
+            .only("pk", "text", "pub_date")[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        last_id = batch[-1].pk
+        entries = []
+        for post in batch:
+            for key in extract(post.text):
+                if key not in tag_ids:
+                    tag_ids[key] = tags.get_or_create(
+                        kind=key[0], name=key[1]
+                    )[0].pk
+                entries.append(TagIndex(
+                    tag_id=tag_ids[key], pub_date=post.pub_date,
+                    post_id=post.pk,
+                ))
+        TagIndex.objects.using("default").bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_rendered_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('#', 'хэштег'), ('@', 'упоминание')], max_length=1)),
+                ('name', models.CharField(max_length=150)),
+            ],
+            options={
+                'unique_together': {('kind', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TagIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+                ('post', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='tag_entries', to='posts.Post')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='posts.Tag')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tagindex',
+            index=models.Index(fields=['tag', 'pub_date', 'post'], name='tagindex_feed'),
+        ),
+        migrations.RunPython(index_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.9 on 2026-10-19 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedCounter',
+            fields=[
+                ('key', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.9 on 2026-10-19 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_feed_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='deleted',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
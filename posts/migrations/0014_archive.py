@@ -0,0 +1,53 @@
+# Generated by Django 2.2.9 on 2026-10-19 08:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_post_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPost',
+            fields=[
+                ('text_html', models.TextField(default='', editable=False)),
+                ('render_version', models.PositiveSmallIntegerField(default=0, editable=False)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('text', models.TextField()),
+                ('pub_date', models.DateTimeField(verbose_name='date published')),
+                ('image', models.ImageField(blank=True, null=True, upload_to='posts/')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='просмотры')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_posts', to=settings.AUTH_USER_MODEL)),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_posts', to='posts.Group')),
+            ],
+            options={
+                'ordering': ('-pub_date',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('text_html', models.TextField(default='', editable=False)),
+                ('render_version', models.PositiveSmallIntegerField(default=0, editable=False)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('text', models.TextField(max_length=200)),
+                ('created', models.DateTimeField(verbose_name='comment created date')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_comments', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='posts.ArchivedPost')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedpost',
+            index=models.Index(fields=['author', 'pub_date'], name='archivedpost_author'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['post', 'created', 'id'], name='archivedcomment_post_created'),
+        ),
+    ]
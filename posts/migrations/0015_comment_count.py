@@ -0,0 +1,40 @@
+# Generated by Django 2.2.9 on 2026-10-19 08:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    pairs = (("Post", "Comment"), ("ArchivedPost", "ArchivedComment"))
+    for post, comment in pairs:
+        counts = (
+            apps.get_model("posts", comment).objects
+            .filter(post=OuterRef("pk")).order_by()
+            .values("post").annotate(n=Count("pk")).values("n")
+        )
+        apps.get_model("posts", post).objects.using(alias).update(
+            comment_count=Coalesce(Subquery(counts), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='комментарии'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='комментарии'),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
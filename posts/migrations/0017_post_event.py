@@ -0,0 +1,30 @@
+# Generated by Django 2.2.9 on 2026-10-19 08:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0016_post_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.BigIntegerField()),
+                ('payload', models.TextField()),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postevent',
+            index=models.Index(fields=['author', 'id'], name='postevent_author'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.9 on 2026-10-19 09:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0017_post_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowMarker',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_marker', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('seen', models.DateTimeField()),
+                ('unread', models.PositiveIntegerField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date'], name='post_author_pub_date'),
+        ),
+    ]
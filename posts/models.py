@@ -1,5 +1,10 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth import get_user_model
+from django.utils.safestring import mark_safe
+
+from . import rendering, tags
+from .sharding import ShardedQuerySet
 
 User = get_user_model()
 
@@ -13,7 +18,45 @@ class Group(models.Model):
 		return self.title
 
 
-class Post(models.Model):
+class RenderedText(models.Model):
+	"""Текст вместе с готовым HTML: он строится при сохранении, а шаблоны
+	выводят его как есть."""
+	text_html = models.TextField(editable=False, default="")
+	render_version = models.PositiveSmallIntegerField(
+		editable=False, default=0)
+
+	class Meta:
+		abstract = True
+
+	def render_text(self):
+		self.text_html = rendering.render(self.text)
+		self.render_version = rendering.RENDERER_VERSION
+
+	@property
+	def html(self):
+		# строки, ещё не перерисованные командой rerender, рисуем на лету
+		if self.render_version != rendering.RENDERER_VERSION:
+			return rendering.render(self.text)
+		return mark_safe(self.text_html)
+
+	def save(self, *args, **kwargs):
+		self.render_text()
+		update_fields = kwargs.get("update_fields")
+		if update_fields is not None and "text" in update_fields:
+			kwargs["update_fields"] = {
+				*update_fields, "text_html", "render_version"}
+		super().save(*args, **kwargs)
+
+
+class PostManager(models.Manager.from_queryset(ShardedQuerySet)):
+	"""Посты без надгробия: удалённый через posts.deletion пост пропадает
+	из лент сразу, строки дочищает фоновая задача."""
+
+	def get_queryset(self):
+		return super().get_queryset().filter(deleted=False)
+
+
+class Post(RenderedText):
 	text = models.TextField()
 	pub_date = models.DateTimeField("date published", auto_now_add=True)
 	author = models.ForeignKey(
@@ -23,15 +66,50 @@ class Post(models.Model):
 		null=True
 	)
 	image = models.ImageField(upload_to="posts/", blank=True, null=True)
+	# пишется пачками из posts.counters, на странице к нему добавляется буфер
+	views = models.PositiveIntegerField("просмотры", default=0)
+	# ведёт Comment.save; карточкам лент не нужен COUNT по комментариям
+	comment_count = models.PositiveIntegerField(
+		"комментарии", default=0, editable=False)
+	# растёт при правке поста и новом комментарии: ключ кэша карточки
+	version = models.PositiveIntegerField(default=0, editable=False)
+	deleted = models.BooleanField(default=False, editable=False)
+
+	objects = PostManager()
+	all_objects = ShardedQuerySet.as_manager()
 
 	def __str__(self):
 		return self.text
 
+	def save(self, *args, **kwargs):
+		# у нового поста без тегов в индексе нечего ни удалять, ни писать
+		adding = self._state.adding
+		if not adding:
+			# F(): экземпляр мог устареть, пока под постом писали комментарии
+			self.version = F("version") + 1
+			update_fields = kwargs.get("update_fields")
+			if update_fields is not None:
+				kwargs["update_fields"] = {*update_fields, "version"}
+		super().save(*args, **kwargs)
+		if not adding:
+			self.refresh_from_db(fields=["version"])
+		update_fields = kwargs.get("update_fields")
+		if update_fields is not None and "text" not in update_fields:
+			return
+		if not adding or tags.extract(self.text):
+			tags.index_posts([self])
+
 	class Meta:
 		ordering = ("-pub_date",)
+		indexes = [
+			# профиль и пересчёт непрочитанного в posts.unread
+			models.Index(
+				fields=["author", "pub_date"], name="post_author_pub_date"
+			),
+		]
 
 
-class Comment(models.Model):
+class Comment(RenderedText):
 	post = models.ForeignKey(
 		Post, on_delete=models.CASCADE, related_name="comments")
 	author = models.ForeignKey(
@@ -39,9 +117,28 @@ class Comment(models.Model):
 	text = models.TextField(max_length=200)
 	created = models.DateTimeField("comment created date", auto_now_add=True)
 
+	objects = ShardedQuerySet.as_manager()
+
 	def __str__(self):
 		return self.text
 
+	def save(self, *args, **kwargs):
+		adding = self._state.adding
+		super().save(*args, **kwargs)
+		if adding:
+			Post.all_objects.using(self._state.db).filter(
+				pk=self.post_id).update(
+					comment_count=F("comment_count") + 1,
+					version=F("version") + 1,
+				)
+
+	class Meta:
+		indexes = [
+			models.Index(
+				fields=["post", "created", "id"], name="comment_post_created"
+			),
+		]
+
 
 class Follow(models.Model):
 	user = models.ForeignKey(
@@ -53,3 +150,163 @@ class Follow(models.Model):
 
 	class Meta:
 		unique_together = ("user", "author")
+
+
+class Tag(models.Model):
+	KINDS = ((tags.HASHTAG, "хэштег"), (tags.MENTION, "упоминание"))
+
+	kind = models.CharField(max_length=1, choices=KINDS)
+	name = models.CharField(max_length=tags.MAX_LENGTH)
+
+	def __str__(self):
+		return f"{self.kind}{self.name}"
+
+	class Meta:
+		unique_together = ("kind", "name")
+
+
+class TagIndex(models.Model):
+	"""Обратный индекс тег -> посты. Лента тега — проход по составному
+	индексу (tag, pub_date, post) без обращения к самим постам.
+
+	Живёт в default для всех шардов, поэтому внешний ключ на пост без
+	ограничения в базе: id постов уникальны глобально.
+	"""
+	tag = models.ForeignKey(
+		Tag, on_delete=models.CASCADE, related_name="entries")
+	pub_date = models.DateTimeField()
+	post = models.ForeignKey(
+		Post, on_delete=models.CASCADE, related_name="tag_entries",
+		db_constraint=False
+	)
+
+	class Meta:
+		indexes = [
+			models.Index(
+				fields=["tag", "pub_date", "post"], name="tagindex_feed"
+			),
+		]
+
+
+class Task(models.Model):
+	"""Фоновая задача из posts.tasks. Выполненные удаляются, так очередь
+	остаётся короткой."""
+	PENDING = "pending"
+	RUNNING = "running"
+	FAILED = "failed"
+	STATUSES = (
+		(PENDING, "в очереди"),
+		(RUNNING, "выполняется"),
+		(FAILED, "не выполнена"),
+	)
+
+	name = models.CharField(max_length=100)
+	payload = models.TextField(default="{}")
+	status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+	attempts = models.PositiveSmallIntegerField(default=0)
+	created = models.DateTimeField(auto_now_add=True)
+	# для RUNNING — срок аренды: после него задачу может забрать другой воркер
+	run_after = models.DateTimeField()
+	lease = models.CharField(max_length=32, blank=True)
+	last_error = models.TextField(blank=True)
+
+	def __str__(self):
+		return f"{self.name} {self.payload}"
+
+	class Meta:
+		indexes = [
+			models.Index(fields=["status", "run_after"], name="task_queue"),
+		]
+
+
+class PostEvent(models.Model):
+	"""Журнал новых постов для потока follow_events (posts.events):
+	процессы читают его по возрастанию id, он же Last-Event-ID у клиента.
+	Живёт в default для всех шардов; в payload — готовая карточка в JSON,
+	так что поток не читает сами посты."""
+	post_id = models.BigIntegerField()
+	author = models.ForeignKey(
+		User, on_delete=models.CASCADE, related_name="+")
+	payload = models.TextField()
+	created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=["author", "id"], name="postevent_author"),
+		]
+
+
+class FollowMarker(models.Model):
+	"""Когда пользователь последний раз открывал ленту подписок и сколько
+	постов его авторов вышло с тех пор (posts.unread). unread растёт при
+	записи поста; None — число надо пересчитать по ленте."""
+	user = models.OneToOneField(
+		User, on_delete=models.CASCADE, primary_key=True,
+		related_name="follow_marker"
+	)
+	seen = models.DateTimeField()
+	unread = models.PositiveIntegerField(null=True)
+
+
+class FeedCounter(models.Model):
+	"""Число постов в ленте (вся, группа, автор) для пагинатора: держится
+	сигналами posts.feeds вместо COUNT(*) на каждой странице."""
+	key = models.CharField(max_length=50, primary_key=True)
+	count = models.IntegerField(default=0)
+
+	def __str__(self):
+		return f"{self.key}: {self.count}"
+
+
+class ArchivedPost(RenderedText):
+	"""Холодная копия старого поста (posts.archive): id сохраняется, так
+	что адрес поста не меняется. Архив живёт в default и только читается:
+	его показывают profile и post_view, но не index и group."""
+	id = models.BigIntegerField(primary_key=True)
+	text = models.TextField()
+	pub_date = models.DateTimeField("date published")
+	author = models.ForeignKey(
+		User, on_delete=models.CASCADE, related_name="archived_posts")
+	group = models.ForeignKey(
+		Group, on_delete=models.SET_NULL, related_name="archived_posts",
+		blank=True, null=True
+	)
+	image = models.ImageField(upload_to="posts/", blank=True, null=True)
+	views = models.PositiveIntegerField("просмотры", default=0)
+	comment_count = models.PositiveIntegerField(
+		"комментарии", default=0, editable=False)
+	version = models.PositiveIntegerField(default=0, editable=False)
+
+	archived = True
+
+	def __str__(self):
+		return self.text
+
+	class Meta:
+		ordering = ("-pub_date",)
+		indexes = [
+			models.Index(
+				fields=["author", "pub_date"], name="archivedpost_author"
+			),
+		]
+
+
+class ArchivedComment(RenderedText):
+	id = models.BigIntegerField(primary_key=True)
+	post = models.ForeignKey(
+		ArchivedPost, on_delete=models.CASCADE, related_name="comments")
+	author = models.ForeignKey(
+		User, on_delete=models.CASCADE, related_name="archived_comments")
+	text = models.TextField(max_length=200)
+	created = models.DateTimeField("comment created date")
+
+	def __str__(self):
+		return self.text
+
+	class Meta:
+		indexes = [
+			models.Index(
+				fields=["post", "created", "id"],
+				name="archivedcomment_post_created"
+			),
+		]
@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+_local = threading.local()
+_installed = False
+_install_lock = threading.Lock()
+
+
+class Collector:
+    """Счётчики одного запроса: SQL, шаблоны, кэш и миниатюры."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_ms = 0.0
+        self.templates = defaultdict(float)
+        self.template_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.thumbnails = 0
+        self.thumbnail_ms = 0.0
+        self._depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_ms += (time.perf_counter() - started) * 1000
+
+    def add_template(self, name, elapsed_ms, outermost):
+        self.templates[name] += elapsed_ms
+        if outermost:
+            self.template_ms += elapsed_ms
+
+    def add_cache(self, hits, misses):
+        self.cache_hits += hits
+        self.cache_misses += misses
+
+    def add_thumbnail(self, elapsed_ms):
+        self.thumbnails += 1
+        self.thumbnail_ms += elapsed_ms
+
+    def server_timing(self, total_ms):
+        return ", ".join([
+            f'db;dur={self.query_ms:.1f};desc="{self.queries} queries"',
+            f"tpl;dur={self.template_ms:.1f}",
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+            f'thumb;dur={self.thumbnail_ms:.1f};desc="{self.thumbnails}"',
+            f"total;dur={total_ms:.1f}",
+        ])
+
+    def as_dict(self):
+        return {
+            "queries": self.queries,
+            "query_ms": round(self.query_ms, 2),
+            "template_ms": round(self.template_ms, 2),
+            "templates": {
+                name: round(ms, 2) for name, ms in self.templates.items()
+            },
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "thumbnails": self.thumbnails,
+            "thumbnail_ms": round(self.thumbnail_ms, 2),
+        }
+
+
+def active():
+    return getattr(_local, "collectors", ())
+
+
+@contextmanager
+def collect(collector=None):
+    """Включает сбор для текущего потока; вложенные сборщики складываются."""
+    collector = collector or Collector()
+    previous = active()
+    _local.collectors = previous + (collector,)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(collector.execute)
+                )
+            yield collector
+    finally:
+        _local.collectors = previous
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        collectors = active()
+        if not collectors:
+            return render(self, context)
+        started = time.perf_counter()
+        for collector in collectors:
+            collector._depth += 1
+        try:
+            return render(self, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            for collector in collectors:
+                collector._depth -= 1
+                collector.add_template(
+                    self.origin.template_name or self.origin.name,
+                    elapsed,
+                    outermost=collector._depth == 0,
+                )
+    return wrapper
+
+
+def _counted_get(get):
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, default, version)
+        if getattr(_local, "in_get_many", False):
+            # BaseCache.get_many сам зовёт get: ключи считает get_many
+            return value
+        for collector in active():
+            hit = value is not default
+            collector.add_cache(int(hit), int(not hit))
+        return value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    def wrapper(self, keys, version=None):
+        keys = list(keys)
+        outer = not getattr(_local, "in_get_many", False)
+        _local.in_get_many = True
+        try:
+            found = get_many(self, keys, version)
+        finally:
+            if outer:
+                _local.in_get_many = False
+        if not outer:
+            return found
+        for collector in active():
+            collector.add_cache(len(found), len(keys) - len(found))
+        return found
+    return wrapper
+
+
+def _timed_thumbnail(get_thumbnail):
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return get_thumbnail(self, *args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            for collector in active():
+                collector.add_thumbnail(elapsed)
+    return wrapper
+
+
+def install():
+    """Один раз оборачивает точки замера. Без активного сборщика
+    обёртки сводятся к одной проверке thread-local."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        Template.render = _timed_render(Template.render)
+
+        patched = set()
+        for alias in settings.CACHES:
+            backend = type(caches[alias])
+            if backend in patched:
+                continue
+            patched.add(backend)
+            backend.get = _counted_get(backend.get)
+            backend.get_many = _counted_get_many(backend.get_many)
+
+        try:
+            from sorl.thumbnail.base import ThumbnailBackend
+        except ImportError:
+            pass
+        else:
+            ThumbnailBackend.get_thumbnail = _timed_thumbnail(
+                ThumbnailBackend.get_thumbnail
+            )
+        _installed = True
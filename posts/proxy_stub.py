@@ -0,0 +1,123 @@
+import re
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.conf import settings
+from django.http import parse_cookie
+
+from . import surrogate
+
+S_MAXAGE = re.compile(r"\bs-maxage=(\d+)")
+KEYS_ENVIRON = "HTTP_" + surrogate.HEADER.upper().replace("-", "_")
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class StubProxy(WSGIServer):
+    """Кэширующий прокси для тестов и разработки, как Fastly или Varnish
+    с xkey: хранит ответы анонимам с public и s-maxage, а POST на
+    purge_path выбрасывает ответы с ключами из заголовка Surrogate-Key.
+
+    Сам прокси — WSGI-приложение поверх application; start() поднимает
+    в потоке HTTP-сервер, куда и ходит posts.surrogate.send.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, application, host="127.0.0.1", port=0,
+                 purge_path="/purge"):
+        super().__init__((host, port), _QuietHandler)
+        # WSGIServer держит своё приложение в self.application
+        self.set_app(self)
+        self.upstream = application
+        self.purge_path = purge_path
+        self.entries = {}
+        self.purges = []
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def purge_url(self):
+        return f"http://{self.server_address[0]}:{self.port}{self.purge_path}"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="proxy-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def purge(self, keys):
+        keys = set(keys)
+        with self.lock:
+            self.purges.append(sorted(keys))
+            for url, entry in list(self.entries.items()):
+                if keys & entry["keys"]:
+                    del self.entries[url]
+
+    def __call__(self, environ, start_response):
+        method = environ["REQUEST_METHOD"]
+        if method == "POST" and environ["PATH_INFO"] == self.purge_path:
+            self.purge(environ.get(KEYS_ENVIRON, "").split())
+            start_response("200 OK", [("Content-Length", "0")])
+            return [b""]
+        cookies = parse_cookie(environ.get("HTTP_COOKIE", ""))
+        if method != "GET" or settings.SESSION_COOKIE_NAME in cookies:
+            return self.upstream(environ, start_response)
+
+        url = f"{environ['PATH_INFO']}?{environ.get('QUERY_STRING', '')}"
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry is not None and entry["expires"] > time.monotonic():
+            start_response(entry["status"], entry["headers"] + [
+                ("X-Cache", "HIT")
+            ])
+            return [entry["body"]]
+
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured.update(status=status, headers=headers)
+            return lambda data: None
+
+        result = self.upstream(environ, capture)
+        try:
+            body = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        self.store(url, captured["status"], captured["headers"], body)
+        start_response(captured["status"], captured["headers"] + [
+            ("X-Cache", "MISS")
+        ])
+        return [body]
+
+    def store(self, url, status, headers, body):
+        named = {name.lower(): value for name, value in headers}
+        cache_control = named.get("cache-control", "")
+        ttl = S_MAXAGE.search(cache_control)
+        if (not status.startswith("200") or "public" not in cache_control
+                or ttl is None or "set-cookie" in named):
+            return
+        keys = set(named.get(surrogate.HEADER.lower(), "").split())
+        with self.lock:
+            self.entries[url] = {
+                "status": status,
+                "headers": list(headers),
+                "body": body,
+                "keys": keys,
+                "expires": time.monotonic() + int(ttl.group(1)),
+            }
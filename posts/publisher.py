@@ -0,0 +1,279 @@
+"""Статические копии лент для анонимов.
+
+Первые PUBLISH_PAGES страниц общей ленты, лент групп и профилей у всех
+анонимов одинаковы. Публикатор пишет их под PUBLISH_ROOT файлами
+<путь>/page-N.html и рядом .gz, так что фронтовый сервер отдаёт их без
+Python, например nginx:
+
+    map $arg_page $feed_page { "" 1; default $arg_page; }
+    location / {
+        gzip_static on;
+        if ($cookie_sessionid) { proxy_pass http://django; }
+        try_files $uri/page-$feed_page.html @django;
+    }
+
+Правки постов, комментариев, групп и подписок (posts.changes) ставят
+задачу publish_pages с отсрочкой PUBLISH_DELAY секунд: правки за это время
+публикуются одной перерисовкой. Без фронтового сервера файлы отдаёт
+StaticPages из yatube/wsgi.py.
+"""
+import gzip
+import os
+import tempfile
+from urllib.parse import parse_qs, unquote
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.http import Http404, parse_cookie
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve, reverse
+
+from . import tasks
+from .models import Group
+
+# имена url лент, которые публикуются
+FEEDS = ("index", "group", "profile")
+# «все опубликованные ленты»: после массовых правок мимо сигналов
+EVERYTHING = "*"
+
+
+def root():
+    return getattr(settings, "PUBLISH_ROOT", None)
+
+
+def enabled():
+    return bool(root())
+
+
+def pages():
+    return getattr(settings, "PUBLISH_PAGES", 3)
+
+
+def guard_key(path):
+    return f"publish:{path}"
+
+
+def url(name, **kwargs):
+    """Путь ленты без %-кодирования: так его видят и диск, и WSGI."""
+    return unquote(reverse(name, kwargs=kwargs or None))
+
+
+def file_for(path, number):
+    directory = os.path.join(root(), path.strip("/"))
+    return os.path.join(os.path.normpath(directory), f"page-{number}.html")
+
+
+def schedule(paths, using=None):
+    """Ставит перерисовку лент paths после коммита. Пока задача по пути
+    ждёт своей очереди, новые правки её не дублируют: задача снимает
+    метку в кэше до того, как читать базу, и увидит их все."""
+    if not enabled():
+        return
+    paths = set(paths)
+    delay = getattr(settings, "PUBLISH_DELAY", 2)
+
+    def enqueue():
+        for path in sorted(paths):
+            if not delay or cache.add(guard_key(path), 1, delay):
+                tasks.enqueue_in(delay, "publish_pages", path=path)
+
+    transaction.on_commit(enqueue, using=using)
+
+
+def published():
+    """Пути лент, у которых на диске есть первая страница."""
+    found = set()
+    for directory, _, names in os.walk(root()):
+        if "page-1.html" in names:
+            relative = os.path.relpath(directory, root())
+            found.add("/" if relative == "." else f"/{relative}/")
+    return found
+
+
+def write(name, content):
+    """Атомарная замена: читатель видит либо старый файл, либо новый."""
+    directory = os.path.dirname(name)
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(content)
+        # mkstemp создаёт файл 0600, а читает его фронтовый сервер
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, name)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def remove(path, start=1):
+    """Убирает страницы ленты с номера start: их отдаст Django."""
+    directory = os.path.dirname(file_for(path, 1))
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        number = name.split(".")[0][len("page-"):]
+        if name.startswith("page-") and number.isdigit():
+            if int(number) >= start:
+                os.unlink(os.path.join(directory, name))
+
+
+def publish(path):
+    """Перерисовывает первые PUBLISH_PAGES страниц ленты path так, как
+    их видит аноним. Ленту, которой больше нет, убирает с диска."""
+    try:
+        match = resolve(path)
+    except Resolver404:
+        match = None
+    if match is None or match.url_name not in FEEDS:
+        # профиль пользователя с именем вроде new закрыт другим url
+        remove(path)
+        return
+    # фрагмент index_page в кэше один на все страницы общей ленты
+    fragment = make_template_fragment_key("index_page")
+    factory = RequestFactory()
+    html = ""
+    written = 0
+    for number in range(1, pages() + 1):
+        # страница есть, только если на неё ссылается предыдущая
+        if number > 1 and f'href="?page={number}"' not in html:
+            break
+        request = factory.get(path, {"page": number} if number > 1 else {})
+        request.user = AnonymousUser()
+        if match.url_name == "index":
+            cache.delete(fragment)
+        try:
+            response = match.func(request, *match.args, **match.kwargs)
+        except Http404:
+            break
+        if response.status_code != 200:
+            break
+        html = response.content.decode()
+        name = file_for(path, number)
+        write(name, response.content)
+        write(f"{name}.gz", gzip.compress(response.content))
+        written = number
+    if match.url_name == "index":
+        cache.delete(fragment)
+    remove(path, written + 1)
+
+
+def publish_paths(paths):
+    paths = set(paths)
+    for path in paths:
+        cache.delete(guard_key(path))
+    if EVERYTHING in paths:
+        paths = (paths - {EVERYTHING}) | published() | {"/"}
+    for path in sorted(paths):
+        publish(path)
+
+
+def group_paths(group_ids):
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        "slug", flat=True
+    )
+    return [url("group", slug=slug) for slug in slugs]
+
+
+def post_paths(post, group_ids=()):
+    """Ленты, где видна карточка поста: общая, профиль автора, группа."""
+    group_ids = {*group_ids, post.group_id} - {None}
+    return [
+        url("index"),
+        url("profile", username=post.author.username),
+        *group_paths(group_ids),
+    ]
+
+
+# Подписчики posts.changes
+
+def post_changed(sender, post, old_group_id, using=None, **kwargs):
+    if enabled():
+        schedule(post_paths(post, [old_group_id]), using)
+
+
+def comment_added(sender, comment, using=None, **kwargs):
+    # на карточке поста число комментариев
+    if enabled():
+        schedule(post_paths(comment.post), using)
+
+
+def group_changed(sender, group, slugs, **kwargs):
+    """Название группы есть на карточках общей ленты; старый адрес
+    переименованной группы отдаёт 404 и убирается с диска."""
+    if enabled():
+        schedule([
+            url("index"), *(url("group", slug=slug) for slug in slugs)
+        ])
+
+
+def follow_changed(sender, follow, **kwargs):
+    # в профиле счётчики подписчиков и подписок
+    if enabled():
+        schedule([
+            url("profile", username=follow.user.username),
+            url("profile", username=follow.author.username),
+        ])
+
+
+def everything_changed(sender, using=None, **kwargs):
+    if enabled():
+        schedule([EVERYTHING], using)
+
+
+class StaticPages:
+    """WSGI-обёртка: отдаёт анониму опубликованную страницу ленты с
+    диска, не заходя в Django. Запросы с сессией и всё, чего нет на
+    диске, проходят в приложение."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        name = self.find(environ)
+        if name is None:
+            return self.application(environ, start_response)
+        gzipped = "gzip" in environ.get("HTTP_ACCEPT_ENCODING", "")
+        try:
+            with open(f"{name}.gz" if gzipped else name, "rb") as fh:
+                content = fh.read()
+        except FileNotFoundError:
+            return self.application(environ, start_response)
+        headers = [
+            ("Content-Type", "text/html; charset=utf-8"),
+            ("Content-Length", str(len(content))),
+            ("Vary", "Accept-Encoding, Cookie"),
+        ]
+        if gzipped:
+            headers.append(("Content-Encoding", "gzip"))
+        start_response("200 OK", headers)
+        return [b"" if environ["REQUEST_METHOD"] == "HEAD" else content]
+
+    @staticmethod
+    def find(environ):
+        if not enabled() or environ["REQUEST_METHOD"] not in ("GET", "HEAD"):
+            return None
+        cookies = parse_cookie(environ.get("HTTP_COOKIE", ""))
+        if settings.SESSION_COOKIE_NAME in cookies:
+            return None
+        query = parse_qs(environ.get("QUERY_STRING", ""))
+        if set(query) - {"page"}:
+            return None
+        number = query.get("page", ["1"])[-1]
+        if not number.isdigit() or not 1 <= int(number) <= pages():
+            return None
+        # PATH_INFO в WSGI — байты UTF-8, прочитанные как latin-1
+        path = environ.get("PATH_INFO", "").encode("latin-1").decode(
+            "utf-8", "replace"
+        )
+        if not path.endswith("/") or ".." in path.split("/"):
+            return None
+        name = file_for(path, int(number))
+        if not name.startswith(os.path.normpath(root()) + os.sep):
+            return None
+        return name
@@ -0,0 +1,57 @@
+from django.urls import reverse
+from django.utils.html import escape, format_html
+from django.utils.safestring import mark_safe
+
+from . import tags
+
+# Меняется вместе с правилами render(): строки со старой версией
+# перерисовывает команда rerender.
+RENDERER_VERSION = 2
+
+
+def _link(match):
+    if match.group("tag"):
+        name = tags.normalize(tags.HASHTAG, match.group("tag"))
+        url = reverse("tag", args=[name])
+    else:
+        url = reverse("profile", args=[match.group("user")])
+    return format_html('<a href="{}">{}</a>', url, match.group(0))
+
+
+def render(text):
+    """Текст поста или комментария в безопасный HTML: всё экранируется,
+    переводы строк становятся <br> (как фильтр linebreaksbr), #теги и
+    @упоминания — ссылками."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    parts = []
+    position = 0
+    for match in tags.TOKEN.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        parts.append(_link(match))
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return mark_safe("".join(parts).replace("\n", "<br>"))
+
+
+def rerender(queryset, batch_size=500):
+    """Перерисовывает строки queryset пачками по pk, возвращает их число.
+
+    Работает и с историческими моделями из миграций: нужны только поля
+    text, text_html и render_version.
+    """
+    done = 0
+    last_id = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_id)
+            .order_by("pk")
+            .only("pk", "text")[:batch_size]
+        )
+        if not batch:
+            return done
+        last_id = batch[-1].pk
+        for obj in batch:
+            obj.text_html = render(obj.text)
+            obj.render_version = RENDERER_VERSION
+        queryset.bulk_update(batch, ["text_html", "render_version"])
+        done += len(batch)
@@ -0,0 +1,267 @@
+import copy
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import cards, feeds
+from .models import Post
+from .utils import shared_cache
+
+GLOBAL = "*"
+
+
+def generation_key(key):
+    return f"feeds:ring:{key}"
+
+
+def ring_keys(group_id):
+    """Ленты с кольцами: общая и лента группы поста."""
+    keys = [feeds.ALL]
+    if group_id is not None:
+        keys.append(feeds.group_key(group_id))
+    return keys
+
+
+def bump(key):
+    """Новое поколение ленты в общем кэше: другие процессы увидят, что
+    их кольцо устарело, и перечитают его из базы."""
+    name = generation_key(key)
+    try:
+        return cache.incr(name)
+    except ValueError:
+        cache.add(name, 0, None)
+        return cache.incr(name)
+
+
+class Ring:
+    __slots__ = ("generation", "count", "cards", "loaded")
+
+    def __init__(self, generation, count, cards, size):
+        self.generation = generation
+        self.count = count
+        self.cards = deque(cards, maxlen=size)
+        self.loaded = time.monotonic()
+
+    @property
+    def complete(self):
+        # в кольце вся лента целиком, а не только её голова; count равен
+        # None без подсчёта (FEED_COUNTS = False), когда лента длиннее
+        return self.count is not None and len(self.cards) >= self.count
+
+    def index(self, post_id):
+        for position, card in enumerate(self.cards):
+            if card.id == post_id:
+                return position
+        return None
+
+    def put(self, card, added):
+        whole = self.complete
+        position = self.index(card.id)
+        present = position is not None
+        if present:
+            del self.cards[position]
+        if added and self.count is not None:
+            self.count += 1
+        keys = [(-item.pub_date.timestamp(), -item.id) for item in self.cards]
+        position = bisect_left(keys, (-card.pub_date.timestamp(), -card.id))
+        if position == len(self.cards) and not (whole or present):
+            # старше хвоста: за кольцом есть посты новее, место не наше
+            return
+        if len(self.cards) == self.cards.maxlen:
+            if position == len(self.cards):
+                return
+            self.cards.pop()
+        self.cards.insert(position, card)
+
+    def discard(self, post_id):
+        position = self.index(post_id)
+        if position is not None:
+            del self.cards[position]
+        if self.count is not None:
+            self.count -= 1
+
+
+class FeedRings:
+    """Головы горячих лент в памяти процесса: последние FEED_RING_SIZE
+    карточек общей ленты и лент FEED_RING_GROUPS групп, которые читали
+    последними.
+
+    Правки постов и комментариев (posts.changes) правят кольца своего
+    процесса на месте и поднимают поколение ленты в общем кэше. Кольцо с
+    чужим поколением (или старше FEED_RING_TTL секунд) перечитывается из
+    базы; страницы за пределами кольца читаются из базы как обычно. С
+    кэшем одного процесса (LocMemCache) чужих поколений не видно, и
+    кольца выключены.
+    """
+
+    def __init__(self):
+        self._rings = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return getattr(settings, "FEED_RING_SIZE", 50)
+
+    @property
+    def enabled(self):
+        return bool(self.size) and shared_cache()
+
+    def page(self, key, feed, number, per_page):
+        """Карточки страницы number и число постов или None, если
+        страницу надо читать из базы. feed — cards.CardFeed ленты. Число
+        None — лента без подсчёта, карточек тогда на одну больше."""
+        if not self.enabled or not self.accepts(key):
+            return None
+        generation = self.generation(key)
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is not None:
+                self._rings.move_to_end(key)
+        if ring is None or self.stale(ring, generation):
+            ring = self.load(key, feed, generation)
+        bottom = (number - 1) * per_page
+        if ring.complete:
+            if bottom and bottom >= ring.count:
+                return None
+            return list(ring.cards)[bottom:bottom + per_page], ring.count
+        # строка сверх страницы нужна, чтобы знать, есть ли следующая
+        rows = list(ring.cards)[bottom:bottom + per_page + 1]
+        if len(rows) <= per_page:
+            return None
+        if ring.count is None:
+            # без подсчёта строка сверх страницы уходит в feeds.page
+            return rows, None
+        return rows[:per_page], ring.count
+
+    @staticmethod
+    def accepts(key):
+        return key == feeds.ALL or key.startswith(feeds.group_key(""))
+
+    @staticmethod
+    def generation(key):
+        names = [generation_key(GLOBAL), generation_key(key)]
+        values = cache.get_many(names)
+        return tuple(values.get(name, 0) for name in names)
+
+    @staticmethod
+    def stale(ring, generation):
+        ttl = getattr(settings, "FEED_RING_TTL", 60)
+        expired = ttl is not None and time.monotonic() - ring.loaded > ttl
+        return expired or ring.generation != generation
+
+    def load(self, key, feed, generation):
+        rows = list(feed[:self.size + 1])
+        if getattr(settings, "FEED_COUNTS", True):
+            count = feeds.count(key, feed)
+        else:
+            count = len(rows) if len(rows) <= self.size else None
+        ring = Ring(generation, count, rows[:self.size], self.size)
+        with self._lock:
+            self._rings[key] = ring
+            self._rings.move_to_end(key)
+            groups = [name for name in self._rings if name != feeds.ALL]
+            for name in groups[:-getattr(settings, "FEED_RING_GROUPS", 20)]:
+                del self._rings[name]
+        return ring
+
+    def apply(self, key, change):
+        """Поднимает поколение ленты и правит своё кольцо функцией
+        change(ring). change работает под блокировкой всех колец, поэтому
+        только с памятью: в базу за карточкой ходят до вызова. Если
+        кольцо уже отстало, оно просто выбрасывается."""
+        if not self.enabled:
+            return
+        value = bump(key)
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                return
+            if ring.generation[1] != value - 1:
+                del self._rings[key]
+                return
+            change(ring)
+            ring.generation = (ring.generation[0], value)
+
+    def invalidate(self, keys=None):
+        """Массовые правки мимо сигналов: кольца перечитаются из базы во
+        всех процессах. Без keys — все ленты сразу."""
+        if not self.enabled:
+            return
+        for key in keys or [GLOBAL]:
+            bump(key)
+        with self._lock:
+            if keys is None:
+                self._rings.clear()
+            for key in keys or ():
+                self._rings.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._rings.clear()
+
+
+rings = FeedRings()
+
+
+def card_for(post, created):
+    """Карточка для колец, собирается до блокировки колец. Правленый
+    пост перечитывается из базы: версия в экземпляре до конца save() —
+    выражение F()."""
+    if created:
+        return cards.from_post(post)
+    queryset = Post.objects.using(post._state.db).filter(pk=post.pk)
+    card, = cards.rows(queryset)
+    return card
+
+
+def put(card, added):
+    def change(ring):
+        # у каждого кольца своя копия: счётчик комментариев правится
+        # на месте
+        ring.put(copy.copy(card), added)
+    return change
+
+
+# Подписчики posts.changes
+
+def post_changed(sender, post, created, removed, old_group_id, **kwargs):
+    if removed:
+        for key in ring_keys(post.group_id):
+            rings.apply(key, lambda ring: ring.discard(post.pk))
+        return
+    before = ring_keys(old_group_id)
+    after = ring_keys(post.group_id)
+    for key in before:
+        if key not in after:
+            rings.apply(key, lambda ring: ring.discard(post.pk))
+    if not rings.enabled:
+        return
+    card = card_for(post, created)
+    for key in after:
+        rings.apply(key, put(card, created or key not in before))
+
+
+def comment_added(sender, comment, **kwargs):
+    """Новый комментарий меняет счётчик на карточке поста. Удаления
+    комментариев идут только вместе с постом, им сигнал не нужен."""
+    def change(ring):
+        position = ring.index(comment.post_id)
+        if position is not None:
+            card = ring.cards[position]
+            card.comment_count += 1
+            card.version += 1
+    for key in ring_keys(comment.post.group_id):
+        rings.apply(key, change)
+
+
+def group_changed(sender, group, **kwargs):
+    # название и адрес группы на карточках
+    rings.invalidate([feeds.ALL, feeds.group_key(group.pk)])
+
+
+def everything_changed(sender, **kwargs):
+    rings.invalidate()
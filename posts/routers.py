@@ -0,0 +1,169 @@
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import metrics, sharding
+
+_local = threading.local()
+
+# Сколько чтений ушло на основную базу и на каждую реплику.
+read_stats = Counter()
+
+db_reads = metrics.registry.counter(
+    "yatube_db_reads_total",
+    "Чтения по базам: основная или реплика",
+    labels=("alias",),
+)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", ())
+
+
+def is_pinned():
+    return getattr(_local, "pinned", False)
+
+
+@contextmanager
+def use_primary():
+    """Все чтения внутри блока идут в основную базу."""
+    previous = is_pinned()
+    _local.pinned = True
+    try:
+        yield
+    finally:
+        _local.pinned = previous
+
+
+def reset_write_flag():
+    _local.wrote = False
+
+
+def wrote():
+    return getattr(_local, "wrote", False)
+
+
+@contextmanager
+def unit_of_work():
+    """Шаг вне запроса: задача, пачка писем. Запись внутри прикалывает
+    к основной базе только этот шаг, а не весь остаток жизни потока."""
+    reset_write_flag()
+    try:
+        yield
+    finally:
+        reset_write_flag()
+
+
+class ReplicaRouter:
+    """Чтения лент и профилей на случайную реплику из DATABASE_REPLICAS,
+    записи на default.
+
+    На реплики уходят только модели из replicated. Пользователи, сессии,
+    очереди задач и писем, счётчики лент читаются из default: отставание
+    реплики там ломает вход и захват задач. После записи поток
+    «прикалывается» к основной базе до конца запроса (или unit_of_work),
+    а ReplicaPinningMiddleware переносит это на следующие запросы
+    пользователя на REPLICA_PIN_SECONDS.
+    """
+
+    replicated = {
+        "posts.post", "posts.comment", "posts.group", "posts.tag",
+        "posts.tagindex", "posts.archivedpost", "posts.archivedcomment",
+    }
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases:
+            return None
+        if model._meta.label_lower not in self.replicated:
+            # явно: иначе Django возьмёт базу объекта из подсказки, и
+            # post.author прочитался бы с той же реплики
+            return "default"
+        if is_pinned() or wrote():
+            alias = "default"
+        else:
+            alias = random.choice(aliases)
+        read_stats[alias] += 1
+        db_reads.inc(alias=alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        if not replicas():
+            return None
+        _local.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {"default", *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
+
+
+class ShardRouter:
+    """Post и Comment живут на шарде автора поста (POST_SHARDS).
+
+    Маршрут выводится из подсказки instance: автор для author.posts,
+    пост для post.comments и записи комментария. Чтения без подсказки
+    не маршрутизируются — ленты собираются через sharding.feed().
+    """
+
+    sharded = {"posts.post", "posts.comment"}
+
+    def _shard(self, model, hints):
+        instance = hints.get("instance")
+        if instance is None:
+            return None
+        label = instance._meta.label_lower
+        if label == "posts.post":
+            if instance._state.db in sharding.shards():
+                return instance._state.db
+            return sharding.shard_for(instance.author_id)
+        if label == "posts.comment":
+            post = instance.post
+            if post._state.db in sharding.shards():
+                return post._state.db
+            return sharding.shard_for(post.author_id)
+        if label == settings.AUTH_USER_MODEL.lower():
+            if model._meta.label_lower == "posts.post":
+                return sharding.shard_for(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        if not sharding.enabled():
+            return None
+        if model._meta.label_lower not in self.sharded:
+            # post.author и post.group: без роутера Django взял бы базу
+            # самого поста, а пользователи и группы живут в default.
+            if self._on_shard(hints):
+                return ReplicaRouter().db_for_read(model) or "default"
+            return None
+        return self._shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        if not sharding.enabled():
+            return None
+        if model._meta.label_lower not in self.sharded:
+            return "default" if self._on_shard(hints) else None
+        return self._shard(model, hints)
+
+    @staticmethod
+    def _on_shard(hints):
+        instance = hints.get("instance")
+        return instance is not None and instance._state.db in sharding.shards()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not sharding.enabled():
+            return None
+        pool = {"default", *replicas(), *sharding.shards()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
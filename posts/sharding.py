@@ -0,0 +1,151 @@
+import heapq
+import zlib
+from collections import defaultdict
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import connections, models
+
+# Смещение автоинкремента на шарде i: (i + 1) << 40. Так id постов и
+# комментариев уникальны глобально и сохраняются при переносе.
+SEQUENCE_SHIFT = 40
+SHARDED_TABLES = ("posts_post", "posts_comment")
+
+
+def shards():
+    return getattr(settings, "POST_SHARDS", ())
+
+
+def enabled():
+    return bool(shards())
+
+
+def shard_for(author_id):
+    aliases = shards()
+    return aliases[zlib.crc32(str(author_id).encode()) % len(aliases)]
+
+
+class ShardedQuerySet(models.QuerySet):
+    """create() без явного using() отдаёт выбор базы роутеру с подсказкой
+    instance, как при obj.save(): иначе запись ушла бы в default."""
+
+    def create(self, **kwargs):
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
+class ScatterGather:
+    """Лента, собранная с нескольких шардов.
+
+    Каждый шард отдаёт первые stop строк в нужном порядке, результаты
+    сливаются k-way merge. Подходит Paginator'у: есть count() и срезы.
+    """
+
+    ordered = True
+
+    def __init__(self, querysets, ordering=("-pub_date", "-id")):
+        self.querysets = {
+            alias: queryset.using(alias).order_by(*ordering)
+            for alias, queryset in querysets.items()
+        }
+        self.fields = [field.lstrip("-") for field in ordering]
+        self.reverse = ordering[0].startswith("-")
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets.values())
+
+    def __len__(self):
+        return self.count()
+
+    def _merged(self, stop):
+        parts = [
+            list(queryset if stop is None else queryset[:stop])
+            for queryset in self.querysets.values()
+        ]
+        return heapq.merge(
+            *parts, key=attrgetter(*self.fields), reverse=self.reverse
+        )
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            if key.step is not None:
+                raise ValueError("Шаг среза не поддерживается")
+            start = key.start or 0
+            return list(islice(self._merged(key.stop), start, key.stop))
+        return self[key:key + 1][0]
+
+    def __iter__(self):
+        return iter(self._merged(None))
+
+
+def feed(queryset, author_ids=None):
+    """Лента постов: обычный queryset или сбор со всех шардов.
+
+    author_ids ограничивает ленту авторами (follow_index): тогда на
+    каждый шард уходит только его часть списка.
+    """
+    if not enabled():
+        if author_ids is not None:
+            return queryset.filter(author_id__in=author_ids)
+        return queryset
+    if author_ids is None:
+        return ScatterGather({alias: queryset for alias in shards()})
+    by_shard = defaultdict(list)
+    for author_id in author_ids:
+        by_shard[shard_for(author_id)].append(author_id)
+    return ScatterGather({
+        alias: queryset.filter(author_id__in=ids)
+        for alias, ids in by_shard.items()
+    })
+
+
+def by_ids(queryset, ids):
+    """Объекты по списку id в том же порядке. Шард по id не вычислить,
+    поэтому при шардировании запрос уходит в каждый шард."""
+    if enabled():
+        found = {
+            obj.pk: obj
+            for alias in shards()
+            for obj in queryset.using(alias).filter(pk__in=ids)
+        }
+    else:
+        found = queryset.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
+
+
+def with_authors(queryset):
+    """JOIN с auth_user работает только в одной базе: на шардах авторы
+    подтягиваются отдельным запросом в default."""
+    if enabled():
+        return queryset.prefetch_related("author")
+    return queryset.select_related("author")
+
+
+def init_sequences(sender, using, **kwargs):
+    """post_migrate: разводит автоинкремент шардов по диапазонам."""
+    aliases = list(shards())
+    if using not in aliases:
+        return
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    offset = (aliases.index(using) + 1) << SEQUENCE_SHIFT
+    with connection.cursor() as cursor:
+        for table in SHARDED_TABLES:
+            cursor.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = %s", [table]
+            )
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute(
+                    "INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)",
+                    [table, offset],
+                )
+            elif row[0] < offset:
+                cursor.execute(
+                    "UPDATE sqlite_sequence SET seq = %s WHERE name = %s",
+                    [offset, table],
+                )
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.template.base import Node
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"\(\s*(?:\?\s*,\s*)*\?\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """SQL без значений: одинаковые по форме запросы дают одну строку."""
+    sql = _STRING.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDERS.sub("(?)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:16]
+
+
+def _origin():
+    """Ищет по стеку вью и строку шаблона, из которых пришёл запрос."""
+    view = template = None
+    frame = sys._getframe(2)
+    while frame is not None and (view is None or template is None):
+        if template is None:
+            node = frame.f_locals.get("self")
+            if isinstance(node, Node) and getattr(node, "token", None):
+                origin = getattr(node, "origin", None)
+                name = origin.template_name if origin else None
+                template = f"{name}:{node.token.lineno}"
+        if view is None:
+            module = frame.f_globals.get("__name__", "")
+            if module.endswith(".views"):
+                view = f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return view, template
+
+
+def _jsonable(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _jsonable(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_jsonable(value) for value in params]
+    if isinstance(params, (str, int, float, bool)):
+        return params
+    return repr(params)
+
+
+class SlowQueryLog:
+    """Обёртка execute: запросы дольше SLOW_QUERY_THRESHOLD_MS пишутся
+    строкой JSON в SLOW_QUERY_LOG. План запроса снимается один раз на
+    отпечаток в процессе, повторы пишутся коротко."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self.seen = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(self._local, "busy", False):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            threshold = getattr(settings, "SLOW_QUERY_THRESHOLD_MS", None)
+            if threshold is not None and elapsed >= threshold:
+                self._local.busy = True
+                try:
+                    self.record(
+                        context["connection"], sql, params, many, elapsed
+                    )
+                finally:
+                    self._local.busy = False
+
+    def record(self, connection, sql, params, many, elapsed):
+        key = fingerprint(sql)
+        view, template = _origin()
+        entry = {
+            "fingerprint": key,
+            "ms": round(elapsed, 3),
+            "view": view,
+            "template": template,
+            "time": time.time(),
+        }
+        if key not in self.seen:
+            self.seen[key] = True
+            entry.update({
+                "sql": sql,
+                "normalized": normalize(sql),
+                "params": None if many else _jsonable(params),
+                "plan": None if many else self.explain(connection, sql, params),
+            })
+        self.write(entry)
+
+    @staticmethod
+    def explain(connection, sql, params):
+        if not sql.lstrip().upper().startswith("SELECT"):
+            return None
+        prefix = (
+            "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite"
+            else "EXPLAIN "
+        )
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                return [" ".join(str(col) for col in row)
+                        for row in cursor.fetchall()]
+        except Exception as exc:
+            return [f"EXPLAIN failed: {exc}"]
+
+    @staticmethod
+    def write(entry):
+        path = getattr(settings, "SLOW_QUERY_LOG", None)
+        if not path:
+            return
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        # O_APPEND: строки нескольких воркеров не перемешиваются
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+
+
+slow_query_log = SlowQueryLog()
+
+
+def install(connection):
+    if slow_query_log not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_log)
+
+
+def on_connection_created(sender, connection, **kwargs):
+    if getattr(settings, "SLOW_QUERY_THRESHOLD_MS", None) is not None:
+        install(connection)
+
+
+def read(path):
+    """Собирает записи журнала по отпечаткам."""
+    stats = {}
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            item = stats.setdefault(entry["fingerprint"], {
+                "fingerprint": entry["fingerprint"],
+                "durations": [],
+                "views": set(),
+                "templates": set(),
+            })
+            item["durations"].append(entry["ms"])
+            if entry.get("view"):
+                item["views"].add(entry["view"])
+            if entry.get("template"):
+                item["templates"].add(entry["template"])
+            for field in ("sql", "normalized", "params", "plan"):
+                if field in entry and field not in item:
+                    item[field] = entry[field]
+    for item in stats.values():
+        durations = sorted(item["durations"])
+        item["count"] = len(durations)
+        item["total_ms"] = round(sum(durations), 3)
+        item["p50_ms"] = durations[len(durations) // 2]
+        item["p95_ms"] = durations[min(len(durations) - 1,
+                                       int(len(durations) * 0.95))]
+        item["max_ms"] = durations[-1]
+    return stats
@@ -0,0 +1,148 @@
+"""Surrogate-Key для кэширующего прокси перед приложением.
+
+Представления помечают запрос ключами объектов, из которых собран
+ответ: посты, авторы, группы, ленты. SurrogateKeyMiddleware выводит их в
+заголовок Surrogate-Key и разрешает прокси хранить ответы анонимам
+SURROGATE_MAX_AGE секунд. По правкам из posts.changes собираются ключи
+изменённых объектов, а задача purge_surrogate_keys отправляет их пачками POST'ом на
+SURROGATE_PURGE_URL с тем же заголовком.
+"""
+import hashlib
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+
+from . import feeds, tags, tasks
+
+HEADER = "Surrogate-Key"
+# ключ у каждого ответа: сброс всего кэша после массовых правок
+SITE = "site"
+
+
+def post_key(post_id):
+    return f"post:{post_id}"
+
+
+def user_key(user_id):
+    return f"user:{user_id}"
+
+
+def group_key(group_id):
+    return f"group:{group_id}"
+
+
+def follow_key(user_id):
+    # счётчики подписок в профиле
+    return f"follow:{user_id}"
+
+
+def feed_key(counter):
+    """Лента по ключу её счётчика из posts.feeds."""
+    return f"feed:{counter}"
+
+
+def tag_key(kind, name):
+    # заголовки HTTP — latin-1, а имена тегов бывают кириллицей
+    digest = hashlib.sha1(f"{kind}{name}".encode()).hexdigest()[:16]
+    return f"feed:tag:{digest}"
+
+
+def tag(request, *keys, public=True):
+    """Добавляет ключи ответу на request. public=False — ответ не
+    кэшируется прокси даже для анонима."""
+    request.surrogate_keys = getattr(request, "surrogate_keys", set())
+    request.surrogate_keys.update(keys)
+    request.surrogate_public = (
+        getattr(request, "surrogate_public", True) and public
+    )
+
+
+def post_keys(posts):
+    """Ключи карточек: пост, автор и группа каждого поста."""
+    keys = set()
+    for post in posts:
+        keys.add(post_key(post.pk))
+        keys.add(user_key(post.author_id))
+        if post.group_id is not None:
+            keys.add(group_key(post.group_id))
+    return keys
+
+
+def url():
+    return getattr(settings, "SURROGATE_PURGE_URL", None)
+
+
+def enabled():
+    return bool(url())
+
+
+def purge(keys, using=None):
+    """Ставит сброс ключей после коммита; задачи одной пачки воркера
+    сливаются в один запрос."""
+    if not enabled() or not keys:
+        return
+    keys = sorted(keys)
+    transaction.on_commit(
+        lambda: tasks.enqueue("purge_surrogate_keys", keys=keys),
+        using=using,
+    )
+
+
+def send(keys):
+    """POST на SURROGATE_PURGE_URL по SURROGATE_PURGE_BATCH ключей в
+    заголовке. Ошибка HTTP уходит в повтор задачи."""
+    keys = sorted(keys)
+    size = getattr(settings, "SURROGATE_PURGE_BATCH", 256)
+    headers = getattr(settings, "SURROGATE_PURGE_HEADERS", {})
+    timeout = getattr(settings, "SURROGATE_PURGE_TIMEOUT", 5)
+    for start in range(0, len(keys), size):
+        request = urllib.request.Request(
+            url(), method="POST", data=b"",
+            headers={**headers, HEADER: " ".join(keys[start:start + size])},
+        )
+        with urllib.request.urlopen(request, timeout=timeout):
+            pass
+
+
+def changed_post_keys(post, group_ids=()):
+    """Пост и ленты, в которые он входит; у правленого поста ещё и
+    прежняя группа."""
+    keys = {
+        post_key(post.pk),
+        feed_key(feeds.ALL),
+        feed_key(feeds.author_key(post.author_id)),
+    }
+    for group_id in {*group_ids, post.group_id} - {None}:
+        keys.add(feed_key(feeds.group_key(group_id)))
+    for kind, name in tags.extract(post.text):
+        keys.add(tag_key(kind, name))
+    return keys
+
+
+# Подписчики posts.changes
+
+def post_changed(sender, post, old_group_id, using=None, **kwargs):
+    if enabled():
+        purge(changed_post_keys(post, [old_group_id]), using)
+
+
+def comment_added(sender, comment, using=None, **kwargs):
+    # число комментариев на карточке и сам комментарий на странице поста
+    if enabled():
+        purge([post_key(comment.post_id)], using)
+
+
+def group_changed(sender, group, **kwargs):
+    if enabled():
+        purge([group_key(group.pk)])
+
+
+def follow_changed(sender, follow, **kwargs):
+    if enabled():
+        purge([follow_key(follow.user_id), follow_key(follow.author_id)])
+
+
+def everything_changed(sender, using=None, **kwargs):
+    if enabled():
+        purge([SITE], using)
@@ -0,0 +1,98 @@
+import re
+
+from django.db import transaction
+
+HASHTAG = "#"
+MENTION = "@"
+
+# #тег — только буквы, цифры и _; @имя — как username Django, но без
+# точки или дефиса в конце (конец предложения).
+TOKEN = re.compile(
+    r"(?<![\w#@])(?:#(?P<tag>\w+)|@(?P<user>\w(?:[\w.@+-]*\w)?))"
+)
+MAX_LENGTH = 150
+
+
+def normalize(kind, name):
+    return name.lower() if kind == HASHTAG else name
+
+
+def extract(text):
+    """Множество (вид, имя) из текста: теги в нижнем регистре, упоминания
+    как есть — username в Django чувствителен к регистру."""
+    found = set()
+    for match in TOKEN.finditer(text):
+        kind = HASHTAG if match.group("tag") else MENTION
+        name = normalize(kind, match.group("tag") or match.group("user"))
+        if len(name) <= MAX_LENGTH:
+            found.add((kind, name))
+    return found
+
+
+def index_posts(posts, tag_model=None, index_model=None):
+    """Перестраивает записи индекса для постов: старые удаляются, новые
+    вставляются пачкой. Индекс общий для всех шардов и живёт в default.
+
+    Модели передаются явно из миграций (исторические версии).
+    """
+    if tag_model is None:
+        from .models import Tag as tag_model, TagIndex as index_model
+
+    wanted = {post.pk: extract(post.text) for post in posts}
+    names = set().union(*wanted.values())
+    with transaction.atomic(using="default"):
+        tag_ids = _tag_ids(tag_model, names)
+        index_model.objects.using("default").filter(
+            post_id__in=list(wanted)
+        ).delete()
+        index_model.objects.using("default").bulk_create([
+            index_model(
+                tag_id=tag_ids[key], pub_date=post.pub_date, post_id=post.pk
+            )
+            for post in posts for key in wanted[post.pk]
+        ])
+
+
+def reindex(queryset, tag_model=None, index_model=None, batch_size=500):
+    """Индексирует посты queryset пачками по pk, возвращает их число."""
+    done = 0
+    last_id = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_id)
+            .order_by("pk")
+            .only("pk", "text", "pub_date")[:batch_size]
+        )
+        if not batch:
+            return done
+        last_id = batch[-1].pk
+        index_posts(batch, tag_model, index_model)
+        done += len(batch)
+
+
+def _tag_ids(tag_model, names):
+    if not names:
+        return {}
+    tags = tag_model.objects.using("default")
+    by_kind = {}
+    for kind, name in names:
+        by_kind.setdefault(kind, []).append(name)
+
+    def existing():
+        return {
+            (kind, name): pk
+            for kind, names_of_kind in by_kind.items()
+            for pk, name in tags.filter(
+                kind=kind, name__in=names_of_kind
+            ).values_list("pk", "name")
+        }
+
+    ids = existing()
+    missing = names - set(ids)
+    if missing:
+        tags.bulk_create(
+            [tag_model(kind=kind, name=name) for kind, name in missing],
+            ignore_conflicts=True,
+        )
+        ids = existing()
+    return ids
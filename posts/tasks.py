@@ -0,0 +1,157 @@
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from . import leases, routers
+from .models import Task
+
+logger = logging.getLogger("posts.tasks")
+
+handlers = {}
+
+
+def task(name, batch=False):
+    """Регистрирует обработчик задачи. Обработчик с batch=True получает
+    список payload'ов всех взятых задач этого типа за один вызов, иначе
+    вызывается на каждую задачу с её payload'ом как kwargs."""
+    def register(func):
+        handlers[name] = (func, batch)
+        return func
+    return register
+
+
+def queue():
+    return Task.objects.using(router.db_for_write(Task))
+
+
+def enqueue(name, **payload):
+    """Ставит задачу после коммита текущей транзакции: воркер не увидит
+    ещё не записанных данных, а откат не оставит лишних задач."""
+    enqueue_in(0, name, **payload)
+
+
+def enqueue_in(delay, name, **payload):
+    """То же, что enqueue, но задача станет готова через delay секунд."""
+    if name not in handlers:
+        raise ValueError(f"Неизвестная задача {name}")
+    alias = router.db_for_write(Task)
+    transaction.on_commit(
+        lambda: Task.objects.using(alias).create(
+            name=name,
+            payload=json.dumps(payload, sort_keys=True),
+            run_after=timezone.now() + timedelta(seconds=delay),
+        ),
+        using=alias,
+    )
+
+
+def claim(batch_size):
+    """Забирает готовые задачи одного типа (posts.leases): пачку для
+    обработчика с batch=True, иначе одну задачу — у каждой своя аренда
+    и свои попытки. Задачи упавшего воркера становятся доступны, когда
+    аренда истечёт."""
+    ready = queue().filter(
+        status__in=(Task.PENDING, Task.RUNNING), run_after__lte=timezone.now()
+    )
+    first = ready.order_by("run_after", "pk").values_list("name").first()
+    if first is None:
+        return None, []
+    name = first[0]
+    if not handlers.get(name, (None, False))[1]:
+        batch_size = 1
+    lease = timedelta(seconds=getattr(settings, "TASK_LEASE", 300))
+    rows = leases.claim(
+        ready.filter(name=name), "run_after", batch_size, lease,
+        status=Task.RUNNING,
+    )
+    return name, rows
+
+
+@routers.unit_of_work()
+def run_batch(batch_size=None):
+    """Выполняет одну пачку. Возвращает число взятых задач."""
+    if batch_size is None:
+        batch_size = getattr(settings, "TASK_BATCH_SIZE", 50)
+    name, rows = claim(batch_size)
+    if not rows:
+        return 0
+    func, batch = handlers.get(name, (None, False))
+    if batch:
+        attempt(name, rows, func, [json.loads(row.payload) for row in rows])
+    else:
+        for row in rows:
+            attempt(name, [row], func, **json.loads(row.payload))
+    return len(rows)
+
+
+def attempt(name, rows, func, *args, **kwargs):
+    """Вызывает обработчик: при успехе удаляет задачи rows, при ошибке
+    отправляет их на повтор."""
+    try:
+        if func is None:
+            raise LookupError(f"Обработчик {name} не зарегистрирован")
+        func(*args, **kwargs)
+    except Exception as exc:
+        logger.exception("Задача %s упала на пачке из %s", name, len(rows))
+        retry(rows, exc)
+    else:
+        queue().filter(pk__in=[row.pk for row in rows]).delete()
+
+
+def retry(rows, exc):
+    base = getattr(settings, "TASK_RETRY_DELAY", 10)
+    limit = getattr(settings, "TASK_MAX_ATTEMPTS", 5)
+    for row in rows:
+        leases.retry(
+            queue(), row, exc, "run_after", base, limit,
+            pending=Task.PENDING, failed=Task.FAILED,
+        )
+
+
+@task("warm_thumbnails", batch=True)
+def warm_thumbnails(payloads):
+    """Готовит миниатюры картинок постов заранее, чтобы первый показ
+    ленты не резал изображение в запросе."""
+    from sorl.thumbnail import get_thumbnail
+
+    from . import sharding
+    from .models import Post
+
+    ids = sorted({payload["post_id"] for payload in payloads})
+    for post in sharding.by_ids(Post.objects.all(), ids):
+        if post.image:
+            get_thumbnail(post.image, "960x339", crop="center", upscale=True)
+
+
+@task("purge_posts")
+def purge_posts(alias, post_ids):
+    from . import deletion
+
+    deletion.purge_posts(alias, post_ids)
+
+
+@task("purge_user")
+def purge_user(user_id):
+    from . import deletion
+
+    # шаг ограничен числом пачек, чтобы не пережить аренду задачи
+    if not deletion.purge_user(user_id):
+        enqueue("purge_user", user_id=user_id)
+
+
+@task("publish_pages", batch=True)
+def publish_pages(payloads):
+    from . import publisher
+
+    publisher.publish_paths({payload["path"] for payload in payloads})
+
+
+@task("purge_surrogate_keys", batch=True)
+def purge_surrogate_keys(payloads):
+    from . import surrogate
+
+    surrogate.send(set().union(*(payload["keys"] for payload in payloads)))
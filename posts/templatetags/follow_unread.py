@@ -0,0 +1,14 @@
+from django import template
+
+from posts import unread
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def unread_posts(context):
+    """Сколько постов из подписок вышло с прошлого визита в ленту."""
+    user = context.get("user")
+    if user is None or not user.is_authenticated:
+        return 0
+    return unread.count(user)
@@ -0,0 +1,29 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page, radius=2):
+    """Номера страниц вокруг текущей плюс первая и последняя; None на
+    месте пропуска. Вместо всех page_range — не больше 2 * radius + 5.
+    Лента без подсчёта (posts.feeds.uncounted) последней страницы не
+    знает: номеров нет, только «Предыдущая» и «Следующая»."""
+    if not getattr(page.paginator, "counted", True):
+        return []
+    last = page.paginator.num_pages
+    current = page.number
+    numbers = sorted({
+        1, last,
+        *range(max(1, current - radius), min(last, current + radius) + 1),
+    })
+    window = []
+    for number in numbers:
+        if window:
+            gap = number - window[-1]
+            if gap == 2:
+                window.append(number - 1)
+            elif gap > 2:
+                window.append(None)
+        window.append(number)
+    return window
@@ -4,8 +4,10 @@ from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.core.cache import cache
 
+from .counters import post_views
 from .fake_data import FakeData
 from .models import Post, User, Group, Comment, Follow
+from .rings import rings
 
 
 class TestStringMethods(TestCase):
@@ -57,6 +59,10 @@ class TestStringMethods(TestCase):
             title="title_1", slug="slug_1", description="desc_1"
         )
 
+    def tearDown(self):
+        post_views.clear()
+        rings.clear()
+
     def test_signup(self):
         response = self.client.get(reverse("signup"))
         self.assertEqual(response.status_code, 200)
@@ -0,0 +1,99 @@
+"""«Новое с прошлого визита» в ленте подписок.
+
+У пользователя одна строка FollowMarker: время последнего визита в
+follow_index и число постов его авторов после него. Новый пост одним
+UPDATE прибавляет единицу всем подписчикам автора, так что значок в меню
+стоит одного чтения по первичному ключу. Подписка, отписка и удаление
+постов сбрасывают число в None: его один раз пересчитывает запрос по
+индексу (author, pub_date) при следующем показе.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import sharding
+from .models import Follow, FollowMarker, Post
+
+
+def followers(author_id):
+    return Follow.objects.filter(author_id=author_id).values("user_id")
+
+
+def mark_seen(user):
+    """Визит в ленту подписок. Вызывается до чтения ленты: пост, вышедший
+    после отметки, попадёт в счётчик, а не пропадёт.
+
+    Если нового нет (unread == 0), отметка не пишется: запись
+    прикалывала бы к основной базе каждый визит в ленту (posts.routers)."""
+    now = timezone.now()
+    markers = FollowMarker.objects.filter(user=user)
+    row = markers.values_list("unread").first()
+    if row == (0,):
+        return
+    if row is not None:
+        markers.update(seen=now, unread=0)
+        return
+    try:
+        with transaction.atomic():
+            FollowMarker.objects.create(user=user, seen=now, unread=0)
+    except IntegrityError:
+        markers.update(seen=now, unread=0)
+
+
+def recount(user, seen):
+    authors = list(
+        Follow.objects.filter(user=user).values_list("author_id", flat=True)
+    )
+    if not authors:
+        return 0
+    posts = Post.objects.filter(pub_date__gt=seen)
+    return sharding.feed(posts, author_ids=authors).count()
+
+
+def count(user):
+    """Число непрочитанных постов для значка: до первого визита — 0."""
+    row = (
+        FollowMarker.objects.filter(user=user)
+        .values_list("seen", "unread")
+        .first()
+    )
+    if row is None:
+        return 0
+    seen, unread = row
+    if unread is None:
+        unread = recount(user, seen)
+        FollowMarker.objects.filter(user=user, unread=None).update(
+            unread=unread
+        )
+    return unread
+
+
+def forget(author_id):
+    """Подписчикам автора число пересчитается при следующем показе."""
+    FollowMarker.objects.filter(user_id__in=followers(author_id)).update(
+        unread=None
+    )
+
+
+# Подписчики posts.changes
+
+def post_changed(sender, post, created, removed, using=None, **kwargs):
+    if removed:
+        forget(post.author_id)
+    elif created:
+        author_id = post.author_id
+        transaction.on_commit(
+            lambda: FollowMarker.objects.filter(
+                user_id__in=followers(author_id)
+            ).update(unread=F("unread") + 1),
+            using=using,
+        )
+
+
+def follow_changed(sender, follow, **kwargs):
+    FollowMarker.objects.filter(user_id=follow.user_id).update(unread=None)
+
+
+def everything_changed(sender, **kwargs):
+    # массовые правки: каждому пересчитается при следующем показе
+    FollowMarker.objects.update(unread=None)
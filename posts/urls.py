@@ -8,6 +8,9 @@ urlpatterns = [
 urlpatterns += [
     path("new/", views.new_post, name="new_post"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("follow/events/", views.follow_events, name="follow_events"),
+    path("mentions/", views.mentions, name="mentions"),
+    path("tag/<tag>/", views.tag_feed, name="tag"),
     path("group/<slug>/", views.group_posts, name="group")
 ]
 
@@ -17,5 +20,7 @@ urlpatterns += [
     path("<username>/unfollow/", views.profile_unfollow, name="profile_unfollow"),
     path("<username>/<int:post_id>/", views.post_view, name="post"),
     path("<username>/<int:post_id>/edit/", views.post_edit, name="post_edit"),
-    path("<username>/<int:post_id>/comment/", views.add_comment, name="add_comment")
+    path("<username>/<int:post_id>/delete/", views.post_delete, name="post_delete"),
+    path("<username>/<int:post_id>/comment/", views.add_comment, name="add_comment"),
+    path("<username>/<int:post_id>/comments/", views.post_comments, name="post_comments")
 ]
\ No newline at end of file
@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Отключает auto_now_add: bulk_create сохраняет даты как есть.
+
+    Меняет поле модели на весь процесс, поэтому годится только для
+    команд, а не для кода, работающего в запросе.
+    """
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+# Кэши, которые живут в памяти одного процесса: сброс ключа в одном
+# воркере не виден остальным.
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def shared_cache(alias="default"):
+    """Общий ли кэш alias для всех воркеров (memcached, redis, файлы)."""
+    from django.conf import settings
+
+    return settings.CACHES[alias]["BACKEND"] not in LOCAL_CACHE_BACKENDS
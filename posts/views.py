@@ -1,29 +1,72 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.conf import settings
+from django.db import transaction
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render, reverse
 
+from . import (
+    cards, counters, cursors, deletion, events, feeds, sharding, surrogate,
+    tags, tasks, unread
+)
+from . import metrics as metrics_registry
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User, Follow, Comment
+from .models import Group, Post, Tag, User, Follow
+from .rings import rings
 
 
-def get_paginated_view(request, posts, page_size=10):
-    paginator = Paginator(posts, page_size)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    return page, paginator
+COMMENTS_PAGE_SIZE = 50
+TAG_PAGE_SIZE = 10
+
+
+def get_paginated_view(request, posts, page_size=10, counter=None):
+    """counter — ключ счётчика ленты из posts.feeds; у feeds.Chain свои
+    счётчики у каждой части. Без них (или при FEED_COUNTS = False)
+    страница собирается без подсчёта постов. Головы общей ленты и лент
+    групп отдаются из колец posts.rings без запросов к базе."""
+    number = request.GET.get("page")
+    if counter is not None:
+        cached = rings.page(
+            counter, posts, feeds.page_number(number), page_size
+        )
+        if cached is not None:
+            rows, count = cached
+            return feeds.page(
+                rows, feeds.page_number(number), page_size, count
+            )
+    count = None
+    if getattr(settings, "FEED_COUNTS", True):
+        if isinstance(posts, feeds.Chain):
+            count = posts.count()
+        elif counter is not None:
+            count = feeds.count(counter, posts)
+    return feeds.paginate(posts, number, page_size, count)
 
 
 def index(request):
-    posts = Post.objects.all()
-    page, paginator = get_paginated_view(request, posts)
+    posts = cards.CardFeed(sharding.feed(Post.objects.all()))
+    page, paginator = get_paginated_view(request, posts, counter=feeds.ALL)
+    surrogate.tag(
+        request, surrogate.feed_key(feeds.ALL), *surrogate.post_keys(page)
+    )
     context = {"page": page, "paginator": paginator}
     return render(request, "index.html", context)
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page, paginator = get_paginated_view(request, posts)
+    posts = cards.CardFeed(sharding.feed(group.posts.all()))
+    page, paginator = get_paginated_view(
+        request, posts, counter=feeds.group_key(group.pk)
+    )
+    surrogate.tag(
+        request,
+        surrogate.group_key(group.pk),
+        surrogate.feed_key(feeds.group_key(group.pk)),
+        *surrogate.post_keys(page),
+    )
     context = {"group": group, "page": page, "paginator": paginator}
     return render(request, "group.html", context)
 
@@ -35,11 +78,13 @@ def new_post(request):
         form = PostForm()
         return render(request, "posts/new_post.html", {"form": form})
 
-    form = PostForm(request.POST)
+    form = PostForm(request.POST, files=request.FILES)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            tasks.enqueue("warm_thumbnails", post_id=post.pk)
         return redirect("index")
 
     return render(request, "posts/new_post.html", {"form": form})
@@ -47,24 +92,76 @@ def new_post(request):
 
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.order_by("-pub_date").all()
+    # сначала горячие посты, за ними архив (posts.archive)
+    posts = feeds.Chain(
+        (cards.CardFeed(author.posts.all()), feeds.author_key(author.pk)),
+        (
+            cards.CardFeed(author.archived_posts.all()),
+            feeds.archive_key(author.pk),
+        ),
+    )
     page, paginator = get_paginated_view(request, posts)
+    surrogate.tag(
+        request,
+        surrogate.user_key(author.pk),
+        surrogate.follow_key(author.pk),
+        surrogate.feed_key(feeds.author_key(author.pk)),
+        *surrogate.post_keys(page),
+    )
     context = {"page": page, "paginator": paginator, "author": author}
     return render(request, "posts/profile.html", context)
 
 
+def get_comments_page(request, post):
+    comments = sharding.with_authors(
+        post.comments.order_by("created", "id")
+    )
+    comments = cursors.after(comments, request.GET.get("after"), "created")
+    comments = comments[:COMMENTS_PAGE_SIZE]
+    rows = list(comments)
+    next_cursor = None
+    if len(rows) == COMMENTS_PAGE_SIZE:
+        next_cursor = cursors.encode(rows[-1].created, rows[-1].pk)
+    return comments, next_cursor
+
+
+def get_post(author, post_id):
+    """Пост автора: из горячей таблицы, а если его там нет — из архива."""
+    try:
+        return author.posts.get(id=post_id)
+    except Post.DoesNotExist:
+        return get_object_or_404(author.archived_posts, id=post_id)
+
+
 def post_view(request, username, post_id):
     user = get_object_or_404(User, username=username)
-    post = get_object_or_404(user.posts, id=post_id)
+    post = get_post(user, post_id)
     user_followers = user.follower.filter(author=user)
     user_follow = user.follower.filter(user=user).count()
-    comments = Comment.objects.select_related("author").filter(post=post)
+    try:
+        comments, next_cursor = get_comments_page(request, post)
+    except cursors.InvalidCursor:
+        return HttpResponseBadRequest("Неверный курсор")
     form = CommentForm()
+    views = post.views
+    # каждый показ считается просмотром: прокси его не хранит
+    surrogate.tag(
+        request,
+        surrogate.follow_key(user.pk),
+        *surrogate.post_keys([post]),
+        public=False,
+    )
+    if isinstance(post, Post):
+        # архив только читается: просмотры копятся у горячих постов
+        counters.post_views.add(post)
+        views += counters.post_views.pending(post)
 
     context = {
         "post": post,
+        "views": views,
         "profile": user,
         "comments": comments,
+        "next_cursor": next_cursor,
         "form": form,
         "user_followers": user_followers,
         "user_follow": user_follow
@@ -73,6 +170,35 @@ def post_view(request, username, post_id):
     return render(request, "posts/post.html", context)
 
 
+def post_comments(request, username, post_id):
+    author = get_object_or_404(User, username=username)
+    post = get_post(author, post_id)
+    try:
+        comments, next_cursor = get_comments_page(request, post)
+    except cursors.InvalidCursor:
+        return HttpResponseBadRequest("Неверный курсор")
+    surrogate.tag(request, *surrogate.post_keys([post]))
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "comments": [
+                {
+                    "id": comment.pk,
+                    "author": comment.author.username,
+                    "text": comment.text,
+                    "created": comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            "next": next_cursor,
+        })
+    return render(
+        request,
+        "posts/includes/comment_list.html",
+        {"post": post, "comments": comments, "next_cursor": next_cursor},
+    )
+
+
 @login_required
 def post_edit(request, username, post_id):
     user = get_object_or_404(User, username=username)
@@ -90,11 +216,32 @@ def post_edit(request, username, post_id):
         )
 
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        alias = post._state.db
+        with transaction.atomic(using=alias):
+            # строка заблокирована до правки: надгробие не откатится
+            live = Post.objects.using(alias).select_for_update()
+            if not live.filter(pk=post.pk).exists():
+                raise Http404
+            # только поля формы: просмотры, счётчик комментариев и
+            # надгробие меняются, пока форма открыта
+            post.save(update_fields=PostForm._meta.fields)
+        if "image" in form.changed_data and post.image:
+            tasks.enqueue("warm_thumbnails", post_id=post.pk)
         return redirect("post", username=username, post_id=post.pk)
     return render(request, "posts/new_post.html", {"form": form, "post": post})
 
 
+@login_required
+def post_delete(request, username, post_id):
+    user = get_object_or_404(User, username=username)
+    post = get_object_or_404(user.posts.all(), pk=post_id)
+    if request.user != user or request.method != "POST":
+        return redirect("post", username=username, post_id=post_id)
+    deletion.delete_post(post)
+    return redirect("profile", username=username)
+
+
 def page_not_found(request, exception):
     return render(
         request,
@@ -112,7 +259,8 @@ def server_error(request):
 
 @login_required
 def add_comment(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    author = get_object_or_404(User, username=username)
+    post = get_object_or_404(author.posts, id=post_id)
 
     if request.method != "POST":
         return redirect("post", username=username, post_id=post_id)
@@ -123,22 +271,125 @@ def add_comment(request, username, post_id):
         comment.author = request.user
         comment.post = post
         comment.save()
+        if request.is_ajax():
+            return render(
+                request,
+                "posts/includes/comment.html",
+                {"item": comment},
+                status=201,
+            )
         return redirect("post", username=username, post_id=post_id)
+    if request.is_ajax():
+        return JsonResponse({"errors": form.errors}, status=400)
     return redirect("post", username=post.author.username, post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page, paginator = get_paginated_view(request, posts)
+    unread.mark_seen(request.user)
+    if sharding.enabled():
+        authors = request.user.follower.values_list("author_id", flat=True)
+        posts = sharding.feed(Post.objects.all(), author_ids=list(authors))
+    else:
+        posts = Post.objects.filter(author__following__user=request.user)
+    page, paginator = get_paginated_view(request, cards.CardFeed(posts))
+    surrogate.tag(request, *surrogate.post_keys(page), public=False)
     context = {
         "page": page,
         "paginator": paginator,
-        "follow": True
+        "follow": True,
+        "events": events.enabled(),
     }
     return render(request, "posts/follow.html", context)
 
 
+@login_required
+def follow_events(request):
+    """Поток новых постов авторов из подписок (posts.events): страница
+    follow_index показывает «N новых записей» без перезагрузок."""
+    if not events.enabled():
+        raise Http404
+    authors = request.user.follower.values_list("author_id", flat=True)
+    last_event_id = request.META.get(
+        "HTTP_LAST_EVENT_ID", request.GET.get("last_event_id")
+    )
+    try:
+        last_event_id = int(last_event_id)
+    except (TypeError, ValueError):
+        last_event_id = None
+    body = events.open_stream(list(authors), last_event_id)
+    if body is None:
+        # соединения процесса заняты: браузер повторит через retry
+        response = HttpResponse(
+            f"retry: {events.RETRY_MS}\n\n",
+            status=503,
+            content_type="text/event-stream",
+        )
+        response["Retry-After"] = events.RETRY_MS // 1000
+        return response
+    response = StreamingHttpResponse(body, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # nginx иначе копит поток в буфере
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def get_tag_page(request, kind, name):
+    """Страница ленты тега: проход по индексу (tag, pub_date, post) от
+    курсора, затем сами посты по id."""
+    tag = Tag.objects.filter(kind=kind, name=tags.normalize(kind, name))
+    tag = tag.first()
+    if tag is None:
+        return [], None
+    entries = tag.entries.order_by("-pub_date", "-post_id")
+    entries = cursors.after(
+        entries, request.GET.get("after"), "pub_date",
+        descending=True, key="post_id",
+    )
+    rows = list(entries.values_list("pub_date", "post_id")[:TAG_PAGE_SIZE])
+    posts = cards.by_ids(Post.objects.all(), [post_id for _, post_id in rows])
+    next_cursor = None
+    if len(rows) == TAG_PAGE_SIZE:
+        next_cursor = cursors.encode(*rows[-1])
+    return posts, next_cursor
+
+
+def tag_feed(request, tag):
+    try:
+        posts, next_cursor = get_tag_page(request, tags.HASHTAG, tag)
+    except cursors.InvalidCursor:
+        return HttpResponseBadRequest("Неверный курсор")
+    surrogate.tag(
+        request,
+        surrogate.tag_key(tags.HASHTAG, tags.normalize(tags.HASHTAG, tag)),
+        *surrogate.post_keys(posts),
+    )
+    context = {
+        "title": f"#{tag}",
+        "posts": posts,
+        "next_cursor": next_cursor,
+    }
+    return render(request, "posts/tag.html", context)
+
+
+@login_required
+def mentions(request):
+    try:
+        posts, next_cursor = get_tag_page(
+            request, tags.MENTION, request.user.username
+        )
+    except cursors.InvalidCursor:
+        return HttpResponseBadRequest("Неверный курсор")
+    surrogate.tag(request, *surrogate.post_keys(posts), public=False)
+    context = {
+        "title": "Упоминания",
+        "posts": posts,
+        "next_cursor": next_cursor,
+        "mentions": True,
+    }
+    return render(request, "posts/tag.html", context)
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -153,3 +404,12 @@ def profile_unfollow(request, username):
     follow = request.user.follower.filter(author=author)
     follow.delete()
     return redirect(reverse("profile", kwargs={"username": username}))
+
+
+def metrics(request):
+    if not getattr(settings, "METRICS_ENABLED", False):
+        raise Http404
+    return HttpResponse(
+        metrics_registry.registry.expose(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -1,4 +1,40 @@
+import pytest
+
+from posts import tasks
+from posts.counters import post_views
+from posts.events import broker
+from posts.rings import rings
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    # файловый кэш общий для процессов, как memcached или redis
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path / 'cache'),
+    }}
+    settings.SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
+@pytest.fixture
+def run_tasks():
+    """Выполняет все готовые задачи очереди, как run_workers --once."""
+    def run():
+        while tasks.run_batch():
+            pass
+    return run
+
+
+@pytest.fixture(autouse=True)
+def _drop_view_buffer():
+    # тестовая база удаляется раньше, чем сработает сброс при выходе,
+    # а кольца лент пережили бы очистку базы между тестами
+    yield
+    post_views.clear()
+    rings.clear()
+    broker.clear()
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from posts import deletion, feeds
+from posts.models import (
+    ArchivedComment, ArchivedPost, Comment, FeedCounter, Group, Post, TagIndex
+)
+
+
+def make_posts(user, group, count, days_ago):
+    posts = [
+        Post.objects.create(text=f'Пост {i} #тег', author=user, group=group)
+        for i in range(count)
+    ]
+    for i, post in enumerate(posts):
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=timezone.now() - timedelta(days=days_ago, minutes=i)
+        )
+    return posts
+
+
+class TestArchive:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_archive_moves_old_posts(self, user, client):
+        group = Group.objects.create(title='Группа', slug='g')
+        fresh = make_posts(user, group, 3, days_ago=1)
+        old = make_posts(user, group, 8, days_ago=400)
+        Comment.objects.create(post=old[0], author=user, text='Старый комментарий')
+        feeds.recount()
+
+        call_command('archive_posts', '--batch-size', '3', '--max-batches', '2')
+        assert ArchivedPost.objects.count() == 6, \
+            'Проверьте, что --max-batches ограничивает один проход'
+        call_command('archive_posts', '--batch-size', '3')
+        assert Post.objects.count() == 3 and ArchivedPost.objects.count() == 8
+        assert ArchivedComment.objects.get().post_id == old[0].pk
+        assert not TagIndex.objects.filter(post_id__in=[p.pk for p in old]).exists()
+        assert FeedCounter.objects.get(key=feeds.ALL).count == 3
+        assert feeds.count(feeds.archive_key(user.pk), user.archived_posts.all()) == 8
+        call_command('archive_posts')
+        assert FeedCounter.objects.get(key=feeds.archive_key(user.pk)).count == 8, \
+            'Проверьте, что повторный запуск ничего не переносит дважды'
+
+        response = client.get('/')
+        assert response.context['paginator'].count == 3, \
+            'Проверьте, что главная лента читает только горячие посты'
+        assert client.get('/group/g/').context['paginator'].count == 3
+
+        response = client.get(f'/{user.username}/')
+        assert response.context['paginator'].count == 11, \
+            'Проверьте, что профиль показывает и архивные посты'
+        second = client.get(f'/{user.username}/?page=2').context['page']
+        assert [post.pk for post in second] == [old[7].pk], \
+            'Проверьте, что архив идёт в профиле после горячих постов'
+        first = client.get(f'/{user.username}/').context['page']
+        assert [post.pk for post in first][:3] == [post.pk for post in fresh]
+
+        response = client.get(f'/{user.username}/{old[0].pk}/')
+        assert response.status_code == 200, \
+            'Проверьте, что архивный пост открывается по старому адресу'
+        assert response.context['post'].text == old[0].text
+        assert 'Старый комментарий' in response.content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_archived_post_is_read_only(self, user, user_client):
+        post, = make_posts(user, None, 1, days_ago=400)
+        call_command('archive_posts')
+        response = user_client.get(f'/{user.username}/{post.pk}/')
+        assert 'Добавить комментарий:' not in response.content.decode(), \
+            'Проверьте, что к архивному посту нельзя добавить комментарий'
+        assert user_client.get(f'/{user.username}/{post.pk}/edit/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_archived_card_has_no_edit_link(self, user, user_client):
+        fresh, = make_posts(user, None, 1, days_ago=1)
+        old, = make_posts(user, None, 1, days_ago=400)
+        call_command('archive_posts')
+        content = user_client.get(f'/{user.username}/').content.decode()
+        assert f'/{user.username}/{fresh.pk}/edit/' in content
+        assert f'/{user.username}/{old.pk}/edit/' not in content, \
+            'Проверьте, что у архивного поста в профиле нет ссылки «Редактировать»'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_delete_user_purges_archive(self, user, django_user_model):
+        other = django_user_model.objects.create_user(username='other')
+        post, = make_posts(user, None, 1, days_ago=400)
+        Comment.objects.create(post=post, author=other, text='Чужой комментарий')
+        call_command('archive_posts')
+
+        deletion.delete_user(user)
+        call_command('run_workers', '--once')
+        assert not ArchivedPost.objects.exists() and not ArchivedComment.objects.exists(), \
+            'Проверьте, что удаление пользователя чистит и архив'
+        assert not django_user_model.objects.filter(pk=user.pk).exists()
@@ -0,0 +1,63 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def auth_queries(client, path):
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(path)
+    assert response.status_code == 200
+    return [
+        query['sql'] for query in captured.captured_queries
+        if re.search(r'FROM "(auth_user|django_session)"', query['sql'])
+    ]
+
+
+class TestCachedAuth:
+
+    @pytest.fixture(autouse=True)
+    def _shared_cache(self, shared_cache):
+        pass
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('path', ['/', '/follow/'])
+    def test_no_auth_queries(self, user_client, path):
+        user_client.get(path)
+        assert auth_queries(user_client, path) == [], \
+            'Проверьте, что сессия и пользователь берутся из кэша'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_password_change_invalidates(self, client, user):
+        client.force_login(user)
+        client.get('/')
+        user.set_password('новый-пароль-123')
+        user.save()
+        response = client.get('/follow/')
+        assert response.status_code == 302, \
+            'Проверьте, что после смены пароля старая сессия больше не действует'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_user_save_and_logout(self, user_client, user):
+        user_client.get('/')
+        user.first_name = 'Новое'
+        user.username = 'renamed'
+        user.save()
+        assert 'renamed' in user_client.get('/').content.decode(), \
+            'Проверьте, что сохранение пользователя обновляет снимок'
+        user_client.get('/auth/logout/')
+        assert user_client.get('/follow/').status_code == 302
+
+
+class TestLocalCacheAuth:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_snapshot_disabled(self, user_client, user, django_user_model):
+        user_client.get('/')
+        assert auth_queries(user_client, '/follow/'), \
+            'Проверьте, что с кэшем одного процесса пользователь читается из базы'
+        # пароль сменили в другом воркере: сигнал сюда не дошёл
+        django_user_model.objects.filter(pk=user.pk).update(password='!')
+        assert user_client.get('/follow/').status_code == 302, \
+            'Проверьте, что смена пароля в другом процессе завершает сессию'
@@ -0,0 +1,45 @@
+import pytest
+from django.core.management import call_command
+
+from posts import benchmark
+
+
+class TestBenchmark:
+
+    def test_compare(self):
+        baseline = {
+            'anonymous:index': {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 3, 'memory_kb': 100.0},
+        }
+        same = {
+            'anonymous:index': {'p50_ms': 11.0, 'p95_ms': 21.0, 'queries': 3, 'memory_kb': 110.0},
+        }
+        assert benchmark.compare(baseline, same) == [], \
+            'Проверьте, что изменения в пределах допуска не считаются регрессией'
+
+        worse = {
+            'anonymous:index': {'p50_ms': 30.0, 'p95_ms': 21.0, 'queries': 4, 'memory_kb': 100.0},
+        }
+        regressions = benchmark.compare(baseline, worse)
+        assert len(regressions) == 2, \
+            'Проверьте, что рост времени и числа запросов считается регрессией'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_run_covers_all_urls(self):
+        call_command('seed_data', users=5, groups=2, posts=30, comments=30, follows=2)
+        results = benchmark.run(repeat=1)
+        for name in benchmark.url_names():
+            for mode in ('anonymous', 'user'):
+                key = f'{mode}:{name}'
+                assert key in results, f'Проверьте, что замеряется страница `{key}`'
+                assert set(benchmark.DEFAULT_TOLERANCE) <= set(results[key])
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cards_lighter_than_models(self):
+        call_command('seed_data', users=5, groups=2, posts=30, comments=30, follows=2)
+        results = {
+            name: benchmark.measure_rows(load, repeat=1)
+            for name, load in benchmark.feed_loaders(20).items()
+        }
+        assert results['cards']['rows'] == results['models']['rows'] == 20
+        assert results['cards']['retained_kb'] < results['models']['retained_kb'], \
+            'Проверьте, что карточки занимают меньше памяти, чем модели'
@@ -0,0 +1,71 @@
+import pytest
+from django.test import Client
+
+from posts.models import Comment, Group, Post
+
+ITEM = 'posts/includes/post_item.html'
+
+
+def renders(client, url):
+    response = client.get(url)
+    return response, [t.name for t in response.templates].count(ITEM)
+
+
+class TestCardCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_only_changed_card_is_rendered(self, user, user_client):
+        client = Client()
+        group = Group.objects.create(title='Группа', slug='g')
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=user, group=group)
+            for i in range(3)
+        ]
+        assert renders(client, '/group/g/')[1] == 3
+        assert renders(client, '/group/g/')[1] == 0, \
+            'Проверьте, что карточки постов берутся из кэша'
+
+        Comment.objects.create(post=posts[0], author=user, text='Комментарий')
+        response, count = renders(client, '/group/g/')
+        assert count == 1, 'Проверьте, что новый комментарий сбрасывает одну карточку'
+        assert '1 комментариев' in response.content.decode()
+
+        posts[1].text = 'Исправленный пост'
+        posts[1].save()
+        response, count = renders(client, '/group/g/')
+        assert count == 1, 'Проверьте, что правка поста сбрасывает одну карточку'
+        assert 'Исправленный пост' in response.content.decode()
+        assert renders(client, f'/{user.username}/')[1] == 0, \
+            'Проверьте, что профиль берёт те же карточки из кэша'
+
+        response, count = renders(user_client, '/group/g/')
+        assert count == 3 and 'Редактировать' in response.content.decode(), \
+            'Проверьте, что автор видит свою версию карточки'
+        assert 'Редактировать' not in client.get('/group/g/').content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rename_refreshes_cards(self, user):
+        client = Client()
+        group = Group.objects.create(title='Группа', slug='g')
+        Post.objects.create(text='Пост', author=user, group=group)
+        renders(client, '/group/g/')
+        group.title = 'Новое название'
+        group.save()
+        user.username = 'renamed'
+        user.save()
+        response, count = renders(client, '/group/g/')
+        content = response.content.decode()
+        assert count == 1 and 'Новое название' in content, \
+            'Проверьте, что переименование группы сбрасывает карточки её постов'
+        assert '/renamed/' in content, \
+            'Проверьте, что смена имени автора сбрасывает карточки его постов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_version_survives_stale_instance(self, user):
+        post = Post.objects.create(text='Пост', author=user)
+        stale = Post.objects.get(pk=post.pk)
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        stale.text = 'Правка'
+        stale.save()
+        assert stale.version == 2, \
+            'Проверьте, что версия растёт и у устаревшего экземпляра поста'
@@ -0,0 +1,25 @@
+import pytest
+
+from posts import cards
+from posts.models import Follow, Group, Post
+
+
+class TestCards:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feeds_render_cards(self, user, user_client, django_user_model):
+        author = django_user_model.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='g')
+        post = Post.objects.create(text='Пост #тег', author=author, group=group)
+        Follow.objects.create(user=user, author=author)
+
+        for url in ('/', '/group/g/', '/author/', '/follow/', '/tag/тег/'):
+            response = user_client.get(url)
+            context = response.context
+            rows = list(context['page'] if 'page' in context else context['posts'])
+            assert [type(row) for row in rows] == [cards.Card], \
+                f'Проверьте, что лента `{url}` собирается из карточек'
+            card = rows[0]
+            assert card.pk == post.pk and card.author == author and card.group == group
+            assert card.author.username == 'author' and str(card.group) == 'Группа'
+            assert not hasattr(card, '__dict__'), 'Проверьте, что у карточки есть __slots__'
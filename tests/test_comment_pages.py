@@ -0,0 +1,65 @@
+import pytest
+
+from posts import views
+from posts.models import Comment
+
+
+class TestCommentPages:
+
+    @pytest.fixture
+    def comments(self, post, user):
+        Comment.objects.bulk_create([
+            Comment(post=post, author=user, text=f'Комментарий {i}')
+            for i in range(views.COMMENTS_PAGE_SIZE + 5)
+        ])
+        return list(Comment.objects.order_by('created', 'id'))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cursor_pages(self, client, post, comments):
+        response = client.get(f'/{post.author.username}/{post.id}/')
+        assert len(response.context['comments']) == views.COMMENTS_PAGE_SIZE, \
+            'Проверьте, что на странице поста выводится только первая порция комментариев'
+        next_cursor = response.context['next_cursor']
+        assert next_cursor, 'Проверьте, что передаётся курсор следующей порции'
+
+        response = client.get(
+            f'/{post.author.username}/{post.id}/comments/',
+            {'after': next_cursor, 'format': 'json'},
+        )
+        data = response.json()
+        assert [item['id'] for item in data['comments']] == [c.id for c in comments[-5:]], \
+            'Проверьте, что следующая порция начинается сразу после курсора'
+        assert data['next'] is None
+
+        response = client.get(f'/{post.author.username}/{post.id}/comments/', {'after': next_cursor})
+        assert 'Комментарий' in response.content.decode()
+        assert '<html' not in response.content.decode(), 'Проверьте, что фрагмент отдаётся без обёртки страницы'
+
+        response = client.get(f'/{post.author.username}/{post.id}/comments/', {'after': 'мусор'})
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_ajax_comment_fragment(self, user_client, post):
+        response = user_client.post(
+            f'/{post.author.username}/{post.id}/comment/',
+            data={'text': 'Быстрый ответ'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        assert response.status_code == 201, \
+            'Проверьте, что AJAX-комментарий возвращает фрагмент, а не редирект'
+        assert 'Быстрый ответ' in response.content.decode()
+        assert Comment.objects.filter(text='Быстрый ответ').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_ajax_comment_errors(self, user_client, post):
+        response = user_client.post(
+            f'/{post.author.username}/{post.id}/comment/',
+            data={'text': ''},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        assert response.status_code == 400
+        assert 'text' in response.json()['errors'], \
+            'Проверьте, что AJAX-комментарий с ошибкой возвращает ошибки формы'
+        content = user_client.get(f'/{post.author.username}/{post.id}/').content.decode()
+        assert 'js-comment-errors' in content, \
+            'Проверьте, что в форме комментария есть место для ошибок'
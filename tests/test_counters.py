@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from posts import deletion
+from posts.counters import ViewCounterBuffer
+from posts.forms import PostForm
+from posts.models import Comment, Post
+
+
+class TestViewCounters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_workers_total(self, user):
+        posts = [Post.objects.create(text=f'Пост {i}', author=user) for i in range(5)]
+        # несколько «воркеров», у каждого свой буфер, в каждом несколько потоков
+        buffers = [ViewCounterBuffer(flush_interval=0.05, flush_size=3) for _ in range(3)]
+        hits = 200
+
+        def worker(buffer, offset):
+            for i in range(hits):
+                buffer.add(posts[(i + offset) % len(posts)])
+
+        threads = [
+            threading.Thread(target=worker, args=(buffer, offset))
+            for buffer in buffers for offset in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for buffer in buffers:
+            buffer.flush()
+
+        total = sum(post.views for post in Post.objects.all())
+        assert total == hits * len(threads), \
+            'Проверьте, что при сбросе буфера не теряются и не дублируются просмотры'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_view_shows_pending(self, client, post):
+        url = f'/{post.author.username}/{post.id}/'
+        client.get(url)
+        response = client.get(url)
+        assert response.context['views'] >= 2, \
+            'Проверьте, что на странице поста выводятся просмотры с учётом буфера'
+        assert 'Просмотров' in response.content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_edit_keeps_concurrent_counters(self, user_client, post, monkeypatch):
+        is_valid = PostForm.is_valid
+
+        def flush_meanwhile(form):
+            # просмотры и комментарий записаны, пока форма была открыта
+            buffer = ViewCounterBuffer()
+            for _ in range(3):
+                buffer.add(post)
+            buffer.flush()
+            Comment.objects.create(post=post, author=post.author, text='Комментарий')
+            return is_valid(form)
+
+        monkeypatch.setattr(PostForm, 'is_valid', flush_meanwhile)
+        url = f'/{post.author.username}/{post.id}/edit/'
+        user_client.post(url, data={'text': 'Новый текст'})
+        post = Post.objects.get(pk=post.pk)
+        assert post.text == 'Новый текст'
+        assert post.views == 3 and post.comment_count == 1, \
+            'Проверьте, что правка поста не затирает просмотры и комментарии'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_edit_does_not_revive_deleted(self, user_client, post, monkeypatch):
+        is_valid = PostForm.is_valid
+
+        def delete_meanwhile(form):
+            deletion.delete_post(Post.objects.get(pk=post.pk))
+            return is_valid(form)
+
+        monkeypatch.setattr(PostForm, 'is_valid', delete_meanwhile)
+        url = f'/{post.author.username}/{post.id}/edit/'
+        response = user_client.post(url, data={'text': 'Новый текст'})
+        assert response.status_code == 404
+        post = Post.all_objects.get(pk=post.pk)
+        assert post.deleted and post.text != 'Новый текст', \
+            'Проверьте, что правка не возвращает удалённый пост'
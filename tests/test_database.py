@@ -0,0 +1,187 @@
+import io
+
+import pytest
+from django.db import connection
+
+from posts import db
+
+
+class TestSqlitePragmas:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pragmas_applied(self):
+        connection.settings_dict['PRAGMAS'] = {'cache_size': -1234, 'temp_store': 'MEMORY'}
+        try:
+            db.apply_sqlite_pragmas(None, connection)
+        finally:
+            del connection.settings_dict['PRAGMAS']
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            assert cursor.fetchone()[0] == -1234, \
+                'Проверьте, что PRAGMAS из настроек базы применяются к соединению'
+            cursor.execute('PRAGMA temp_store')
+            assert cursor.fetchone()[0] == 2
+
+
+@pytest.fixture
+def replica():
+    """Вторая база-зеркало: то же in-memory хранилище под другим alias."""
+    from django.db import connections
+    connections.databases['replica'] = dict(connections.databases['default'])
+    yield 'replica'
+    connections['replica'].close()
+    del connections.databases['replica']
+    if hasattr(connections._connections, 'replica'):
+        delattr(connections._connections, 'replica')
+
+
+class TestReplicaRouter:
+
+    def test_router(self, settings):
+        from django.contrib.auth.models import User
+        from django.contrib.sessions.models import Session
+        from posts import routers
+        from posts.models import FeedCounter, Post, Task
+
+        settings.DATABASE_REPLICAS = ['replica']
+        router = routers.ReplicaRouter()
+        routers.reset_write_flag()
+        assert router.db_for_read(Post) == 'replica', \
+            'Проверьте, что чтения уходят на реплику'
+        for model in (User, Session, Task, FeedCounter):
+            assert router.db_for_read(model) == 'default', \
+                f'Проверьте, что {model.__name__} читается только из основной базы'
+        assert router.db_for_write(Post) == 'default'
+        assert router.db_for_read(Post) == 'default', \
+            'Проверьте, что после записи поток читает из основной базы'
+        routers.reset_write_flag()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pinned_after_write(self, settings, user, replica):
+        from django.test import Client
+        from posts import routers
+
+        settings.DATABASE_REPLICAS = [replica]
+        client = Client()
+        client.force_login(user)
+
+        routers.read_stats.clear()
+        client.get('/')
+        assert routers.read_stats[replica] > 0, 'Проверьте, что чтения уходят на реплику'
+
+        response = client.post('/new/', data={'text': 'Свежий пост'})
+        assert 'pin_primary' in response.cookies, \
+            'Проверьте, что после записи ставится кука привязки к основной базе'
+
+        routers.read_stats.clear()
+        response = client.get(f'/{user.username}/')
+        assert routers.read_stats[replica] == 0, \
+            'Проверьте, что сразу после своей записи пользователь читает из основной базы'
+        assert 'Свежий пост' in response.content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_worker_not_pinned_after_task(self, settings, replica):
+        import threading
+        from posts import routers, tasks
+        from posts.models import Post
+
+        settings.DATABASE_REPLICAS = [replica]
+        tasks.enqueue('warm_thumbnails', post_id=0)
+        reads = []
+
+        def worker():
+            tasks.run_batch()
+            reads.append(routers.ReplicaRouter().db_for_read(Post))
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert reads == [replica], \
+            'Проверьте, что после задачи воркер снова читает с реплики'
+
+
+@pytest.fixture
+def shards(settings, tmp_path):
+    """Два отдельных файловых шарда со схемой, как после migrate."""
+    from django.core.management import call_command
+    from django.db import connections
+
+    aliases = ['test_shard_0', 'test_shard_1']
+    for alias in aliases:
+        connections.databases[alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(tmp_path / f'{alias}.sqlite3'),
+            'PRAGMAS': {'foreign_keys': 'OFF'},
+        }
+        connections.ensure_defaults(alias)
+        connections.prepare_test_settings(alias)
+    settings.POST_SHARDS = aliases
+    for alias in aliases:
+        call_command('migrate', database=alias, verbosity=0)
+        # migrate включает проверку внешних ключей обратно
+        connections[alias].close()
+    yield aliases
+    for alias in aliases:
+        connections[alias].close()
+        del connections.databases[alias]
+        delattr(connections._connections, alias)
+
+
+class TestSharding:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_posts_on_author_shard(self, client, shards):
+        from django.contrib.auth import get_user_model
+        from posts import sharding
+        from posts.models import Comment, Post
+
+        users = [
+            get_user_model().objects.create_user(username=f'shard_user_{i}', password='1234567')
+            for i in range(6)
+        ]
+        for i, user in enumerate(users):
+            Post.objects.create(text=f'Пост {i}', author=user)
+        assert {sharding.shard_for(user.pk) for user in users} == set(shards), \
+            'Проверьте, что авторы распределяются по всем шардам'
+        for user in users:
+            alias = sharding.shard_for(user.pk)
+            assert Post.objects.using(alias).filter(author=user).count() == 1, \
+                'Проверьте, что пост сохраняется на шарде автора'
+
+        ids = {post.pk for alias in shards for post in Post.objects.using(alias).all()}
+        assert len(ids) == len(users), 'Проверьте, что id постов не пересекаются между шардами'
+
+        response = client.get('/')
+        texts = [post.text for post in response.context['page']]
+        assert texts == [f'Пост {i}' for i in reversed(range(6))], \
+            'Проверьте, что главная собирается со всех шардов по дате'
+
+        author = users[0]
+        post = Post.objects.using(sharding.shard_for(author.pk)).get(author=author)
+        client.force_login(users[1])
+        client.post(f'/{author.username}/{post.pk}/comment/', data={'text': 'Коммент'})
+        assert Comment.objects.using(post._state.db).filter(post_id=post.pk).count() == 1, \
+            'Проверьте, что комментарий сохраняется на шарде поста'
+        response = client.get(f'/{author.username}/{post.pk}/')
+        assert response.status_code == 200
+        assert len(response.context['comments']) == 1
+
+        client.post(f'/{author.username}/follow/')
+        response = client.get('/follow/')
+        assert [p.pk for p in response.context['page']] == [post.pk]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebalance(self, shards, settings, user):
+        from django.core.management import call_command
+        from posts import sharding
+        from posts.models import Post
+
+        settings.POST_SHARDS = []
+        post = Post.objects.create(text='До шардирования', author=user)
+        settings.POST_SHARDS = shards
+        call_command('rebalance_shards', stdout=io.StringIO())
+
+        alias = sharding.shard_for(user.pk)
+        moved = Post.objects.using(alias).get(pk=post.pk)
+        assert moved.pub_date == post.pub_date, 'Проверьте, что перенос сохраняет дату'
+        assert not Post.objects.using('default').filter(pk=post.pk).exists()
@@ -0,0 +1,94 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from posts import deletion, feeds
+from posts.models import Comment, FeedCounter, Follow, Group, Post, TagIndex, Task
+
+
+class TestDeletion:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_delete_post(self, user_client, user, settings, tmp_path, run_tasks):
+        settings.MEDIA_ROOT = str(tmp_path)
+        post = Post(text='Удаляемый #тег', author=user)
+        post.image.save('pic.gif', ContentFile(b'GIF89a'), save=False)
+        post.save()
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        feeds.recount()
+        image_name = post.image.name
+
+        response = user_client.post(f'/{user.username}/{post.id}/delete/')
+        assert response.status_code == 302
+        assert user_client.get(f'/{user.username}/{post.id}/').status_code == 404, \
+            'Проверьте, что удалённый пост сразу пропадает'
+        assert user_client.get('/').context['paginator'].count == 0, \
+            'Проверьте, что счётчик ленты уменьшается сразу'
+        assert not TagIndex.objects.exists()
+
+        run_tasks()
+        assert not Post.all_objects.exists() and not Comment.objects.exists(), \
+            'Проверьте, что фоновая задача удаляет пост и комментарии'
+        assert not default_storage.exists(image_name), 'Проверьте, что картинка удаляется'
+        assert FeedCounter.objects.get(key=feeds.ALL).count == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_delete_user_in_batches(self, user, django_user_model, settings, run_tasks):
+        settings.DELETION_BATCH_SIZE = 2
+        settings.DELETION_BATCHES_PER_TASK = 1
+        other = django_user_model.objects.create_user(username='other')
+        group = Group.objects.create(title='Группа', slug='g')
+        kept = Post.objects.create(text='Чужой пост', author=other, group=group)
+        for i in range(5):
+            Post.objects.create(text=f'Пост {i}', author=user, group=group)
+            Comment.objects.create(post=kept, author=user, text=f'Комментарий {i}')
+        Follow.objects.create(user=user, author=other)
+        Follow.objects.create(user=other, author=user)
+        feeds.recount()
+
+        deletion.delete_user(user)
+        assert list(Post.objects.all()) == [kept], \
+            'Проверьте, что посты удаляемого пользователя сразу пропадают из лент'
+        assert FeedCounter.objects.get(key=feeds.group_key(group.pk)).count == 1
+        assert FeedCounter.objects.get(key=feeds.ALL).count == 1
+        user.refresh_from_db()
+        assert not user.is_active
+
+        run_tasks()
+        assert not django_user_model.objects.filter(pk=user.pk).exists(), \
+            'Проверьте, что фоновая задача удаляет пользователя'
+        assert not Post.all_objects.filter(author_id=user.pk).exists()
+        assert not Comment.objects.filter(author_id=user.pk).exists()
+        assert not Follow.objects.exists()
+        assert not Task.objects.exists()
+        assert FeedCounter.objects.get(key=feeds.ALL).count == 1, \
+            'Проверьте, что счётчики лент остаются верными после удаления'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_purge_user_step_respects_budget(self, user, django_user_model, settings):
+        settings.DELETION_BATCH_SIZE = 1
+        settings.DELETION_BATCHES_PER_TASK = 2
+        other = django_user_model.objects.create_user(username='other')
+        kept = Post.objects.create(text='Чужой пост', author=other)
+        own = Post.objects.create(text='Свой пост', author=user)
+        for i in range(3):
+            Comment.objects.create(post=kept, author=user, text=f'Мой {i}')
+            Comment.objects.create(post=own, author=other, text=f'Чужой {i}')
+        Follow.objects.create(user=user, author=other)
+        Follow.objects.create(user=other, author=user)
+        deletion.delete_user(user)
+
+        def rows():
+            return (Post.all_objects.count() + Comment.objects.count()
+                    + Follow.objects.count())
+
+        steps = 0
+        while True:
+            before = rows()
+            finished = deletion.purge_user(user.pk)
+            assert before - rows() <= 2, \
+                'Проверьте, что шаг удаления не выходит за DELETION_BATCHES_PER_TASK пачек'
+            steps += 1
+            if finished:
+                break
+        assert rows() == 1 and steps >= 5
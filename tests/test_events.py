@@ -0,0 +1,96 @@
+import json
+import re
+
+import pytest
+
+from posts.models import Follow, Post, PostEvent
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(username='author', password='1234567')
+
+
+@pytest.fixture
+def fast_events(settings):
+    settings.EVENTS_POLL_INTERVAL = 0.01
+    settings.EVENTS_HEARTBEAT = 0.05
+    settings.EVENTS_MAX_AGE = 0.3
+    return settings
+
+
+def messages(chunks):
+    found = []
+    for chunk in chunks:
+        chunk = chunk.decode()
+        if 'event: posts' in chunk:
+            lines = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+            found.append((int(lines['id']), json.loads(lines['data'])))
+    return found
+
+
+class TestFollowEvents:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_posts_are_pushed(self, user, user_client, author, django_user_model, fast_events):
+        Follow.objects.create(user=user, author=author)
+        stranger = django_user_model.objects.create_user(username='stranger')
+        response = user_client.get('/follow/events/')
+        assert response['Content-Type'] == 'text/event-stream'
+        stream = iter(response.streaming_content)
+        assert next(stream).startswith(b'retry:')
+
+        Post.objects.create(text='Чужой пост', author=stranger)
+        post = Post.objects.create(text='Новый пост', author=author)
+        found = messages(stream)
+        assert len(found) == 1, \
+            'Проверьте, что поток отдаёт только посты авторов из подписок'
+        event_id, data = found[0]
+        assert data['count'] == 1
+        assert data['posts'][0]['id'] == post.pk
+        assert data['posts'][0]['url'] == f'/author/{post.pk}/'
+        assert event_id == PostEvent.objects.get(post_id=post.pk).pk
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reconnect_with_last_event_id(self, user, user_client, author, fast_events):
+        Follow.objects.create(user=user, author=author)
+        first = Post.objects.create(text='Первый', author=author)
+        second = Post.objects.create(text='Второй', author=author)
+        seen = PostEvent.objects.get(post_id=first.pk).pk
+        response = user_client.get('/follow/events/', HTTP_LAST_EVENT_ID=str(seen))
+        chunks = list(response.streaming_content)
+        found = messages(chunks)
+        assert [post['id'] for _, data in found for post in data['posts']] == [second.pk], \
+            'Проверьте, что после переподключения приходят только пропущенные посты'
+        assert b': ping\n\n' in chunks, \
+            'Проверьте, что молчащий поток шлёт комментарий-пинг'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_login_required(self, client):
+        response = client.get('/follow/events/')
+        assert response.status_code == 302
+
+    @pytest.mark.django_db(transaction=True)
+    def test_page_script_outside_title(self, user_client):
+        content = user_client.get('/follow/').content.decode()
+        title = re.search(r'<title>(.*?)</title>', content, re.S).group(1)
+        assert '<script' not in title, \
+            'Проверьте, что скрипт потока не попадает в <title>'
+        assert content.index('jquery') < content.index('EventSource'), \
+            'Проверьте, что скрипт потока подключается после jQuery'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_streams_are_capped(self, user_client, fast_events):
+        fast_events.EVENTS_MAX_STREAMS = 1
+        first = user_client.get('/follow/events/')
+        assert first.status_code == 200
+        busy = user_client.get('/follow/events/')
+        assert busy.status_code == 503, \
+            'Проверьте, что сверх EVENTS_MAX_STREAMS поток отвечает 503'
+        assert busy.content.startswith(b'retry:'), \
+            'Проверьте, что ответ 503 подсказывает браузеру, когда прийти снова'
+        first.close()
+        again = user_client.get('/follow/events/')
+        assert again.status_code == 200, \
+            'Проверьте, что закрытый поток освобождает место'
+        again.close()
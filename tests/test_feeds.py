@@ -0,0 +1,80 @@
+import pytest
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import feeds
+from posts.models import FeedCounter, Group, Post
+from posts.templatetags.pagination import page_window
+
+
+def counter(key):
+    return FeedCounter.objects.get(key=key).count
+
+
+class TestFeeds:
+
+    def test_page_window(self):
+        page = Paginator(range(1000), 10).page(50)
+        assert page_window(page) == [1, None, 48, 49, 50, 51, 52, None, 100], \
+            'Проверьте, что пагинатор выводит окно страниц, а не все номера'
+        assert page_window(Paginator(range(40), 10).page(1)) == [1, 2, 3, 4]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counters_follow_writes(self, user, client):
+        group = Group.objects.create(title='Группа', slug='g')
+        other = Group.objects.create(title='Другая', slug='o')
+        post = Post.objects.create(text='Пост', author=user, group=group)
+        feeds.recount()
+        Post.objects.create(text='Ещё', author=user)
+        assert counter(feeds.ALL) == 2 and counter(feeds.author_key(user.pk)) == 2
+
+        post.group = other
+        post.save()
+        assert counter(feeds.group_key(group.pk)) == 0
+        assert feeds.count(feeds.group_key(other.pk), other.posts.all()) == 1, \
+            'Проверьте, что счётчики групп следуют за редактированием поста'
+
+        post.delete()
+        assert counter(feeds.ALL) == 1
+
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get('/')
+        assert response.context['paginator'].count == 1
+        assert not any('COUNT(' in q['sql'] for q in captured.captured_queries), \
+            'Проверьте, что лента берёт число постов из счётчика, а не COUNT(*)'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_no_count_mode(self, user, client, settings):
+        settings.FEED_COUNTS = False
+        for i in range(11):
+            Post.objects.create(text=f'Пост {i}', author=user)
+        with CaptureQueriesContext(connection) as captured:
+            page = client.get('/').context['page']
+        assert page.has_next() and not page.has_previous()
+        assert not any('COUNT(' in q['sql'] for q in captured.captured_queries), \
+            'Проверьте, что в режиме без подсчёта нет COUNT(*)'
+
+        page = client.get('/', {'page': 2}).context['page']
+        assert len(page) == 1 and not page.has_next() and page.has_previous()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_no_count_mode_has_no_page_numbers(self, user, client, settings):
+        settings.FEED_COUNTS = False
+        for i in range(11):
+            Post.objects.create(text=f'Пост {i}', author=user)
+        page = client.get('/').context['page']
+        assert page_window(page) == [], \
+            'Проверьте, что без подсчёта нет номера «последней» страницы'
+        content = client.get(f'/{user.username}/').content.decode()
+        assert 'href="?page=2"' in content and '>2</a>' not in content, \
+            'Проверьте, что без подсчёта видны только «Предыдущая» и «Следующая»'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_no_count_mode_page_past_end(self, user, client, settings):
+        settings.FEED_COUNTS = False
+        for i in range(11):
+            Post.objects.create(text=f'Пост {i}', author=user)
+        page = client.get('/', {'page': 7}).context['page']
+        assert page.number == 2 and len(page) == 1, \
+            'Проверьте, что номер за концом ленты даёт последнюю страницу'
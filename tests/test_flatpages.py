@@ -0,0 +1,47 @@
+import pytest
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.sites.models import Site
+
+from posts import flatpages
+
+
+@pytest.fixture
+def about(settings):
+    flatpages.pages.clear()
+    page = FlatPage.objects.create(url='/about-us/', title='О нас', content='Первая версия')
+    page.sites.add(Site.objects.get(pk=settings.SITE_ID))
+    yield page
+    flatpages.pages.clear()
+
+
+class TestFlatpagesCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_hit_without_queries(self, client, about, django_assert_num_queries):
+        first = client.get('/about-us/')
+        assert first.status_code == 200
+        with django_assert_num_queries(0):
+            second = client.get('/about-us/')
+        assert second.content == first.content, \
+            'Проверьте, что повторный показ статической страницы отдаётся из кэша'
+
+        response = client.get('/about-us/', HTTP_IF_NONE_MATCH=second['ETag'])
+        assert response.status_code == 304, 'Проверьте поддержку ETag'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalidation(self, client, about):
+        client.get('/about-us/')
+        about.content = 'Вторая версия'
+        about.save()
+        assert 'Вторая версия' in client.get('/about-us/').content.decode(), \
+            'Проверьте, что сохранение FlatPage сбрасывает кэш'
+
+        about.delete()
+        assert client.get('/about-us/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_logged_in_not_cached(self, user_client, about, user):
+        response = user_client.get('/about-us/')
+        assert user.username in response.content.decode()
+        assert not flatpages.pages._pages, \
+            'Проверьте, что страницы для вошедших пользователей не кэшируются'
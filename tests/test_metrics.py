@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+
+import pytest
+from django.test import Client, override_settings
+
+from posts.metrics import Registry, registry
+
+
+class TestMetricsRegistry:
+
+    def test_threads_are_summed(self):
+        local = Registry()
+        counter = local.counter('hits_total', 'Попадания', labels=('view',))
+        histogram = local.histogram('latency_seconds', 'Время', labels=('view',))
+
+        def work():
+            for _ in range(1000):
+                counter.inc(view='index')
+                histogram.observe(0.02, view='index')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        text = local.expose()
+        assert 'hits_total{view="index"} 4000' in text, \
+            'Проверьте, что счётчики всех потоков складываются'
+        assert 'latency_seconds_bucket{view="index",le="+Inf"} 4000' in text
+        assert 'latency_seconds_bucket{view="index",le="0.01"} 0' in text
+
+    def test_processes_are_merged(self, tmp_path):
+        first, second = Registry(), Registry()
+        for local in (first, second):
+            local.counter('jobs_total', 'Задачи').inc(3)
+        # второй «воркер» сбрасывает снимок под чужим pid
+        second.flush(str(tmp_path))
+        (tmp_path / f'{os.getpid()}.json').rename(tmp_path / 'other.json')
+        with override_settings(METRICS_DIR=str(tmp_path)):
+            assert 'jobs_total 6' in first.expose(), \
+                'Проверьте, что снимки разных процессов складываются'
+
+    def test_stale_process_files_removed(self, tmp_path):
+        first, second = Registry(), Registry()
+        for local in (first, second):
+            local.counter('jobs_total', 'Задачи').inc(3)
+        second.flush(str(tmp_path))
+        stale = tmp_path / 'gone.json'
+        (tmp_path / f'{os.getpid()}.json').rename(stale)
+        os.utime(stale, (time.time() - 3600, time.time() - 3600))
+        with override_settings(METRICS_DIR=str(tmp_path)):
+            assert 'jobs_total 3' in first.expose(), \
+                'Проверьте, что снимки завершившихся воркеров не учитываются'
+        assert not stale.exists(), \
+            'Проверьте, что файлы завершившихся воркеров удаляются'
+
+    def test_background_flush(self, tmp_path):
+        local = Registry()
+        local.counter('jobs_total', 'Задачи').inc(2)
+        with override_settings(METRICS_DIR=str(tmp_path), METRICS_FLUSH_INTERVAL=0.01):
+            local.start_flushing()
+            local.start_flushing()
+            path = tmp_path / f'{os.getpid()}.json'
+            for _ in range(200):
+                if path.exists():
+                    break
+                time.sleep(0.01)
+            assert path.exists(), 'Проверьте, что снимок сбрасывается фоновым потоком'
+
+
+class TestMetricsView:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_disabled(self, client):
+        assert client.get('/metrics').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_request_latency(self, post_with_group):
+        registry.reset()
+        with override_settings(METRICS_ENABLED=True):
+            client = Client()
+            client.get('/?page=2')
+            client.get(f'/group/{post_with_group.group.slug}/')
+            response = client.get('/metrics')
+        text = response.content.decode()
+        assert response.status_code == 200
+        assert 'yatube_request_duration_seconds_count{view="index"} 1' in text, \
+            'Проверьте, что время ответа пишется по имени url'
+        assert 'yatube_feed_page_depth_bucket{view="index",le="2"} 1' in text
+        assert 'yatube_db_queries_total{view="group"}' in text
+        assert 'yatube_cache_hit_ratio' in text
@@ -0,0 +1,81 @@
+import pytest
+from django.core import mail
+from django.core.management import call_command
+
+from posts import metrics
+from users.models import OutboxMessage
+from users.smtp_stub import StubSMTPServer
+
+
+@pytest.fixture
+def outbox_settings(settings):
+    settings.EMAIL_BACKEND = 'users.backends.OutboxBackend'
+    return settings
+
+
+@pytest.fixture
+def smtp(outbox_settings):
+    server = StubSMTPServer().start()
+    outbox_settings.EMAIL_OUTBOX_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    outbox_settings.EMAIL_HOST = '127.0.0.1'
+    outbox_settings.EMAIL_PORT = server.port
+    yield server
+    server.stop()
+
+
+class TestOutbox:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_password_reset_is_queued(self, client, outbox_settings, django_user_model):
+        django_user_model.objects.create_user(username='reset', email='reset@example.com', password='Pa55word!')
+        response = client.post('/auth/password_reset/', {'email': 'reset@example.com'})
+        assert response.status_code == 302
+        message = OutboxMessage.objects.get()
+        assert message.recipients == 'reset@example.com', \
+            'Проверьте, что письмо сброса пароля ставится в очередь, а не отправляется'
+        assert message.status == OutboxMessage.PENDING
+
+    @pytest.mark.django_db(transaction=True)
+    def test_batch_over_one_connection(self, smtp):
+        for i in range(5):
+            mail.send_mail(f'Тема {i}', 'Текст', 'from@example.com', [f'u{i}@example.com'])
+        assert OutboxMessage.objects.filter(status=OutboxMessage.PENDING).count() == 5
+
+        call_command('send_outbox')
+
+        assert len(smtp.messages) == 5, 'Проверьте, что воркер доставляет все письма'
+        assert smtp.connections == 1, \
+            'Проверьте, что пачка уходит через одно соединение'
+        assert not OutboxMessage.objects.exclude(status=OutboxMessage.SENT).exists()
+        assert sorted(recipients[0] for _, recipients, _ in smtp.messages) == \
+            [f'u{i}@example.com' for i in range(5)]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_retry_with_backoff(self, smtp, settings):
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        mail.send_mail('Тема', 'Текст', 'from@example.com', ['a@example.com'])
+        smtp.fail_next = 1
+
+        call_command('send_outbox')
+        message = OutboxMessage.objects.get()
+        assert message.status == OutboxMessage.PENDING and message.attempts == 1, \
+            'Проверьте, что после временной ошибки письмо остаётся в очереди'
+        assert message.next_attempt_at > message.created, \
+            'Проверьте, что повтор откладывается'
+
+        OutboxMessage.objects.update(next_attempt_at=message.created)
+        smtp.fail_next = 1
+        call_command('send_outbox')
+        assert OutboxMessage.objects.get().status == OutboxMessage.FAILED, \
+            'Проверьте, что после EMAIL_OUTBOX_MAX_ATTEMPTS письмо помечается недоставленным'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_metrics(self, smtp):
+        metrics.registry.reset()
+        mail.send_mail('Тема', 'Текст', 'from@example.com', ['a@example.com'])
+        assert 'yatube_email_outbox_depth 1' in metrics.registry.expose()
+        call_command('send_outbox')
+        exposed = metrics.registry.expose()
+        assert 'yatube_email_outbox_depth 0' in exposed
+        assert 'yatube_email_delivery_seconds_count 1' in exposed
+        assert 'yatube_email_deliveries_total{result="sent"} 1' in exposed
@@ -0,0 +1,41 @@
+import pytest
+from django.core.cache import cache
+from django.test import Client, override_settings
+
+from posts import profiling
+
+
+class TestProfilingMiddleware:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_server_timing_disabled(self, client, post_with_group):
+        response = client.get('/')
+        assert 'Server-Timing' not in response, \
+            'Проверьте, что выключенное профилирование не добавляет заголовок'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_server_timing_enabled(self, post_with_group):
+        with override_settings(PROFILING_ENABLED=True):
+            client = Client()
+            response = client.get(f'/group/{post_with_group.group.slug}/')
+        header = response['Server-Timing']
+        for metric in ('db;', 'tpl;', 'cache;', 'thumb;', 'total;'):
+            assert metric in header, f'Проверьте, что в Server-Timing есть `{metric}`'
+        assert 'desc="0 queries"' not in header, 'Проверьте, что считаются запросы к базе'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sampling(self, post_with_group):
+        with override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0):
+            client = Client()
+            response = client.get('/')
+        assert 'Server-Timing' not in response, \
+            'Проверьте, что запросы вне выборки не профилируются'
+
+    def test_get_many_counted_once(self):
+        profiling.install()
+        cache.set('profiling:a', 1)
+        with profiling.collect() as collector:
+            cache.get_many(['profiling:a', 'profiling:b', 'profiling:c'])
+            cache.get('profiling:a')
+        assert (collector.cache_hits, collector.cache_misses) == (2, 2), \
+            'Проверьте, что ключи get_many не считаются ещё раз через get'
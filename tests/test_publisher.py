@@ -0,0 +1,104 @@
+import gzip
+import io
+
+import pytest
+
+from posts import publisher, tasks
+from posts.models import Comment, Group, Post, Task
+
+
+def read(root, name):
+    return (root / name).read_text(encoding='utf-8')
+
+
+@pytest.fixture
+def published(settings, tmp_path):
+    settings.PUBLISH_ROOT = str(tmp_path)
+    settings.PUBLISH_PAGES = 2
+    settings.PUBLISH_DELAY = 0
+    return tmp_path
+
+
+def call(application, path, query='', cookie='', encoding=''):
+    result = {}
+
+    def start_response(status, headers):
+        result['status'] = status
+        result['headers'] = dict(headers)
+
+    body = b''.join(application({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'HTTP_COOKIE': cookie,
+        'HTTP_ACCEPT_ENCODING': encoding,
+        'wsgi.input': io.BytesIO(),
+    }, start_response))
+    return result, body
+
+
+class TestPublisher:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feeds_are_published(self, user, published, run_tasks):
+        group = Group.objects.create(title='Группа', slug='g')
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=user, group=group)
+            for i in range(11)
+        ]
+        run_tasks()
+        for name in ('page-1.html', 'page-2.html', 'group/g/page-1.html',
+                     'TestUser/page-1.html'):
+            assert (published / name).exists(), \
+                f'Проверьте, что публикуется страница {name}'
+        assert not (published / 'TestUser/page-3.html').exists()
+        assert 'Пост 10' in read(published, 'page-1.html')
+        assert 'Пост 0' in read(published, 'page-2.html'), \
+            'Проверьте, что вторая страница не повторяет первую'
+        assert gzip.decompress((published / 'page-1.html.gz').read_bytes()) \
+            == (published / 'page-1.html').read_bytes()
+
+        Comment.objects.create(post=posts[-1], author=user, text='Ответ')
+        run_tasks()
+        assert '1 комментариев' in read(published, 'group/g/page-1.html'), \
+            'Проверьте, что комментарий перерисовывает ленту группы'
+
+        group.slug = 'new'
+        group.save()
+        run_tasks()
+        assert not (published / 'group/g/page-1.html').exists(), \
+            'Проверьте, что старый адрес группы убирается с диска'
+        assert (published / 'group/new/page-1.html').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bursts_are_debounced(self, user, published, settings):
+        settings.PUBLISH_DELAY = 60
+        for i in range(5):
+            Post.objects.create(text=f'Пост {i}', author=user)
+        queued = Task.objects.filter(name='publish_pages')
+        assert sorted(queued.values_list('payload', flat=True)) == [
+            '{"path": "/"}', '{"path": "/TestUser/"}'
+        ], 'Проверьте, что серия правок ставит одну задачу на ленту'
+        assert tasks.run_batch() == 0, \
+            'Проверьте, что публикация ждёт PUBLISH_DELAY секунд'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_static_handler(self, user, published, run_tasks):
+        Post.objects.create(text='Пост с диска', author=user)
+        run_tasks()
+
+        def django(environ, start_response):
+            start_response('200 OK', [])
+            return [b'django']
+
+        application = publisher.StaticPages(django)
+        result, body = call(application, '/')
+        assert 'Пост с диска' in body.decode(), \
+            'Проверьте, что аноним получает страницу с диска'
+        result, body = call(application, '/', encoding='gzip, br')
+        assert result['headers']['Content-Encoding'] == 'gzip'
+        assert 'Пост с диска' in gzip.decompress(body).decode()
+        assert call(application, '/', cookie='sessionid=x')[1] == b'django', \
+            'Проверьте, что запрос с сессией уходит в Django'
+        assert call(application, '/', query='page=2')[1] == b'django'
+        assert call(application, '/../', query='')[1] == b'django'
@@ -0,0 +1,43 @@
+import pytest
+from django.core.management import call_command
+
+from posts import rendering
+from posts.models import Comment, Post
+
+
+class TestRenderedText:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_html_saved_on_write(self, user):
+        post = Post.objects.create(text='<b>жирный</b>\nвторая строка', author=user)
+        assert post.text_html == '&lt;b&gt;жирный&lt;/b&gt;<br>вторая строка', \
+            'Проверьте, что при сохранении поста текст экранируется и переводится в HTML'
+        assert post.render_version == rendering.RENDERER_VERSION
+
+        post.text = 'новый текст'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        assert post.text_html == 'новый текст', \
+            'Проверьте, что HTML обновляется и при save(update_fields=...)'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rerender_command(self, post, user):
+        comment = Comment.objects.create(post=post, author=user, text='a & b')
+        Post.objects.update(text_html='', render_version=0)
+        Comment.objects.update(text_html='', render_version=0)
+
+        call_command('rerender')
+
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        assert post.text_html == rendering.render(post.text), \
+            'Проверьте, что команда rerender перерисовывает устаревшие посты'
+        assert comment.text_html == 'a &amp; b'
+        assert comment.render_version == rendering.RENDERER_VERSION
+
+    @pytest.mark.django_db(transaction=True)
+    def test_template_outputs_stored_html(self, client, post):
+        Post.objects.filter(pk=post.pk).update(text_html='<i>готовый</i>')
+        response = client.get(f'/{post.author.username}/{post.id}/')
+        assert '<i>готовый</i>' in response.content.decode(), \
+            'Проверьте, что шаблон выводит сохранённый HTML'
@@ -0,0 +1,87 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import feeds, rings
+from posts.cards import Card
+from posts.models import Comment, Group, Post
+
+
+def get(client, url, data=None):
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url, data)
+    return response, len(captured)
+
+
+class TestFeedRings:
+
+    @pytest.fixture(autouse=True)
+    def _shared_cache(self, shared_cache):
+        pass
+
+    @pytest.mark.django_db(transaction=True)
+    def test_first_page_without_sql(self, user, client):
+        group = Group.objects.create(title='Группа', slug='g')
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=user, group=group)
+        feeds.recount()
+        get(client, '/')
+
+        post = Post.objects.create(text='Новый', author=user, group=group)
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        response, queries = get(client, '/')
+        assert queries == 0, 'Проверьте, что первая страница ленты читается из кольца'
+        page = response.context['page']
+        assert type(page[0]) == Card and page[0].pk == post.pk, \
+            'Проверьте, что сигнал сохранения поста обновляет кольцо'
+        assert page[0].comment_count == 1
+        assert response.context['paginator'].count == 4
+
+        get(client, '/group/g/')
+        other = Group.objects.create(title='Другая', slug='o')
+        post.group = other
+        post.save()
+        response, queries = get(client, '/group/g/')
+        assert queries == 1, 'Проверьте, что лента группы читает из базы только группу'
+        assert post.pk not in [card.pk for card in response.context['page']]
+        assert response.context['paginator'].count == 3
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stale_generation_and_deep_pages(self, user, client, settings):
+        settings.FEED_RING_SIZE = 12
+        for i in range(25):
+            Post.objects.create(text=f'Пост {i}', author=user)
+        feeds.recount()
+        get(client, '/')
+        assert get(client, '/')[1] == 0
+
+        # запись в другом процессе: поднято только поколение в кэше
+        rings.bump(feeds.ALL)
+        assert get(client, '/')[1] > 0, \
+            'Проверьте, что кольцо с чужим поколением перечитывается из базы'
+        assert get(client, '/')[1] == 0
+
+        response, queries = get(client, '/', {'page': 2})
+        assert queries > 0, 'Проверьте, что страницы глубже кольца читаются из базы'
+        assert [post.text for post in response.context['page']][0] == 'Пост 14'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_delete_invalidates(self, user, client):
+        post = Post.objects.create(text='Пост', author=user)
+        feeds.recount()
+        get(client, '/')
+        post.delete()
+        response, _ = get(client, '/')
+        assert list(response.context['page']) == []
+        assert response.context['paginator'].count == 0
+
+
+class TestLocalCacheRings:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_disabled(self, user, client):
+        Post.objects.create(text='Пост', author=user)
+        feeds.recount()
+        get(client, '/')
+        assert get(client, '/')[1] > 0, \
+            'Проверьте, что с кэшем одного процесса кольца не включаются'
@@ -0,0 +1,39 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+
+from posts import slowlog
+
+
+class TestSlowQueryLog:
+
+    def test_fingerprint(self):
+        first = slowlog.fingerprint('SELECT * FROM t WHERE id IN (%s, %s) AND name = \'a\'')
+        second = slowlog.fingerprint('SELECT * FROM t WHERE id IN (%s) AND name = \'bb\'')
+        assert first == second, 'Проверьте, что отпечаток не зависит от значений'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_log_and_command(self, client, post_with_group, tmp_path, capsys):
+        log = tmp_path / 'slow.log'
+        slowlog.slow_query_log.seen.clear()
+        slowlog.install(connection)
+        try:
+            with override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG=str(log)):
+                client.get(f'/{post_with_group.author.username}/{post_with_group.id}/')
+                client.get(f'/{post_with_group.author.username}/{post_with_group.id}/')
+        finally:
+            connection.execute_wrappers.remove(slowlog.slow_query_log)
+
+        stats = slowlog.read(str(log))
+        assert stats, 'Проверьте, что медленные запросы пишутся в журнал'
+        item = max(stats.values(), key=lambda item: item['count'])
+        assert item['count'] >= 2, 'Проверьте, что повторы группируются по отпечатку'
+        assert 'posts.views.post_view' in item['views']
+        assert any(item.get('plan') for item in stats.values()), \
+            'Проверьте, что для SELECT снимается EXPLAIN QUERY PLAN'
+        assert any(item['templates'] for item in stats.values()), \
+            'Проверьте, что запоминается строка шаблона'
+
+        call_command('slow_queries', log=str(log), top=3)
+        assert 'count=' in capsys.readouterr().out
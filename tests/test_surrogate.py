@@ -0,0 +1,82 @@
+import pytest
+from django.core.handlers.wsgi import WSGIHandler
+from wsgiref.util import setup_testing_defaults
+
+from posts.models import Comment, Group, Post
+from posts.proxy_stub import StubProxy
+
+
+@pytest.fixture
+def proxy(settings):
+    server = StubProxy(WSGIHandler()).start()
+    settings.SURROGATE_PURGE_URL = server.purge_url
+    yield server
+    server.stop()
+
+
+def get(proxy, path, cookie=''):
+    environ = {'PATH_INFO': path, 'HTTP_COOKIE': cookie}
+    setup_testing_defaults(environ)
+    result = {}
+
+    def start_response(status, headers):
+        result.update(headers)
+
+    body = b''.join(proxy(environ, start_response))
+    return result, body.decode()
+
+
+class TestSurrogateKeys:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_headers(self, client, user, post_with_group):
+        response = client.get(f'/group/{post_with_group.group.slug}/')
+        keys = response['Surrogate-Key'].split()
+        for key in (f'post:{post_with_group.pk}', f'user:{user.pk}',
+                    f'group:{post_with_group.group_id}',
+                    f'feed:group:{post_with_group.group_id}', 'site'):
+            assert key in keys, f'Проверьте, что в Surrogate-Key есть {key}'
+        assert 's-maxage=600' in response['Cache-Control'], \
+            'Проверьте, что ответ анониму можно хранить в прокси'
+        assert 'public' in response['Cache-Control']
+
+        response = client.get(f'/{user.username}/{post_with_group.pk}/')
+        assert f'post:{post_with_group.pk}' in response['Surrogate-Key']
+        assert 'private' in response['Cache-Control'], \
+            'Проверьте, что страница поста не хранится: показ — просмотр'
+
+        client.force_login(user)
+        response = client.get('/')
+        assert 'private' in response['Cache-Control'], \
+            'Проверьте, что ответ вошедшему пользователю прокси не хранит'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_changes_purge_proxy(self, user, proxy, run_tasks):
+        group = Group.objects.create(title='Группа', slug='g')
+        post = Post.objects.create(text='Первый', author=user, group=group)
+        run_tasks()
+        assert get(proxy, '/')[0]['X-Cache'] == 'MISS'
+        assert get(proxy, '/')[0]['X-Cache'] == 'HIT'
+        assert get(proxy, '/group/g/')[0]['X-Cache'] == 'MISS'
+        assert get(proxy, '/TestUser/')[0]['X-Cache'] == 'MISS'
+        assert get(proxy, '/', cookie='sessionid=x')[0].get('X-Cache') is None
+
+        Post.objects.create(text='Второй', author=user)
+        Comment.objects.create(post=post, author=user, text='Ответ')
+        run_tasks()
+        assert len(proxy.purges) == 2, \
+            'Проверьте, что правки сбрасываются одним запросом на пачку'
+        assert get(proxy, '/')[0]['X-Cache'] == 'MISS', \
+            'Проверьте, что новый пост сбрасывает общую ленту'
+        headers, body = get(proxy, '/TestUser/')
+        assert headers['X-Cache'] == 'MISS' and 'Второй' in body, \
+            'Проверьте, что новый пост сбрасывает профиль автора'
+        headers, body = get(proxy, '/group/g/')
+        assert headers['X-Cache'] == 'MISS' and '1 комментариев' in body, \
+            'Проверьте, что комментарий сбрасывает страницы с карточкой поста'
+
+        get(proxy, '/group/g/')
+        group.title = 'Новое название'
+        group.save()
+        run_tasks()
+        assert 'Новое название' in get(proxy, '/group/g/')[1]
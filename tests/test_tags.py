@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import tags, views
+from posts.models import Post, TagIndex
+
+
+class TestTags:
+
+    def test_extract(self):
+        assert tags.extract('Привет, @bob.smith! #Django и #django, a#b, mail@x.ru') == {
+            ('@', 'bob.smith'), ('#', 'django'),
+        }, 'Проверьте разбор хэштегов и упоминаний'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_index_follows_edit(self, user_client, user):
+        post = Post.objects.create(text='Про #python', author=user)
+        assert list(TagIndex.objects.values_list('tag__name', flat=True)) == ['python']
+
+        user_client.post(
+            f'/{user.username}/{post.id}/edit/', data={'text': 'Теперь про #django'}
+        )
+        assert list(TagIndex.objects.values_list('tag__name', flat=True)) == ['django'], \
+            'Проверьте, что после редактирования индекс тегов обновляется'
+        assert 'href="/tag/django/"' in Post.objects.get(pk=post.pk).text_html, \
+            'Проверьте, что хэштег в тексте становится ссылкой'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_tag_feed_cursor(self, client, user):
+        for i in range(views.TAG_PAGE_SIZE + 3):
+            Post.objects.create(text=f'Пост {i} #лента', author=user)
+        Post.objects.create(text='Без тегов', author=user)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get('/tag/Лента/')
+        assert len(response.context['posts']) == views.TAG_PAGE_SIZE
+        assert not any('LIKE' in q['sql'] for q in captured.captured_queries), \
+            'Проверьте, что лента тега не использует LIKE'
+
+        response = client.get('/tag/лента/', {'after': response.context['next_cursor']})
+        texts = [post.text for post in response.context['posts']]
+        assert texts == [f'Пост {i} #лента' for i in (2, 1, 0)], \
+            'Проверьте, что вторая страница продолжает ленту по курсору'
+        assert response.context['next_cursor'] is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_uses_index(self, user):
+        Post.objects.create(text='#план', author=user)
+        entries = TagIndex.objects.filter(tag__name='план').values_list('tag_id', flat=True)
+        queryset = TagIndex.objects.filter(tag_id=entries[0]).order_by('-pub_date', '-post_id')
+        with connection.cursor() as cursor:
+            sql, params = queryset.values_list('pub_date', 'post_id').query.sql_with_params()
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        assert 'tagindex_feed' in plan and 'TEMP B-TREE' not in plan, \
+            'Проверьте, что лента читается по составному индексу без сортировки'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_mentions(self, user_client, user, django_user_model):
+        another_user = django_user_model.objects.create_user(username='Другой')
+        Post.objects.create(text=f'Привет, @{user.username}', author=another_user)
+        response = user_client.get('/mentions/')
+        assert [post.author for post in response.context['posts']] == [another_user], \
+            'Проверьте, что в ленте упоминаний есть посты, где упомянут пользователь'
@@ -0,0 +1,116 @@
+import json
+from io import BytesIO
+
+import pytest
+from django.core.files import File
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import F
+from PIL import Image
+
+from posts import tasks
+from posts.models import Post, Task
+
+
+@pytest.fixture
+def collected():
+    calls = []
+
+    @tasks.task('test_batch', batch=True)
+    def batch_handler(payloads):
+        calls.append(sorted(payload['n'] for payload in payloads))
+
+    @tasks.task('test_broken')
+    def broken(**payload):
+        raise RuntimeError('сломано')
+
+    @tasks.task('test_single')
+    def single(n):
+        if n == 1:
+            raise RuntimeError('сломано')
+        calls.append(n)
+
+    yield calls
+    tasks.handlers.pop('test_batch')
+    tasks.handlers.pop('test_broken')
+    tasks.handlers.pop('test_single')
+
+
+class TestTasks:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_enqueue_on_commit(self, collected):
+        with transaction.atomic():
+            tasks.enqueue('test_batch', n=1)
+            assert not Task.objects.exists(), \
+                'Проверьте, что задача ставится только после коммита транзакции'
+        assert Task.objects.count() == 1
+
+        with pytest.raises(ValueError):
+            with transaction.atomic():
+                tasks.enqueue('test_batch', n=2)
+                raise ValueError
+        assert Task.objects.count() == 1, 'Проверьте, что откат не оставляет задач'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_batches_of_same_type(self, collected):
+        for n in range(5):
+            tasks.enqueue('test_batch', n=n)
+        call_command('run_workers', '--once', '--batch-size', '3')
+        assert collected == [[0, 1, 2], [3, 4]], \
+            'Проверьте, что задачи одного типа выполняются пачками'
+        assert not Task.objects.exists(), 'Проверьте, что выполненные задачи удаляются'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_single_tasks_claimed_one_by_one(self, collected):
+        for n in range(3):
+            tasks.enqueue('test_single', n=n)
+        name, rows = tasks.claim(10)
+        assert name == 'test_single' and len(rows) == 1, \
+            'Проверьте, что обычная задача берётся в аренду по одной'
+        Task.objects.update(lease='', status=Task.PENDING, run_after=F('created'))
+        call_command('run_workers', '--once')
+        assert collected == [0, 2], \
+            'Проверьте, что каждая задача выполняется один раз'
+        task = Task.objects.get()
+        assert json.loads(task.payload) == {'n': 1} and task.attempts == 1, \
+            'Проверьте, что попытку теряет только упавшая задача'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_claim_skips_leased(self, collected):
+        tasks.enqueue('test_batch', n=1)
+        name, rows = tasks.claim(10)
+        assert name == 'test_batch' and len(rows) == 1
+        assert tasks.claim(10) == (None, []), \
+            'Проверьте, что взятая в работу задача не достаётся второму воркеру'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_retry_then_fail(self, collected, settings):
+        settings.TASK_MAX_ATTEMPTS = 2
+        tasks.enqueue('test_broken', n=1)
+        tasks.run_batch()
+        task = Task.objects.get()
+        assert task.status == Task.PENDING and task.attempts == 1
+        assert task.run_after > task.created, 'Проверьте, что повтор откладывается'
+        assert 'сломано' in task.last_error
+
+        Task.objects.update(run_after=task.created)
+        tasks.run_batch()
+        assert Task.objects.get().status == Task.FAILED, \
+            'Проверьте, что после TASK_MAX_ATTEMPTS задача помечается упавшей'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_post_image_warms_thumbnails(self, user_client):
+        file_obj = BytesIO()
+        Image.new('RGB', (50, 50), color=(255, 0, 0)).save(file_obj, 'png')
+        file_obj.seek(0)
+        response = user_client.post(
+            '/new/', data={'text': 'Пост с картинкой', 'image': File(file_obj, name='pic.png')}
+        )
+        assert response.status_code == 302
+        post = Post.objects.get(text='Пост с картинкой')
+        assert post.image, 'Проверьте, что картинка из формы нового поста сохраняется'
+        assert Task.objects.filter(name='warm_thumbnails').exists(), \
+            'Проверьте, что для картинки нового поста ставится задача миниатюр'
+        assert tasks.run_batch() == 1
+        assert not Task.objects.exists()
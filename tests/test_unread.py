@@ -0,0 +1,79 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import deletion, unread
+from posts.models import Follow, FollowMarker, Post
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(username='author', password='1234567')
+
+
+class TestUnreadPosts:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_posts_since_visit(self, user, user_client, author, django_user_model):
+        Follow.objects.create(user=user, author=author)
+        Post.objects.create(text='До визита', author=author)
+        assert unread.count(user) == 0, \
+            'Проверьте, что до первого визита в ленту счётчик пуст'
+        user_client.get('/follow/')
+        assert FollowMarker.objects.get(user=user).unread == 0
+
+        stranger = django_user_model.objects.create_user(username='stranger')
+        Post.objects.create(text='Чужой пост', author=stranger)
+        Post.objects.create(text='Первый новый', author=author)
+        Post.objects.create(text='Второй новый', author=author)
+        assert unread.count(user) == 2, \
+            'Проверьте, что считаются только новые посты авторов из подписок'
+        content = user_client.get('/').content.decode()
+        assert '<span class="badge badge-primary">2</span>' in content, \
+            'Проверьте, что в меню рядом с «Избранные авторы» есть число новых постов'
+
+        user_client.get('/follow/')
+        assert unread.count(user) == 0, \
+            'Проверьте, что визит в ленту подписок сбрасывает счётчик'
+        content = user_client.get('/').content.decode()
+        assert 'badge-primary' not in content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_recount_after_changes(self, user, user_client, author, django_user_model,
+                                   django_assert_num_queries):
+        other = django_user_model.objects.create_user(username='other')
+        Follow.objects.create(user=user, author=author)
+        user_client.get('/follow/')
+        Post.objects.create(text='Чужой пост', author=other)
+        post = Post.objects.create(text='Новый', author=author)
+
+        Follow.objects.create(user=user, author=other)
+        assert FollowMarker.objects.get(user=user).unread is None
+        assert unread.count(user) == 2, \
+            'Проверьте, что после подписки счётчик пересчитывается'
+        with django_assert_num_queries(1):
+            assert unread.count(user) == 2
+
+        deletion.delete_post(post)
+        assert unread.count(user) == 1, \
+            'Проверьте, что удалённый пост пропадает из счётчика'
+        Follow.objects.filter(user=user, author=other).delete()
+        assert unread.count(user) == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_visit_without_news_writes_nothing(self, user, user_client, author):
+        Follow.objects.create(user=user, author=author)
+        user_client.get('/follow/')
+        seen = FollowMarker.objects.get(user=user).seen
+        with CaptureQueriesContext(connection) as captured:
+            user_client.get('/follow/')
+        writes = [q['sql'] for q in captured if 'posts_followmarker' in q['sql']
+                  and not q['sql'].startswith('SELECT')]
+        assert not writes, \
+            'Проверьте, что визит без новых постов не пишет отметку'
+        assert FollowMarker.objects.get(user=user).seen == seen
+
+        Post.objects.create(text='Новый', author=author)
+        user_client.get('/follow/')
+        assert FollowMarker.objects.get(user=user).seen > seen, \
+            'Проверьте, что визит после новых постов сдвигает отметку'
@@ -3,3 +3,23 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.signals import user_logged_out
+        from django.db.models.signals import post_save, post_delete
+
+        from posts import metrics
+        from . import auth, outbox
+
+        metrics.registry.gauge(
+            "yatube_email_outbox_depth",
+            "Писем в очереди на отправку",
+            outbox.depth,
+        )
+        for signal in (post_save, post_delete):
+            signal.connect(
+                auth.invalidate, sender=get_user_model(),
+                dispatch_uid=f"users.auth.{signal is post_save}",
+            )
+        user_logged_out.connect(auth.invalidate, dispatch_uid="users.auth.out")
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+from posts.utils import shared_cache
+
+MODEL_BACKEND = "django.contrib.auth.backends.ModelBackend"
+
+
+def enabled():
+    """Снимок в кэше своего процесса не сбросить из другого воркера:
+    смена пароля или выход там действовали бы до конца TTL."""
+    return bool(getattr(settings, "AUTH_USER_CACHE_TTL", 60)) and shared_cache()
+
+
+def cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def _snapshot(user_id):
+    """Поля пользователя без пароля и хэш для проверки сессии: всё, что
+    нужно запросу, чтобы не ходить в auth_user."""
+    User = get_user_model()
+    key = cache_key(user_id)
+    data = cache.get(key)
+    if data is None:
+        user = User._default_manager.filter(pk=user_id).first()
+        if user is None:
+            return None, None
+        data = {
+            "fields": {
+                field.attname: getattr(user, field.attname)
+                for field in User._meta.concrete_fields
+                if field.attname != "password"
+            },
+            "db": user._state.db,
+            "session_hash": user.get_session_auth_hash(),
+        }
+        cache.set(key, data, getattr(settings, "AUTH_USER_CACHE_TTL", 60))
+    fields = data["fields"]
+    # пароль отложенное поле: прочитается из базы только по обращению,
+    # а save() такого объекта не затрёт его пустым значением
+    user = User.from_db(data["db"], list(fields), list(fields.values()))
+    return user, data["session_hash"]
+
+
+def get_user(request):
+    """auth.get_user, но пользователь и хэш сессии берутся из кэша."""
+    if not enabled():
+        return auth.get_user(request)
+    try:
+        user_id = get_user_model()._meta.pk.to_python(
+            request.session[auth.SESSION_KEY]
+        )
+        backend = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend != MODEL_BACKEND or backend not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    user, session_hash = _snapshot(user_id)
+    if user is None or not user.is_active:
+        return AnonymousUser()
+    if not constant_time_compare(
+        request.session.get(auth.HASH_SESSION_KEY, ""), session_hash
+    ):
+        request.session.flush()
+        return AnonymousUser()
+    user.backend = backend
+    return user
+
+
+def invalidate(sender, instance=None, user=None, **kwargs):
+    """post_save пользователя и user_logged_out: снимок больше не верен."""
+    target = instance or user
+    if target is not None and target.pk is not None:
+        cache.delete(cache_key(target.pk))
@@ -0,0 +1,54 @@
+from email import message_from_bytes
+from email.message import Message
+
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import EmailMessage, MIMEMixin
+from django.db import router
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Вместо отправки кладёт письма в таблицу OutboxMessage и сразу
+    возвращает управление. Доставляет их команда send_outbox."""
+
+    def send_messages(self, email_messages):
+        now = timezone.now()
+        rows = [
+            OutboxMessage(
+                subject=str(message.subject)[:255],
+                from_email=message.from_email,
+                recipients="\n".join(message.recipients()),
+                raw=message.message().as_bytes(),
+                next_attempt_at=now,
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        try:
+            OutboxMessage.objects.db_manager(
+                router.db_for_write(OutboxMessage)
+            ).bulk_create(rows)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(rows)
+
+
+class _RawMIME(MIMEMixin, Message):
+    pass
+
+
+class StoredMessage(EmailMessage):
+    """Письмо из очереди: отдаёт сохранённый MIME без пересборки, так его
+    примет любой бэкенд Django (smtp, file, locmem)."""
+
+    def __init__(self, row):
+        super().__init__(subject=row.subject, from_email=row.from_email)
+        self.row = row
+        self.to = row.recipients.splitlines()
+
+    def message(self):
+        return message_from_bytes(bytes(self.row.raw), _class=_RawMIME)
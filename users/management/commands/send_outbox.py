@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import metrics
+from users import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Доставляет письма из очереди пачками через одно соединение "
+        "с EMAIL_OUTBOX_BACKEND"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--loop", action="store_true",
+            help="Не выходить, когда очередь опустела, а ждать новых писем",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5.0,
+            help="Пауза между проверками пустой очереди, секунды",
+        )
+
+    def handle(self, *args, **options):
+        connection = outbox.outbox_connection()
+        taken = 0
+        try:
+            while True:
+                batch = outbox.deliver(connection, options["batch_size"])
+                taken += batch
+                metrics.registry.start_flushing()
+                if batch:
+                    continue
+                if not options["loop"]:
+                    break
+                connection.close()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        self.stdout.write(
+            f"Обработано писем: {taken}, в очереди: {outbox.depth()}"
+        )
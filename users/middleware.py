@@ -0,0 +1,18 @@
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from . import auth
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware, у которой request.user собирается из
+    снимка в кэше, без запроса к auth_user на каждой странице."""
+
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: self.get_user(request))
+
+    @staticmethod
+    def get_user(request):
+        if not hasattr(request, "_cached_user"):
+            request._cached_user = auth.get_user(request)
+        return request._cached_user
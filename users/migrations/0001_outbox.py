@@ -0,0 +1,35 @@
+# Generated by Django 2.2.9 on 2026-10-19 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(blank=True, max_length=255)),
+                ('from_email', models.CharField(max_length=255)),
+                ('recipients', models.TextField(help_text='Адреса по одному в строке')),
+                ('raw', models.BinaryField()),
+                ('status', models.CharField(choices=[('pending', 'в очереди'), ('sent', 'отправлено'), ('failed', 'не доставлено')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('next_attempt_at', models.DateTimeField()),
+                ('lease', models.CharField(blank=True, max_length=32)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='outbox_queue'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import models
+
+
+class OutboxMessage(models.Model):
+    """Письмо в очереди на отправку: OutboxBackend кладёт сюда готовое
+    MIME-сообщение, команда send_outbox доставляет его настоящим бэкендом."""
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "в очереди"),
+        (SENT, "отправлено"),
+        (FAILED, "не доставлено"),
+    )
+
+    subject = models.CharField(max_length=255, blank=True)
+    from_email = models.CharField(max_length=255)
+    recipients = models.TextField(help_text="Адреса по одному в строке")
+    raw = models.BinaryField()
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField()
+    # метка воркера, забравшего письмо; аренда истекает в next_attempt_at
+    lease = models.CharField(max_length=32, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipients}"
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="outbox_queue"
+            ),
+        ]
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import router
+from django.db.models import F
+from django.utils import timezone
+
+from posts import leases, metrics, routers
+
+from .backends import StoredMessage
+from .models import OutboxMessage
+
+
+def queue():
+    return OutboxMessage.objects.using(router.db_for_write(OutboxMessage))
+
+
+def depth():
+    return queue().filter(status=OutboxMessage.PENDING).count()
+
+
+def claim(batch_size):
+    """Берёт в аренду пачку готовых к отправке писем (posts.leases): если
+    воркер упадёт, письма вернутся в очередь, когда аренда истечёт."""
+    ready = queue().filter(
+        status=OutboxMessage.PENDING, next_attempt_at__lte=timezone.now()
+    )
+    lease = timedelta(seconds=getattr(settings, "EMAIL_OUTBOX_LEASE", 300))
+    return leases.claim(ready, "next_attempt_at", batch_size, lease)
+
+
+@routers.unit_of_work()
+def deliver(connection, batch_size=None):
+    """Одна пачка через одно открытое соединение. Возвращает число
+    взятых писем; 0 — очередь пуста."""
+    if batch_size is None:
+        batch_size = getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 100)
+    rows = claim(batch_size)
+    if not rows:
+        return 0
+
+    connection.open()
+    sent = []
+    for row in rows:
+        try:
+            if not connection.send_messages([StoredMessage(row)]):
+                raise RuntimeError("бэкенд не отправил письмо")
+        except Exception as exc:
+            retry(row, exc)
+            # после ошибки соединение могло остаться в сломанном состоянии
+            connection.close()
+            try:
+                connection.open()
+            except Exception:
+                pass
+            continue
+        sent.append(row)
+
+    now = timezone.now()
+    queue().filter(pk__in=[row.pk for row in sent]).update(
+        status=OutboxMessage.SENT, sent_at=now, lease="",
+        attempts=F("attempts") + 1, last_error="",
+    )
+    for row in sent:
+        metrics.email_delivery_latency.observe(
+            (now - row.created).total_seconds()
+        )
+    if sent:
+        metrics.email_deliveries.inc(len(sent), result="sent")
+    return len(rows)
+
+
+def retry(row, exc):
+    failed = leases.retry(
+        queue(), row, exc, "next_attempt_at",
+        base=getattr(settings, "EMAIL_OUTBOX_RETRY_DELAY", 30),
+        limit=getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5),
+        pending=OutboxMessage.PENDING, failed=OutboxMessage.FAILED,
+    )
+    metrics.email_deliveries.inc(result="failed" if failed else "retry")
+
+
+def outbox_connection():
+    return get_connection(
+        getattr(
+            settings, "EMAIL_OUTBOX_BACKEND",
+            "django.core.mail.backends.smtp.EmailBackend",
+        ),
+        fail_silently=False,
+    )
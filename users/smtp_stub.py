@@ -0,0 +1,82 @@
+import socketserver
+import threading
+
+
+class _Session(socketserver.StreamRequestHandler):
+    """Минимальный диалог SMTP: HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP,
+    QUIT. Письма складываются в server.messages."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 stub ESMTP")
+        sender, recipients = None, []
+        for raw in self.rfile:
+            command = raw.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 stub")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip("<> "), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip("<> "))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for line in self.rfile:
+                    if line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                with server.lock:
+                    failing = server.fail_next > 0
+                    if failing:
+                        server.fail_next -= 1
+                    else:
+                        server.messages.append(
+                            (sender, recipients, b"".join(lines))
+                        )
+                self.reply("451 Try again later" if failing else "250 OK")
+            elif verb in ("RSET", "NOOP"):
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    """Локальный SMTP для тестов и разработки: принимает письма в память.
+    fail_next — сколько следующих писем отклонить временной ошибкой."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _Session)
+        self.messages = []
+        self.connections = 0
+        self.fail_next = 0
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="smtp-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
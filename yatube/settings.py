@@ -38,11 +38,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "posts.middleware.MetricsMiddleware",
+    "posts.middleware.ProfilingMiddleware",
+    "posts.middleware.SurrogateKeyMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "posts.middleware.ReplicaPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "users.middleware.CachedAuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -79,6 +83,64 @@ DATABASES = {
     }
 }
 
+# Боевой профиль SQLite (YATUBE_DB_PROFILE=production): WAL позволяет
+# читать во время записи, busy_timeout ждёт блокировку вместо
+# "database is locked", соединения живут между запросами.
+SQLITE_PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": 5000,
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+}
+
+# Реплики только для чтения: YATUBE_DB_REPLICAS — пути к файлам через
+# запятую. Чтения постов, комментариев и групп (ReplicaRouter.replicated)
+# уходят на реплики; записи, всё остальное и чтения сразу после своей
+# записи (REPLICA_PIN_SECONDS) — на default.
+DATABASE_ROUTERS = [
+    "posts.routers.ShardRouter",
+    "posts.routers.ReplicaRouter",
+]
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 5
+
+for i, path in enumerate(filter(None, os.environ.get(
+        "YATUBE_DB_REPLICAS", "").split(","))):
+    alias = f"replica_{i}"
+    DATABASES[alias] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": path,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+if os.environ.get("YATUBE_DB_PROFILE") == "production":
+    DATABASES["default"].update({
+        "CONN_MAX_AGE": 600,
+        "OPTIONS": {"timeout": 5},
+        "PRAGMAS": SQLITE_PRODUCTION_PRAGMAS,
+    })
+
+# Шардирование постов и комментариев по автору: YATUBE_POST_SHARDS=N
+# заводит базы shard_0..shard_{N-1}. Связи с auth_user и группами
+# остаются в default, поэтому проверка внешних ключей на шардах выключена.
+POST_SHARDS = []
+
+for i in range(int(os.environ.get("YATUBE_POST_SHARDS", 0))):
+    alias = f"shard_{i}"
+    DATABASES[alias] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, f"db.{alias}.sqlite3"),
+        "CONN_MAX_AGE": DATABASES["default"].get("CONN_MAX_AGE", 0),
+        "PRAGMAS": {
+            **DATABASES["default"].get("PRAGMAS", {}),
+            "foreign_keys": "OFF",
+        },
+    }
+    POST_SHARDS.append(alias)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -126,11 +188,134 @@ LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 LOGOUT_REDIRECT_URL = "index"
 
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# Письма из запросов (сброс пароля и т.п.) только ставятся в очередь,
+# доставляет их команда send_outbox через EMAIL_OUTBOX_BACKEND.
+EMAIL_BACKEND = "users.backends.OutboxBackend"
+EMAIL_OUTBOX_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# пауза после первой неудачи, дальше удваивается (не больше часа)
+EMAIL_OUTBOX_RETRY_DELAY = 30
+EMAIL_OUTBOX_LEASE = 300
 
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
+
+# С общим для воркеров кэшем (memcached, redis) сессии читаются из кэша
+# (запись по-прежнему в базу), пользователь запроса — из снимка в кэше
+# на AUTH_USER_CACHE_TTL секунд. Снимок сбрасывается при сохранении
+# пользователя и выходе. LocMemCache у каждого процесса свой: выход или
+# смена пароля не дошли бы до других воркеров, поэтому с ним сессии и
+# пользователь читаются из базы (users.auth.enabled).
+if CACHES["default"]["BACKEND"].endswith((".LocMemCache", ".DummyCache")):
+    SESSION_ENGINE = "django.contrib.sessions.backends.db"
+else:
+    SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+AUTH_USER_CACHE_TTL = 60
+
+# Буфер просмотров постов (posts.counters): сброс в базу раз в
+# VIEW_COUNTER_FLUSH_INTERVAL секунд или при VIEW_COUNTER_FLUSH_SIZE разных
+# постах в буфере. При падении процесса теряется не больше этого окна.
+VIEW_COUNTER_FLUSH_INTERVAL = 5
+VIEW_COUNTER_FLUSH_SIZE = 500
+
+# Пагинатор лент берёт число постов из счётчиков posts.FeedCounter;
+# False — ленты показываются без подсчёта, только «назад/вперёд»
+FEED_COUNTS = True
+
+# Кольца posts.rings: последние FEED_RING_SIZE карточек общей ленты и
+# FEED_RING_GROUPS групп в памяти процесса (0 — выключены). Поколения
+# лент лежат в кэше default, по ним воркеры видят правки друг друга,
+# поэтому с LocMemCache кольца не включаются. FEED_RING_TTL — страховка
+# на случай потерянного поколения.
+FEED_RING_SIZE = 50
+FEED_RING_GROUPS = 20
+FEED_RING_TTL = 60
+
+# Готовые карточки постов (posts/includes/post_item.html) в кэше по
+# (пост, версия, имена автора и группы, смотрит ли автор). 0 — без кэша.
+CARD_CACHE_TTL = 3600
+
+# Статические копии первых PUBLISH_PAGES страниц общей ленты, лент групп
+# и профилей для анонимов (posts.publisher) под PUBLISH_ROOT; None —
+# без публикации. Правки за PUBLISH_DELAY секунд публикуются одной
+# задачей run_workers; метки отсрочки лежат в кэше default.
+PUBLISH_ROOT = None
+PUBLISH_PAGES = 3
+PUBLISH_DELAY = 2
+
+# Кэширующий прокси перед приложением (posts.surrogate): ответы анонимам
+# хранятся SURROGATE_MAX_AGE секунд (0 — не хранятся), правки моделей
+# сбрасывают их POST'ом с заголовком Surrogate-Key на SURROGATE_PURGE_URL
+# по SURROGATE_PURGE_BATCH ключей. None — сброс не отправляется.
+SURROGATE_MAX_AGE = 600
+SURROGATE_PURGE_URL = None
+SURROGATE_PURGE_HEADERS = {}
+SURROGATE_PURGE_BATCH = 256
+SURROGATE_PURGE_TIMEOUT = 5
+
+# Поток новых постов ленты подписок (posts.events, /follow/events/):
+# журнал читается процессом раз в EVENTS_POLL_INTERVAL секунд, соединение
+# живёт EVENTS_MAX_AGE секунд с комментарием раз в EVENTS_HEARTBEAT,
+# события старше EVENTS_KEEP_HOURS часов удаляются из журнала.
+# Соединение занимает поток воркера: процесс держит не больше
+# EVENTS_MAX_STREAMS соединений, остальным отвечает 503. Больше соединений —
+# только с потоковыми (gunicorn --threads) или gevent-воркерами.
+FOLLOW_EVENTS = True
+EVENTS_POLL_INTERVAL = 1.0
+EVENTS_HEARTBEAT = 15
+EVENTS_MAX_AGE = 300
+EVENTS_KEEP_HOURS = 24
+EVENTS_MAX_STREAMS = 10
+
+# Сколько секунд воркер отдаёт статическую страницу из памяти, не зная
+# о её правке в другом процессе (в своём кэш сбрасывают сигналы)
+FLATPAGES_CACHE_TTL = 300
+
+# Очередь фоновых задач posts.tasks (manage.py run_workers)
+TASK_BATCH_SIZE = 50
+TASK_MAX_ATTEMPTS = 5
+# пауза после первой неудачи, дальше удваивается (не больше часа)
+TASK_RETRY_DELAY = 10
+TASK_LEASE = 300
+# Фоновое удаление пользователей и постов (posts.deletion)
+DELETION_BATCH_SIZE = 500
+DELETION_BATCHES_PER_TASK = 20
+# Посты старше этого числа дней переносит в архив команда archive_posts
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 500
+
+# Профилирование запросов: Server-Timing и строка в лог posts.profiling
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 1.0
+
+# Метрики в формате Prometheus на /metrics. METRICS_DIR нужен при
+# нескольких воркерах: каждый процесс фоновым потоком сбрасывает туда свой
+# снимок, файлы без обновления дольше трёх интервалов удаляются.
+METRICS_ENABLED = False
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+
+# Журнал медленных запросов: None выключает обёртку полностью
+SLOW_QUERY_THRESHOLD_MS = None
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, "slow_queries.log")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        "posts": {
+            "handlers": ["console"],
+            "level": "INFO",
+        },
+    },
+}
@@ -1,10 +1,11 @@
 from django.contrib import admin
 from django.urls import include, path
-from django.contrib.flatpages import views
 from django.conf import settings
 from django.conf.urls.static import static
 from django.conf.urls import handler404, handler500
 
+from posts import flatpages, views as posts_views
+
 handler404 = "posts.views.page_not_found"  # noqa
 handler500 = "posts.views.server_error"  # noqa
 
@@ -12,15 +13,17 @@ urlpatterns = [
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
     path("admin/", admin.site.urls),
-    path("about/", include("django.contrib.flatpages.urls")),
+    path("about/<path:url>", flatpages.flatpage,
+         name="django.contrib.flatpages.views.flatpage"),
+    path("metrics", posts_views.metrics, name="metrics"),
 ]
 
 urlpatterns += [
-    path("about-us/", views.flatpage, {"url": "/about-us/"}, name="about"),
-    path("terms/", views.flatpage, {"url": "/terms/"}, name="terms"),
-    path("about-author/", views.flatpage,
+    path("about-us/", flatpages.flatpage, {"url": "/about-us/"}, name="about"),
+    path("terms/", flatpages.flatpage, {"url": "/terms/"}, name="terms"),
+    path("about-author/", flatpages.flatpage,
          {"url": "/about-author/"}, name="about-author"),
-    path("about-spec/", views.flatpage,
+    path("about-spec/", flatpages.flatpage,
          {"url": "/about-spec/"}, name="about-spec"),
 ]
 
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# опубликованные ленты для анонимов (PUBLISH_ROOT) отдаются с диска
+from posts.publisher import StaticPages  # noqa: E402
+
+application = StaticPages(application)